@@ -0,0 +1,583 @@
+"""
+Conformance of the batched engines against the scripts' own classes.
+
+world.py copies the wiring of every script, and the faster paths built on it
+(float32 state, sleeping vehicles, snapshots, populations split over
+processes, the Barnes-Hut field) are only worth switching to while they
+still drive the vehicles the way the scripts do. This harness pins that
+down with golden trajectories:
+
+    python conformance.py --record     run every script's class headless from
+                                       fixed seeds and store golden/<model>.npz
+    python conformance.py              check every backend against them
+
+A golden run is one model on its script's WIDTH x HEIGHT screen, with
+sources and vehicles placed from a seed, stepped by the script's class
+itself one vehicle at a time (VehicleOne with max_perturbation=0, since its
+turning comes from the random module). The file holds x, y and heading of
+every vehicle before the first step and after every step, in the World's
+conventions (4aa's degrees from "up" become radians from +x), and the
+SHA-256 of those numbers, which is checked on every load.
+
+Every backend starts from the golden initial state, runs the same number of
+steps and is compared step by step: position (across the screen wrap) in px
+and heading in radians, each within the backend's tolerance, up to its
+horizon. A report names the first step, vehicle and quantity outside it, and
+flags backends that reproduce the golden bit for bit. The "reference"
+backend reruns the scripts' classes, so changes to them are caught too.
+Along with it, check_rotation() pins 4aa's float rotation to pygame's
+Vector2.rotate(), which it copies. When a script's class changes, re-record
+into another directory (--record --golden DIR) and compare the hashes: a
+change meant to keep the behaviour has to reproduce them. The goldens in
+golden/ were re-recorded that way after the scripts moved to slotted,
+allocation-free updates, with identical hashes.
+
+Sleeping vehicles are also checked on event scenes (SCENES), where sources
+move, appear or change strength mid-run with several sources sensed at
+once. The scripts can't run those, so there the plain World is the
+reference, and the sleeping run has to follow it.
+
+Measured here (8 vehicles, 300 steps, 3.5 s for everything): the float64
+World stays within 1e-9 px of the scripts, and reproduces 3b bit for bit
+(elsewhere numpy's and math's rounding differ in the last bit); split
+populations, separate processes and snapshots (also resumed from the first
+version 1 layout) match it exactly. float32
+stays within 0.003 px for the first 100 steps, after which chaotic models
+drift apart as memory.py describes. Sleeping 4aa orbiters coast on
+closed-form arcs, 5e-6 px from the per-frame steps.
+"""
+
+import argparse
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import fastforward
+import snapshot
+from schedules import Schedules
+from world import SOURCE_TYPES, World
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# The class behind every model, as (module, class)
+SCRIPTS = {
+    "1": ("vehicle1", "VehicleOne"),
+    "2a": ("vehicle2", "VehicleTwo"),
+    "2b": ("vehicle2", "VehicleTwo"),
+    "3a": ("vehicle3a", "Vehicle3a"),
+    "3b": ("vehicle3b", "Vehicle3b"),
+    "3c": ("vehicle3c", "Vehicle3c"),
+    "4a": ("vehicle4a", "Vehicle4a"),
+    "4aa": ("vehicle4aa", "Vehicle"),
+    "4b": ("vehicle4b", "Vehicle4b_ReLU"),
+}
+
+
+# --- REFERENCE ---
+def _reference_vehicle(model, module, x, y, heading, sources):
+    """(step, state) closures driving one vehicle of the script's class,
+    with state() in World conventions."""
+    cls = getattr(module, SCRIPTS[model][1])
+    if model == "4aa":
+        vehicle = cls((x, y), math.degrees(heading + math.pi / 2))
+        source = module.Source((sources[0][0], sources[0][1]), 40, (0, 0, 0))
+        return (
+            lambda: vehicle.move_and_think(source),
+            lambda: (
+                vehicle.position.x, vehicle.position.y, math.radians(vehicle.angle) - math.pi / 2
+            ),
+        )
+    if model == "1":
+        vehicle = cls(x, y, heading=heading, max_perturbation=0.0)
+        positions = [(sx, sy) for sx, sy, _ in sources]
+        step = lambda: vehicle.update(positions)
+    elif model == "3c":
+        vehicle = cls(x, y)
+        objects = [module.Source(sx, sy, SOURCE_TYPES[kind], (0, 0, 0)) for sx, sy, kind in sources]
+        step = lambda: vehicle.update(objects)
+    else:
+        if model in ("2a", "2b"):
+            vehicle = cls(x, y, heading=heading, vehicle_type=model)
+        else:
+            vehicle = cls(x, y)
+        light = (sources[0][0], sources[0][1])
+        step = lambda: vehicle.update(light)
+    vehicle.heading = heading
+    return step, lambda: (vehicle.x, vehicle.y, vehicle.heading)
+
+
+def scenario(model, seed=0, vehicles=8):
+    """Screen size, sources [(x, y, kind)] and initial vehicle states of the
+    golden run of model."""
+    module = importlib.import_module(SCRIPTS[model][0])
+    width, height = module.WIDTH, module.HEIGHT
+    rng = np.random.default_rng((seed, list(SCRIPTS).index(model)))
+    # VehicleOne sums several sources and 3c has one of each kind; the
+    # others sense a single light
+    kinds = {"1": (0, 0, 0), "3c": tuple(range(len(SOURCE_TYPES)))}.get(model, (0,))
+    sources = [
+        (float(rng.uniform(0.2, 0.8) * width), float(rng.uniform(0.2, 0.8) * height), kind)
+        for kind in kinds
+    ]
+    x = rng.uniform(0, width, vehicles)
+    y = rng.uniform(0, height, vehicles)
+    heading = rng.uniform(0, 2 * math.pi, vehicles)
+    return width, height, sources, x, y, heading
+
+
+def reference(model, sources, x, y, heading, steps):
+    """(steps + 1, n, 3) trajectory of the script's class from the given
+    state: x, y, heading before the first step and after each."""
+    module = importlib.import_module(SCRIPTS[model][0])
+    vehicles = [
+        _reference_vehicle(model, module, float(a), float(b), float(c), sources)
+        for a, b, c in zip(x, y, heading)
+    ]
+    trajectory = np.empty((steps + 1, len(vehicles), 3))
+    trajectory[0] = [state() for _, state in vehicles]
+    for t in range(1, steps + 1):
+        for step, _ in vehicles:
+            step()
+        trajectory[t] = [state() for _, state in vehicles]
+    return trajectory
+
+
+# --- GOLDEN FILES ---
+def digest(trajectory):
+    return hashlib.sha256(np.ascontiguousarray(trajectory, dtype="<f8").tobytes()).hexdigest()
+
+
+def record(model, directory=GOLDEN, seed=0, vehicles=8, steps=300):
+    """Run the script's class and write golden/<model>.npz. Returns its path."""
+    width, height, sources, x, y, heading = scenario(model, seed, vehicles)
+    trajectory = reference(model, sources, x, y, heading, steps)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{model}.npz")
+    np.savez_compressed(
+        path, model=model, width=width, height=height, seed=seed,
+        sources=np.array(sources, dtype=float).reshape(-1, 3),
+        trajectory=trajectory, sha256=digest(trajectory),
+    )
+    return path
+
+
+def load_golden(model, directory=GOLDEN):
+    """The golden run of model as a dict, after checking its hash."""
+    with np.load(os.path.join(directory, f"{model}.npz")) as data:
+        golden = {name: data[name] for name in data.files}
+    golden["model"] = str(golden["model"])
+    golden["sha256"] = str(golden["sha256"])
+    golden["width"] = golden["width"].item()
+    golden["height"] = golden["height"].item()
+    if digest(golden["trajectory"]) != golden["sha256"]:
+        raise ValueError(f"golden trajectory of model {model} doesn't match its hash")
+    return golden
+
+
+# --- BACKENDS ---
+def _world(golden, index=None, dtype=np.float64, split=False):
+    """A World holding the golden initial state (of the vehicles at index),
+    in one population or with split one per vehicle."""
+    world = World(golden["width"], golden["height"], dtype=dtype)
+    for x, y, kind in golden["sources"]:
+        world.add_source(x, y, SOURCE_TYPES[int(kind)])
+    start = golden["trajectory"][0]
+    if index is not None:
+        start = start[index]
+    params = {"max_perturbation": 0.0} if golden["model"] == "1" else {}
+    groups = np.arange(len(start))[:, None] if split else [slice(None)]
+    for group in groups:
+        x, y, heading = start[group].T
+        world.add_population(golden["model"], x, y, heading, **params)
+    return world
+
+
+def _state(world):
+    arrays = world.vehicle_arrays()
+    return np.column_stack((arrays["x"], arrays["y"], arrays["heading"]))
+
+
+def _run(world, steps):
+    """Step world and collect the (steps + 1, n, 3) trajectory."""
+    trajectory = [_state(world)]
+    for _ in range(steps):
+        world.step()
+        trajectory.append(_state(world))
+    return np.array(trajectory, dtype=float)
+
+
+def run_world(golden, steps):
+    return _run(_world(golden), steps)
+
+
+def run_float32(golden, steps):
+    return _run(_world(golden, dtype=np.float32), steps)
+
+
+def run_split(golden, steps):
+    """One population per vehicle."""
+    return _run(_world(golden, split=True), steps)
+
+
+def run_snapshot(golden, steps):
+    """Saved to a snapshot halfway, and resumed from it."""
+    world = _world(golden)
+    first = _run(world, steps // 2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "run.bvws")
+        snapshot.save(world, path)
+        second = _run(snapshot.load(path), steps - steps // 2)
+    return np.concatenate((first, second[1:]))
+
+
+def save_version1(world, path):
+    """Write world in the layout of the first version 1 snapshots: sources,
+    population positions, headings, sensors and motors, array parameters,
+    and no table entries past the RNG state."""
+    arrays = {
+        name: getattr(world, name)
+        for name in ("source_x", "source_y", "source_kind", "source_radius")
+    }
+    for i, pop in enumerate(world.populations):
+        for name in ("x", "y", "heading", "sensors", "motors"):
+            arrays[f"{i}.{name}"] = getattr(pop, name)
+        for name, value in pop.params.items():
+            if isinstance(value, np.ndarray):
+                arrays[f"{i}.params.{name}"] = value
+    table = {
+        "width": world.width, "height": world.height, "step_count": world.step_count,
+        "rng": world.rng.bit_generator.state,
+        "populations": [
+            {"model": pop.model, "params": {
+                k: v for k, v in pop.params.items() if not isinstance(v, np.ndarray)
+            }}
+            for pop in world.populations
+        ],
+        "arrays": {},
+    }
+    offset = 0
+    for name, value in arrays.items():
+        table["arrays"][name] = [value.dtype.str, list(value.shape), offset]
+        offset = snapshot._align(offset + value.nbytes)
+    encoded = json.dumps(table, separators=(",", ":")).encode()
+    data_start = snapshot._align(snapshot.HEADER.size + len(encoded))
+    with open(path, "wb") as f:
+        f.write(snapshot.HEADER.pack(snapshot.MAGIC, 1, 0, len(encoded)))
+        f.write(encoded)
+        for name, value in arrays.items():
+            f.seek(data_start + table["arrays"][name][2])
+            f.write(value.tobytes())
+        f.truncate(data_start + offset)
+
+
+def run_snapshot_v1(golden, steps):
+    """Saved halfway in the first version 1 layout, and resumed from it."""
+    world = _world(golden)
+    first = _run(world, steps // 2)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "run.bvws")
+        save_version1(world, path)
+        second = _run(snapshot.load(path), steps - steps // 2)
+    return np.concatenate((first, second[1:]))
+
+
+def run_sleeping(golden, steps):
+    """With every fastforward detector putting vehicles to sleep."""
+    world = _world(golden)
+    world.observers += [
+        fastforward.OrbitDetector(), fastforward.ParkingDetector(), fastforward.FarFieldDetector(),
+    ]
+    return _run(world, steps)
+
+
+def _run_chunk(golden, index, steps):
+    return _run(_world(golden, index), steps)
+
+
+def run_processes(golden, steps, workers=2):
+    """The vehicles split into chunks, each stepped in its own process."""
+    chunks = np.array_split(np.arange(len(golden["trajectory"][0])), workers)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        parts = pool.map(_run_chunk, [golden] * workers, chunks, [steps] * workers)
+        return np.concatenate(list(parts), axis=1)
+
+
+def run_field_tree(golden, steps):
+    """VehicleOne's field from the Barnes-Hut quadtree (fields.py)."""
+    world = _world(golden)
+    world.field_theta = 0.5
+    return _run(world, steps)
+
+
+def run_reference(golden, steps):
+    """The scripts' classes again: catches changes to them."""
+    x, y, heading = golden["trajectory"][0].T
+    sources = [(sx, sy, int(kind)) for sx, sy, kind in golden["sources"]]
+    return reference(golden["model"], sources, x, y, heading, steps)
+
+
+# name -> (run(golden, steps), position tolerance in px, heading tolerance in
+# radians, horizon in steps (None: all of them), models (None: all))
+BACKENDS = {
+    "reference": (run_reference, 0.0, 0.0, None, None),
+    "world": (run_world, 1e-6, 1e-8, None, None),
+    "split": (run_split, 1e-6, 1e-8, None, None),
+    "processes": (run_processes, 1e-6, 1e-8, None, None),
+    "snapshot": (run_snapshot, 1e-6, 1e-8, None, None),
+    "snapshot_v1": (run_snapshot_v1, 1e-6, 1e-8, None, None),
+    "sleeping": (run_sleeping, 0.01, 1e-4, None, None),
+    "float32": (run_float32, 0.01, 1e-4, 100, None),
+    "field_tree": (run_field_tree, 1e-6, 1e-8, None, ("1",)),
+}
+
+
+# --- EVENT SCENES ---
+# The golden runs keep their sources still. These scenes change sources while
+# vehicles sleep, which only the World can do with several sources (the
+# scripts sense one light), so the "sleeping" backend is checked against the
+# plain World running the same scene and events.
+def scene_two_lights():
+    """4b vehicles parked around one light. A second light then comes to
+    420 px of one of them, outside the single-light decision boundary
+    (385 px) but enough for the summed reading to cross the threshold, and a
+    third one is switched on near another."""
+    world = World(2000, 1600)
+    world.add_source(900, 800)
+    world.add_source(1900, 1500)
+    world.add_source(208, 1136, strength=0.0)
+    angle = np.linspace(0, 2 * math.pi, 8, endpoint=False)
+    world.add_population("4b", 900 + 440 * np.cos(angle), 800 + 440 * np.sin(angle), angle)
+    events = {
+        40: lambda w: w.move_source(1, (1340 + 420 * math.cos(-0.5), 800 + 420 * math.sin(-0.5))),
+        120: lambda w: w.set_source_strengths(2, 1.0),
+    }
+    return world, events
+
+
+def scene_scheduled():
+    """Every detector next to scheduled sources (schedules.py): one light
+    orbits through the far field, another pulses on and off, while 4aa
+    vehicles circle a static light, 4b vehicles park around another and 2b
+    vehicles drive through the empty space in between."""
+    world = World(4000, 3000)
+    world.add_source(800, 800)
+    world.add_source(3200, 2200)
+    world.add_source(2000, 1500)
+    world.add_source(3300, 700)
+    schedules = Schedules()
+    schedules.orbit(2, (2000, 1500), 500, period=900)
+    schedules.duty(3, period=120, duty=0.5)
+    rng = np.random.default_rng(0)
+    angle = rng.uniform(0, 2 * math.pi, 16)
+    # 4aa start on the orbit they settle into
+    world.add_population(
+        "4aa", 800 + 254.075 * np.cos(angle), 800 + 254.075 * np.sin(angle), angle + 1.5614,
+    )
+    world.add_population(
+        "4b", 3200 + 440 * np.cos(angle), 2200 + 440 * np.sin(angle), angle,
+    )
+    world.add_population(
+        "2b", rng.uniform(0, 4000, 32), rng.uniform(0, 3000, 32), rng.uniform(0, 2 * math.pi, 32),
+    )
+    schedules.attach(world)
+    return world, {}
+
+
+# name -> scene() returning (world, {step: event(world)})
+SCENES = {
+    "4b-two-lights": scene_two_lights,
+    "scheduled": scene_scheduled,
+}
+
+
+def _run_scene(scene, steps, detectors):
+    world, events = scene()
+    if detectors:
+        world.observers += [
+            fastforward.OrbitDetector(), fastforward.ParkingDetector(),
+            fastforward.FarFieldDetector(),
+        ]
+    trajectory = [_state(world)]
+    for step in range(steps):
+        if step in events:
+            events[step](world)
+        world.step()
+        trajectory.append(_state(world))
+    return world, np.array(trajectory, dtype=float)
+
+
+def check_scene(name, steps=300):
+    """The "sleeping" backend against the plain World on an event scene."""
+    scene = SCENES[name]
+    start = time.perf_counter()
+    world, plain = _run_scene(scene, steps, detectors=False)
+    _, sleeping = _run_scene(scene, steps, detectors=True)
+    expected = dict(
+        trajectory=plain, width=world.width, height=world.height, sha256=digest(plain),
+    )
+    _, position_tolerance, heading_tolerance, horizon, _ = BACKENDS["sleeping"]
+    report = compare(expected, sleeping, position_tolerance, heading_tolerance, horizon)
+    report.update(model=name, backend="sleeping", seconds=time.perf_counter() - start)
+    return report
+
+
+# --- ROTATION ---
+def check_rotation(directory=GOLDEN, seed=0, count=10000):
+    """4aa's Vehicle rotates in plain floats, copying how pygame's
+    Vector2.rotate() rounds and snaps near quarter turns. Check that copy
+    bit for bit against Vector2.rotate() itself: on quarter turns and
+    just either side of the snapping threshold, on random angles, and on
+    every angle of the golden 4aa run. A pygame that rotates differently
+    fails here rather than drifting the goldens."""
+    import pygame
+
+    module = importlib.import_module(SCRIPTS["4aa"][0])
+    start = time.perf_counter()
+    quarters = 90.0 * np.arange(-8, 9)
+    # ROTATE_EPSILON is about 5.7e-5 degrees
+    offsets = np.array([0.0, 1e-5, 5e-5, 6e-5, 1e-4])
+    angles = [(quarters[:, None] + offsets).ravel(), (quarters[:, None] - offsets).ravel()]
+    angles.append(np.random.default_rng(seed).uniform(-1e4, 1e4, count))
+    if os.path.exists(os.path.join(directory, "4aa.npz")):
+        heading = load_golden("4aa", directory)["trajectory"][..., 2].ravel()
+        angles.append(np.degrees(heading + math.pi / 2))
+    vehicle = module.Vehicle((0, 0), 0.0)
+    # The vectors the script rotates: sensors, heading and the draw tick
+    vectors = [
+        (-vehicle.wheel_distance, -vehicle.sensor_distance),
+        (vehicle.wheel_distance, -vehicle.sensor_distance),
+        (0, -1), (0, -vehicle.radius),
+    ]
+    worst, diverged, checked = 0.0, None, 0
+    for angle in np.concatenate(angles).tolist():
+        vehicle.angle = angle
+        vehicle._rotation()
+        c, s = vehicle._cos, vehicle._sin
+        for vx, vy in vectors:
+            expected = pygame.math.Vector2(vx, vy).rotate(angle)
+            got = (c * vx - s * vy, s * vx + c * vy)
+            error = math.hypot(got[0] - expected.x, got[1] - expected.y)
+            worst = max(worst, error)
+            checked += 1
+            if diverged is None and (got[0] != expected.x or got[1] != expected.y):
+                diverged = dict(
+                    step=checked - 1, vehicle=0, quantity="position",
+                    expected=(expected.x, expected.y, angle), got=(*got, angle),
+                    position_error=error, heading_error=0.0,
+                )
+    return dict(
+        model="4aa", backend="rotate", steps=checked, max_position=worst, max_heading=0.0,
+        identical=diverged is None, diverged=diverged, seconds=time.perf_counter() - start,
+    )
+
+
+# --- CHECKING ---
+def compare(golden, trajectory, position_tolerance, heading_tolerance, horizon=None):
+    """Step-by-step comparison of a backend's trajectory with the golden
+    one. Returns a dict with the largest errors, whether it is identical,
+    and the first divergence (or None)."""
+    expected = golden["trajectory"]
+    end = len(expected) if horizon is None else min(len(expected), horizon + 1)
+    expected, got = expected[:end], trajectory[:end]
+    size = np.array([golden["width"], golden["height"]], dtype=float)
+    d = got[..., :2] - expected[..., :2]
+    d -= np.round(d / size) * size
+    position = np.hypot(d[..., 0], d[..., 1])
+    heading = np.abs(np.angle(np.exp(1j * (got[..., 2] - expected[..., 2]))))
+    report = dict(
+        steps=end - 1,
+        max_position=float(position.max()),
+        max_heading=float(heading.max()),
+        identical=digest(trajectory) == golden["sha256"],
+        diverged=None,
+    )
+    outside = (position > position_tolerance) | (heading > heading_tolerance)
+    if outside.any():
+        step, vehicle = np.argwhere(outside)[0]
+        report["diverged"] = dict(
+            step=int(step), vehicle=int(vehicle),
+            quantity="position" if position[step, vehicle] > position_tolerance else "heading",
+            expected=tuple(expected[step, vehicle]), got=tuple(got[step, vehicle]),
+            position_error=float(position[step, vehicle]),
+            heading_error=float(heading[step, vehicle]),
+        )
+    return report
+
+
+def check(models=None, backends=None, directory=GOLDEN):
+    """Run backends against the golden runs of models (every one with a
+    golden file, by default) and return one report per pair."""
+    if models is None:
+        models = [m for m in SCRIPTS if os.path.exists(os.path.join(directory, f"{m}.npz"))]
+        if backends is None or "sleeping" in backends:
+            models = models + list(SCENES)
+    reports = []
+    if "4aa" in models and (backends is None or "reference" in backends):
+        reports.append(check_rotation(directory))
+    for model in models:
+        if model in SCENES:
+            reports.append(check_scene(model))
+            continue
+        golden = load_golden(model, directory)
+        steps = len(golden["trajectory"]) - 1
+        for name in backends or BACKENDS:
+            run, position_tolerance, heading_tolerance, horizon, only = BACKENDS[name]
+            if only is not None and model not in only:
+                continue
+            start = time.perf_counter()
+            trajectory = run(golden, steps)
+            report = compare(golden, trajectory, position_tolerance, heading_tolerance, horizon)
+            report.update(model=model, backend=name, seconds=time.perf_counter() - start)
+            reports.append(report)
+    return reports
+
+
+def describe(report):
+    """One line for a report."""
+    line = (f"{report['model']:<4} {report['backend']:<11} {report['max_position']:>9.1e} px "
+            f"{report['max_heading']:>9.1e} rad  ")
+    d = report["diverged"]
+    if d is None:
+        return line + ("identical" if report["identical"] else f"ok ({report['steps']} steps)")
+    return line + (
+        f"DIVERGED at step {d['step']}, vehicle {d['vehicle']} {d['quantity']}: expected "
+        f"({d['expected'][0]:.6f}, {d['expected'][1]:.6f}, {d['expected'][2]:.6f}), got "
+        f"({d['got'][0]:.6f}, {d['got'][1]:.6f}, {d['got'][2]:.6f})"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the batched engines against the scripts")
+    parser.add_argument("--record", action="store_true", help="(re)write the golden runs")
+    parser.add_argument("--models", nargs="*", default=None, choices=list(SCRIPTS) + list(SCENES))
+    parser.add_argument("--backends", nargs="*", default=None, choices=list(BACKENDS))
+    parser.add_argument("--golden", default=GOLDEN, help="directory of the golden runs")
+    parser.add_argument("--vehicles", type=int, default=8)
+    parser.add_argument("--steps", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.record:
+        for model in [m for m in args.models or SCRIPTS if m in SCRIPTS]:
+            path = record(model, args.golden, args.seed, args.vehicles, args.steps)
+            print(f"recorded {path} ({load_golden(model, args.golden)['sha256'][:12]})")
+        return
+
+    print("model backend     max position  max heading")
+    failed = 0
+    for report in check(args.models, args.backends, args.golden):
+        print(describe(report))
+        failed += report["diverged"] is not None
+    if failed:
+        raise SystemExit(f"{failed} backend run(s) diverged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Lazy pygame setup shared by the scripts.
+
+Nothing here touches the display or the font system until a window or a font
+is actually asked for, so importing a script (for a headless run, a test or
+a worker process) stays cheap.
+
+pygame.font.SysFont() scans the whole system font list to resolve a name such
+as "consolas", which is slow on machines that don't have it. get_font()
+remembers the resolved file in a small JSON cache on disk, so only the first
+launch pays for the scan. Delete the cache file to pick up newly installed
+fonts.
+"""
+
+import functools
+import json
+import os
+
+import pygame
+
+CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+    "braitenberg-vehicle",
+    "fonts.json",
+)
+
+
+def get_screen(size, caption=None):
+    """Open (or reuse) the window, initializing the display on first use."""
+    if not pygame.display.get_init():
+        pygame.display.init()
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != tuple(size):
+        screen = pygame.display.set_mode(size)
+    if caption:
+        pygame.display.set_caption(caption)
+    return screen
+
+
+def get_font(name, size, bold=False):
+    """Same result as pygame.font.SysFont(name, size, bold), without the
+    system font scan once the font has been resolved before."""
+    if not pygame.font.get_init():
+        # Fonts from before a pygame.quit() are no longer usable
+        pygame.font.init()
+        _load_font.cache_clear()
+    return _load_font(name, size, bold)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_font(name, size, bold):
+    path, fake_bold = _resolve_font(name, bold)
+    font = pygame.font.Font(path, size)
+    if fake_bold:
+        font.set_bold(True)
+    return font
+
+
+def _resolve_font(name, bold):
+    """Return (path, fake_bold) for a system font name, using the disk cache."""
+    key = f"{name.lower()}|{'bold' if bold else 'regular'}"
+    cache = _load_cache()
+    entry = cache.get(key)
+    if entry and (entry["path"] is None or os.path.exists(entry["path"])):
+        return entry["path"], entry["fake_bold"]
+
+    # Slow path: this is what SysFont does on every call
+    path = pygame.font.match_font(name, bold=bold)
+    # match_font falls back to the regular face (or the default font) when
+    # there is no bold one, SysFont then fakes bold on it
+    fake_bold = bold and (path is None or path == pygame.font.match_font(name))
+    cache[key] = {"path": path, "fake_bold": fake_bold}
+    _save_cache(cache)
+    return path, fake_bold
+
+
+def _load_cache():
+    try:
+        with open(CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    # Write then rename, so concurrent workers never read a half-written file
+    tmp_path = f"{CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f, indent=1)
+        os.replace(tmp_path, CACHE_PATH)
+    except OSError:
+        pass
@@ -0,0 +1,380 @@
+"""
+Mouse editing of sources (and vehicles) through a spatial index.
+
+The scripts used to find the clicked source by testing every source, which
+is fine for four of them and not for a scene of thousands. PointIndex keeps
+circles in a uniform grid hash: picking a point or selecting a box only
+looks at the cells around it, and moving a circle updates just the one or
+two cells involved.
+
+Editor turns mouse events into edits on top of it:
+
+    click               pick the circle under the mouse (nearest centre)
+    shift + click       add it to / remove it from the selection
+    drag a selection    move every selected circle together
+    drag on empty space box-select (shift keeps the current selection)
+
+Every move is passed on as it happens, through the circle's on_move(x, y)
+callback, and every edit as a whole through the editor's on_moves(items, x,
+y). Editor.for_world() binds the latter to a World, so dragging a group of
+sources is one World.move_sources call per mouse event, however many sources
+are selected. While a drag lasts the dragged sources are marked dynamic, the
+way schedules.py marks moving sources: each move then only wakes the
+sleepers near them, and the structures cached over the static sources (the
+field quadtree, timed sleepers' wake-ups) stay valid instead of being
+rebuilt on every mouse event. They are rebuilt once when the drag starts
+and once when it ends. The shift key is tracked from KEYDOWN / KEYUP
+events, so recordings (playback.py) replay edits exactly.
+
+    python editor.py --sources 2000
+"""
+
+import argparse
+import math
+
+import pygame
+
+SELECTED = (0, 120, 255)
+
+
+class PointIndex:
+    """Circles in a uniform grid hash of cell x cell squares, keyed by the
+    cell of their centre."""
+
+    def __init__(self, cell=64.0):
+        self.cell = cell
+        self.x = []
+        self.y = []
+        self.radius = []
+        self.max_radius = 0.0
+        # (col, row) -> set of items whose centre lies in that cell
+        self._cells = {}
+
+    def __len__(self):
+        return len(self.x)
+
+    def _key(self, x, y):
+        return (math.floor(x / self.cell), math.floor(y / self.cell))
+
+    def add(self, x, y, radius=0.0):
+        """Add a circle and return its item number."""
+        item = len(self.x)
+        self.x.append(x)
+        self.y.append(y)
+        self.radius.append(radius)
+        self.max_radius = max(self.max_radius, radius)
+        self._cells.setdefault(self._key(x, y), set()).add(item)
+        return item
+
+    def move(self, item, x, y):
+        old = self._key(self.x[item], self.y[item])
+        new = self._key(x, y)
+        if old != new:
+            cell = self._cells[old]
+            cell.discard(item)
+            if not cell:
+                del self._cells[old]
+            self._cells.setdefault(new, set()).add(item)
+        self.x[item] = x
+        self.y[item] = y
+
+    def _near(self, x0, y0, x1, y1):
+        """Items in the cells overlapping the box."""
+        c0, r0 = self._key(x0, y0)
+        c1, r1 = self._key(x1, y1)
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(self._cells):
+            # A box bigger than the occupied cells: walk those instead
+            for (col, row), items in self._cells.items():
+                if c0 <= col <= c1 and r0 <= row <= r1:
+                    yield from items
+            return
+        for col in range(c0, c1 + 1):
+            for row in range(r0, r1 + 1):
+                yield from self._cells.get((col, row), ())
+
+    def pick(self, x, y):
+        """The item whose circle contains (x, y) with the nearest centre, or
+        None."""
+        r = self.max_radius
+        best, best_d = None, math.inf
+        for item in self._near(x - r, y - r, x + r, y + r):
+            d = math.hypot(x - self.x[item], y - self.y[item])
+            if d < self.radius[item] and d < best_d:
+                best, best_d = item, d
+        return best
+
+    def in_box(self, x0, y0, x1, y1):
+        """Items with their centre inside the box (corners in any order)."""
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        return [
+            item for item in self._near(x0, y0, x1, y1)
+            if x0 <= self.x[item] <= x1 and y0 <= self.y[item] <= y1
+        ]
+
+
+class Editor:
+    """Selection and dragging of circles, driven by pygame mouse events."""
+
+    def __init__(self, cell=64.0, on_moves=None, on_drag=None):
+        """on_moves(items, x, y), if given, receives every move of one edit
+        in a single call (lists of item numbers and new centres), for owners
+        that update in bulk. on_drag(items, dragging) is told when a drag of
+        items starts (on its first move) and when it ends."""
+        self.index = PointIndex(cell)
+        self.selection = set()
+        # Selection rectangle (x0, y0, x1, y1) while box-selecting
+        self.box = None
+        self.on_moves = on_moves
+        self.on_drag = on_drag
+        # Items of the drag in progress, once it has moved
+        self._dragging = None
+        self._on_move = []
+        # item -> position() for the circles that move on their own
+        self._position = {}
+        # Callables that bring whole groups of such circles up to date
+        self._refreshers = []
+        self._drag_from = None
+        self._shift = False
+
+    def add(self, x, y, radius, on_move=None, position=None):
+        """Add a circle and return its item number.
+
+        on_move(x, y) is called whenever the editor moves it. position(),
+        for circles that also move on their own (vehicles), returns the
+        current centre; the index is brought up to date from it before
+        every pick.
+        """
+        item = self.index.add(x, y, radius)
+        self._on_move.append(on_move)
+        if position is not None:
+            self._position[item] = position
+        return item
+
+    @classmethod
+    def for_world(cls, world, vehicles=False, cell=64.0):
+        """An editor over the sources of world (and with vehicles=True its
+        vehicles too), moving them in the world."""
+        # numpy only for worlds: the scripts import this module with pygame alone
+        import numpy as np
+
+        # Items 0 .. n_sources - 1 are the sources
+        n_sources = world.n_sources
+
+        def on_moves(items, x, y):
+            sources = [k for k, item in enumerate(items) if item < n_sources]
+            if sources:
+                # Wrapped like the vehicles, so a source dragged off one edge
+                # comes back on the other
+                world.move_sources(
+                    np.array([items[k] for k in sources]),
+                    np.array([x[k] for k in sources]) % world.width,
+                    np.array([y[k] for k in sources]) % world.height,
+                )
+
+        # Dragged sources that were static, marked dynamic for the drag
+        dragged = []
+
+        def on_drag(items, dragging):
+            if dragging:
+                sources = np.array([item for item in items if item < n_sources], dtype=np.intp)
+                dragged[:] = sources[~world.source_dynamic[sources]].tolist()
+                if dragged:
+                    world.set_dynamic(dragged)
+            elif dragged:
+                world.set_dynamic(dragged, False)
+                dragged.clear()
+
+        editor = cls(cell, on_moves, on_drag)
+        for i in range(n_sources):
+            editor.add(world.source_x[i], world.source_y[i], world.source_radius[i])
+        # Scheduled sources (schedules.py) move every step
+        editor._refreshers.append(
+            lambda: _refresh_block(
+                editor.index, 0, world.source_x[:n_sources], world.source_y[:n_sources]
+            )
+        )
+        if vehicles:
+            world.sync()
+            # Sleepers only coast when something looks at them: bring them
+            # up to date before the populations are read
+            editor._refreshers.append(world.sync)
+            for pop in world.populations:
+                radius = np.broadcast_to(pop.params["radius"], pop.x.shape)
+                first = len(editor.index)
+                for i in range(len(pop)):
+                    editor.add(
+                        pop.x[i], pop.y[i], radius[i],
+                        on_move=lambda x, y, pop=pop, i=i: _place_vehicle(world, pop, i, x, y),
+                    )
+                editor._refreshers.append(
+                    lambda pop=pop, first=first: _refresh_block(editor.index, first, pop.x, pop.y)
+                )
+        return editor
+
+    def refresh(self):
+        """Re-read the centres of circles that move on their own."""
+        for item, position in self._position.items():
+            self.index.move(item, *position())
+        for refresh in self._refreshers:
+            refresh()
+
+    def move_by(self, items, dx, dy):
+        """Move items by (dx, dy), updating the index and telling their
+        owners."""
+        index = self.index
+        items = list(items)
+        xs, ys = [], []
+        for item in items:
+            x = index.x[item] + dx
+            y = index.y[item] + dy
+            index.move(item, x, y)
+            if self._on_move[item] is not None:
+                self._on_move[item](x, y)
+            xs.append(x)
+            ys.append(y)
+        if self.on_moves is not None and items:
+            self.on_moves(items, xs, ys)
+
+    def handle(self, event):
+        """Process one pygame event. Returns True if it was an edit."""
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            if event.key in (pygame.K_LSHIFT, pygame.K_RSHIFT):
+                self._shift = event.type == pygame.KEYDOWN
+            return False
+
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.refresh()
+            item = self.index.pick(*event.pos)
+            if item is None:
+                if not self._shift:
+                    self.selection.clear()
+                self.box = (*event.pos, *event.pos)
+            elif self._shift and item in self.selection:
+                self.selection.discard(item)
+            else:
+                if not self._shift and item not in self.selection:
+                    self.selection = {item}
+                self.selection.add(item)
+                self._drag_from = event.pos
+            return True
+
+        if event.type == pygame.MOUSEMOTION:
+            if self._drag_from is not None:
+                dx = event.pos[0] - self._drag_from[0]
+                dy = event.pos[1] - self._drag_from[1]
+                self._drag_from = event.pos
+                if self._dragging is None:
+                    self._dragging = sorted(self.selection)
+                    if self.on_drag is not None:
+                        self.on_drag(self._dragging, True)
+                self.move_by(self.selection, dx, dy)
+                return True
+            if self.box is not None:
+                self.box = (*self.box[:2], *event.pos)
+                return True
+            return False
+
+        if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            if self.box is not None:
+                self.selection.update(self.index.in_box(*self.box))
+                self.box = None
+                return True
+            if self._drag_from is not None:
+                self._drag_from = None
+                if self._dragging is not None:
+                    if self.on_drag is not None:
+                        self.on_drag(self._dragging, False)
+                    self._dragging = None
+                return True
+        return False
+
+    def draw(self, surface, color=SELECTED):
+        """Outline the selected circles and the selection box."""
+        index = self.index
+        for item in self.selection:
+            center = (index.x[item], index.y[item])
+            pygame.draw.circle(surface, color, center, index.radius[item] + 3, 2)
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            rect = pygame.Rect(min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0))
+            pygame.draw.rect(surface, color, rect, 1)
+
+
+def _refresh_block(index, first, x, y):
+    """Bring the index entries first .. first + len(x) - 1 up to the centres
+    x, y (arrays): they are copied in one go, and only circles that crossed
+    into another cell are rehashed."""
+    import numpy as np
+
+    n = len(x)
+    cell = index.cell
+    old_x = np.array(index.x[first:first + n])
+    old_y = np.array(index.y[first:first + n])
+    crossed = np.flatnonzero(
+        (np.floor(old_x / cell) != np.floor(x / cell))
+        | (np.floor(old_y / cell) != np.floor(y / cell))
+    )
+    for i in crossed.tolist():
+        index.move(first + i, float(x[i]), float(y[i]))
+    index.x[first:first + n] = x.tolist()
+    index.y[first:first + n] = y.tolist()
+
+
+def _place_vehicle(world, pop, i, x, y):
+    if pop.awake is not None and not pop.awake[i]:
+        world.wake(pop, [i])
+    pop.x[i] = x % world.width
+    pop.y[i] = y % world.height
+
+
+# --- DEMO ---
+def main():
+    parser = argparse.ArgumentParser(description="Drag, multi-select and box-select many sources")
+    parser.add_argument("--sources", type=int, default=2000)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    # --record / --play are left to playback.from_args
+    args, _ = parser.parse_known_args()
+
+    import playback
+    from display import get_screen
+    from render import draw_world
+    from world import SOURCE_TYPES, World
+
+    world = World(1200, 800, seed=args.seed)
+    for x, y, kind in zip(
+        world.rng.uniform(0, world.width, args.sources),
+        world.rng.uniform(0, world.height, args.sources),
+        world.rng.integers(0, len(SOURCE_TYPES), args.sources),
+    ):
+        world.add_source(x, y, SOURCE_TYPES[kind], radius=6)
+    world.add_population(
+        "3c",
+        world.rng.uniform(0, world.width, args.vehicles),
+        world.rng.uniform(0, world.height, args.vehicles),
+        world.rng.uniform(0, 2 * math.pi, args.vehicles),
+        radius=5,
+    )
+    editor = Editor.for_world(world)
+
+    screen = get_screen((world.width, world.height), f"Editor: {args.sources} sources")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    running = True
+    while running:
+        for event in events.get():
+            if event.type == pygame.QUIT:
+                running = False
+            editor.handle(event)
+        world.step()
+        draw_world(screen, world)
+        editor.draw(screen)
+        pygame.display.flip()
+        events.tick(clock, 60)
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Monte Carlo ensembles of stochastic vehicles.
+
+VehicleOne wanders under random turning, so a single run says little about
+how it disperses. An Ensemble copies every vehicle of a scene into
+thousands of replicas, steps them together as one batched population, and
+keeps statistics across replicas instead of trajectories:
+
+    msd             mean squared displacement from the start, sampled every
+                    `every` steps (displacement across the screen wrap)
+    passage         first-passage time: the first step a vehicle's centre is
+                    within the radius of a source that is switched on, and
+                    the fraction of replicas that got there at all
+    intensity       each replica's time-averaged sensed intensity, the mean
+                    of its sensors (VehicleOne's single sensor counts once)
+
+Each comes with a confidence interval (normal approximation for means,
+Wilson interval for the passage fraction). Vehicles of a world never
+interact, so replicas are independent draws of the same scene. They run
+in blocks of `block` replicas. Each block is its own world, seeded from
+its own child of one SeedSequence, so the blocks use independent random
+streams and a run is reproducible from (seed, block). Sensor and motor
+noise (noise.py) is drawn by replica number instead, so it doesn't even
+depend on the block size.
+
+    ensemble = Ensemble(scene.load("scenes/vehicle1.json"), replicas=2000)
+    results = ensemble.run(steps=2000)[0]     # one dict per population
+
+    python ensemble.py --scene scenes/vehicle1.json --replicas 2000 --steps 2000
+"""
+
+import argparse
+import math
+import statistics
+
+import numpy as np
+
+from world import Population, World
+
+
+def replicate(world, replicas, seed=None, first=0):
+    """A new world with the sources and walls of world, where every
+    population holds `replicas` copies of its vehicles. Copy r of vehicle i
+    is vehicle r * n + i.
+
+    Noisy populations keep their noise, and each copy gets its own vehicle
+    ids as replica number first + r, so the noise of a replica does not
+    depend on how the replicas are split into blocks."""
+    world.sync()
+    copy = World(world.width, world.height, seed, world.dt, world.integrator, world.dtype)
+    for name in World.STATE_ARRAYS:
+        setattr(copy, name, getattr(world, name).copy())
+    copy.field_theta = world.field_theta
+    for pop in world.populations:
+        params = {
+            name: np.tile(value, replicas) if np.ndim(value) else value
+            for name, value in pop.params.items()
+        }
+        population = Population(
+            pop.model, np.tile(pop.x, replicas), np.tile(pop.y, replicas),
+            np.tile(pop.heading, replicas), world.dtype, **params,
+        )
+        if pop.noise is not None:
+            ids = pop.vehicle_ids
+            span = int(ids.max(initial=-1)) + 1
+            population.noise = pop.noise
+            population.ids = (
+                (first + np.arange(replicas))[:, None] * span + ids[None, :]
+            ).ravel()
+        copy.populations.append(population)
+    return copy
+
+
+def _mean_ci(total, squares, n, z):
+    """Mean and confidence half-width from running sums over n samples."""
+    n = np.maximum(n, 1)
+    mean = total / n
+    var = np.maximum(squares / n - mean**2, 0.0) * n / np.maximum(n - 1, 1)
+    return mean, z * np.sqrt(var / n)
+
+
+def _wilson(successes, n, z):
+    """Wilson score interval of a binomial proportion, as (low, high)."""
+    n = np.maximum(n, 1)
+    p = successes / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * np.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return np.stack((center - half, center + half), axis=-1)
+
+
+class Ensemble:
+    """Replicas of the vehicles of world, with statistics across them.
+
+    world is only read: each block of replicas runs in a copy of it.
+    """
+
+    def __init__(self, world, replicas, every=10, block=4096, seed=None, confidence=0.95):
+        self.world = world
+        self.replicas = replicas
+        self.every = every
+        self.block = block
+        self.seed = seed
+        self.z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        self._stats = None
+
+    def run(self, steps):
+        """Simulate every replica for steps steps and return results()."""
+        n_blocks = math.ceil(self.replicas / self.block)
+        samples = steps // self.every
+        self.times = (np.arange(samples) + 1) * self.every
+        self._stats = [
+            dict(
+                msd=np.zeros((samples, len(pop))), msd_sq=np.zeros((samples, len(pop))),
+                reached=np.zeros(len(pop)), passage=np.zeros(len(pop)),
+                passage_sq=np.zeros(len(pop)),
+                intensity=np.zeros(len(pop)), intensity_sq=np.zeros(len(pop)),
+            )
+            for pop in self.world.populations
+        ]
+        seeds = np.random.SeedSequence(self.seed).spawn(n_blocks)
+        for b, seed in enumerate(seeds):
+            count = min(self.block, self.replicas - b * self.block)
+            world = replicate(self.world, count, seed, first=b * self.block)
+            self._run_block(world, count, steps)
+        return self.results()
+
+    def _run_block(self, world, count, steps):
+        tracks = []
+        for pop in world.populations:
+            tracks.append(dict(
+                last=np.column_stack((pop.x, pop.y)).astype(float),
+                disp=np.zeros((len(pop), 2)),
+                passage=np.full(len(pop), -1, dtype=np.int64),
+                intensity=np.zeros(len(pop)),
+            ))
+
+        for step in range(1, steps + 1):
+            world.step()
+            world.sync()
+            for pop, track in zip(world.populations, tracks):
+                if not len(pop):
+                    continue
+                # Per-step displacement, undoing the screen wrap
+                d = np.column_stack((pop.x, pop.y)) - track["last"]
+                d -= np.round(d / (world.width, world.height)) * (world.width, world.height)
+                track["disp"] += d
+                track["last"] = np.column_stack((pop.x, pop.y)).astype(float)
+                track["intensity"] += pop.sensors.mean(axis=1)
+
+                waiting = np.flatnonzero(track["passage"] < 0)
+                # Sources switched off (e.g. by a duty schedule) don't count
+                live = world.source_strength > 0
+                if len(waiting) and live.any():
+                    dist = world.distances(pop.x[waiting], pop.y[waiting])[:, live]
+                    inside = (dist <= world.source_radius[None, live]).any(axis=1)
+                    track["passage"][waiting[inside]] = step
+
+            if step % self.every == 0:
+                s = step // self.every - 1
+                for pop, track, stats in zip(world.populations, tracks, self._stats):
+                    if len(pop):
+                        d2 = (track["disp"] ** 2).sum(axis=1).reshape(count, -1)
+                        stats["msd"][s] += d2.sum(axis=0)
+                        stats["msd_sq"][s] += (d2**2).sum(axis=0)
+
+        for pop, track, stats in zip(world.populations, tracks, self._stats):
+            if not len(pop):
+                continue
+            passage = track["passage"].reshape(count, -1)
+            reached = passage >= 0
+            passage = np.where(reached, passage, 0).astype(float)
+            stats["reached"] += reached.sum(axis=0)
+            stats["passage"] += passage.sum(axis=0)
+            stats["passage_sq"] += (passage**2).sum(axis=0)
+            intensity = track["intensity"].reshape(count, -1) / steps
+            stats["intensity"] += intensity.sum(axis=0)
+            stats["intensity_sq"] += (intensity**2).sum(axis=0)
+
+    def results(self):
+        """Statistics over the replicas, one dict per population of the
+        scene. Every array has one column per vehicle of the scene; *_ci are
+        confidence half-widths, passage_fraction_ci is (low, high)."""
+        out = []
+        n = self.replicas
+        for pop, stats in zip(self.world.populations, self._stats or []):
+            msd, msd_ci = _mean_ci(stats["msd"], stats["msd_sq"], n, self.z)
+            passage, passage_ci = _mean_ci(
+                stats["passage"], stats["passage_sq"], stats["reached"], self.z
+            )
+            passage[stats["reached"] == 0] = np.nan
+            intensity, intensity_ci = _mean_ci(
+                stats["intensity"], stats["intensity_sq"], n, self.z
+            )
+            out.append(dict(
+                model=pop.model,
+                replicas=n,
+                times=self.times,
+                msd=msd, msd_ci=msd_ci,
+                passage_fraction=stats["reached"] / n,
+                passage_fraction_ci=_wilson(stats["reached"], n, self.z),
+                passage_mean=passage, passage_ci=passage_ci,
+                intensity_mean=intensity, intensity_ci=intensity_ci,
+            ))
+        return out
+
+
+# --- REPORT ---
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo ensemble of a scene's vehicles")
+    parser.add_argument("--scene", default="scenes/vehicle1.json")
+    parser.add_argument("--replicas", type=int, default=2000)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--every", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import scene
+
+    ensemble = Ensemble(scene.load(args.scene), args.replicas, args.every, seed=args.seed)
+    for index, r in enumerate(ensemble.run(args.steps)):
+        for i in range(r["msd"].shape[1]):
+            print(f"population {index} (model {r['model']}), vehicle {i}, {r['replicas']} replicas")
+            low, high = r["passage_fraction_ci"][i]
+            print(f"  reached a source  {r['passage_fraction'][i]:.1%} ({low:.1%} - {high:.1%})")
+            print(f"  first passage     {r['passage_mean'][i]:.0f} +- {r['passage_ci'][i]:.0f} steps")
+            print(f"  mean intensity    {r['intensity_mean'][i]:.3f} +- {r['intensity_ci'][i]:.3f}")
+            print("  step      msd (px^2)")
+            for t, msd, ci in zip(r["times"], r["msd"][:, i], r["msd_ci"][:, i]):
+                print(f"  {t:>5}  {msd:>10.0f} +- {ci:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Evolutionary search over the tuning of any model.
+
+GeneticSearch evolves a few parameters of one model (for example 4a's
+preferred_intensity and curve_width, or 3c's gain_excite and gain_inhibit)
+against a fitness function of the streaming metrics (see metrics.py).
+
+Every candidate of a generation becomes a handful of vehicles (one per
+trial, from random starts) in one batched population, with its parameters
+passed per vehicle. The generation is split into chunks that run in a
+process pool, and the whole search state is checkpointed after every
+generation, so a long search can be stopped and resumed:
+
+    search = GeneticSearch(
+        "4a", {"preferred_intensity": (0.1, 0.9), "curve_width": (0.05, 0.5)},
+        orbiter, checkpoint="4a.npz",
+    )
+    best, score = search.run(generations=30)
+
+fitness(results) gets the metrics dict of the population (see
+Metrics.results) and returns one score per vehicle, higher is better. A
+candidate scores the mean over its trials. The fitness and scene functions
+must be importable (module level), since they are sent to worker processes.
+
+    python evolve.py --model 4a --fitness orbiter --generations 20
+"""
+
+import argparse
+import concurrent.futures
+import json
+import math
+import os
+
+import numpy as np
+
+from metrics import Metrics
+from world import DEFAULTS, MODELS, World
+
+
+# --- SCENES & FITNESS ---
+def single_light(seed):
+    """The scripts' scene: one light in the middle of a 900x700 screen."""
+    world = World(900, 700, seed=seed)
+    world.add_source(450, 350)
+    return world
+
+
+def lover(results):
+    """Get close to a source and stay there."""
+    return -results["distance_mean"]
+
+
+def orbiter(results):
+    """Keep a steady distance while staying in range of a source."""
+    in_range = results["time_in_range"].max(axis=1) / np.maximum(results["samples"], 1)
+    return in_range - results["distance_std"] / 100
+
+
+def explorer(results):
+    """Visit sources without settling: many contacts, little time at rest."""
+    return results["contacts"] / np.maximum(results["tortuosity"], 1.0)
+
+
+FITNESS = {"lover": lover, "orbiter": orbiter, "explorer": explorer}
+
+
+def evaluate(model, names, values, fitness, scene=single_light, steps=1000,
+             trials=4, seed=None):
+    """Score candidates (one row of values per candidate) in one batched run."""
+    world = scene(seed)
+    n = len(values) * trials
+    params = {name: np.tile(values[:, i], trials) for i, name in enumerate(names)}
+    world.add_population(
+        model,
+        world.rng.uniform(0, world.width, n),
+        world.rng.uniform(0, world.height, n),
+        world.rng.uniform(0, 2 * math.pi, n),
+        **params,
+    )
+    metrics = Metrics()
+    world.observers.append(metrics)
+    for _ in range(steps):
+        world.step()
+    scores = np.asarray(fitness(metrics.results(world)[0]), dtype=float)
+    return scores.reshape(trials, len(values)).mean(axis=0)
+
+
+def _evaluate_chunk(args):
+    return evaluate(*args)
+
+
+# --- SEARCH ---
+class GeneticSearch:
+    """Real-coded genetic algorithm with elitism.
+
+    bounds maps parameter names to (low, high). Parents are picked by
+    binary tournament, children are a random blend of two parents plus
+    gaussian mutation (mutation is its scale, as a fraction of each
+    parameter's range), clipped to the bounds. The `elite` best candidates
+    survive unchanged.
+    """
+
+    def __init__(self, model, bounds, fitness, scene=single_light, steps=1000,
+                 trials=4, size=32, elite=2, mutation=0.1, workers=None,
+                 checkpoint=None, seed=None):
+        if model not in MODELS:
+            raise ValueError(f"unknown model {model!r}, expected one of {MODELS}")
+        unknown = set(bounds) - set(DEFAULTS[model])
+        if unknown:
+            raise ValueError(f"unknown parameters for model {model}: {sorted(unknown)}")
+        self.model = model
+        self.names = list(bounds)
+        self.low = np.array([bounds[name][0] for name in self.names], dtype=float)
+        self.high = np.array([bounds[name][1] for name in self.names], dtype=float)
+        self.fitness = fitness
+        self.scene = scene
+        self.steps = steps
+        self.trials = trials
+        self.size = size
+        self.elite = elite
+        self.mutation = mutation
+        self.workers = workers or os.cpu_count() or 1
+        self.checkpoint = checkpoint
+
+        self.rng = np.random.default_rng(seed)
+        self.generation = 0
+        self.population = self.rng.uniform(self.low, self.high, (size, len(self.names)))
+        self.best = None
+        self.best_score = -np.inf
+        # Best score of every generation so far
+        self.history = []
+        if checkpoint and os.path.exists(checkpoint):
+            self._load(checkpoint)
+
+    def run(self, generations, log=None):
+        """Evolve up to `generations` generations in total (counting those
+        of a resumed checkpoint). Returns (best parameters, best score)."""
+        with concurrent.futures.ProcessPoolExecutor(self.workers) as pool:
+            while self.generation < generations:
+                scores = self._score(pool)
+                self._select(scores)
+                if self.checkpoint:
+                    self._save(self.checkpoint)
+                if log:
+                    log(f"generation {self.generation}: best {self.history[-1]:.4g}, "
+                        f"mean {np.mean(scores):.4g}")
+        return self.best_params(), self.best_score
+
+    def best_params(self):
+        if self.best is None:
+            return None
+        return {name: float(v) for name, v in zip(self.names, self.best)}
+
+    def _score(self, pool):
+        # Candidates of a generation share a seed per chunk, so reruns of a
+        # checkpointed generation score the same
+        chunks = np.array_split(self.population, min(self.workers, self.size))
+        seed = int(self.rng.integers(2**63))
+        jobs = [
+            (self.model, self.names, chunk, self.fitness, self.scene,
+             self.steps, self.trials, [seed, i])
+            for i, chunk in enumerate(chunks) if len(chunk)
+        ]
+        return np.concatenate(list(pool.map(_evaluate_chunk, jobs)))
+
+    def _select(self, scores):
+        order = np.argsort(scores)[::-1]
+        if scores[order[0]] > self.best_score:
+            self.best_score = float(scores[order[0]])
+            self.best = self.population[order[0]].copy()
+        self.history.append(float(scores[order[0]]))
+
+        rng = self.rng
+        n_children = self.size - self.elite
+
+        def tournament():
+            a = rng.integers(self.size, size=n_children)
+            b = rng.integers(self.size, size=n_children)
+            return np.where(scores[a] >= scores[b], a, b)
+
+        mix = rng.uniform(size=(n_children, len(self.names)))
+        children = mix * self.population[tournament()] + (1 - mix) * self.population[tournament()]
+        children += rng.normal(0, self.mutation, children.shape) * (self.high - self.low)
+        children = np.clip(children, self.low, self.high)
+        self.population = np.concatenate((self.population[order[:self.elite]], children))
+        self.generation += 1
+
+    # --- CHECKPOINTS ---
+    def _save(self, path):
+        # Written to a temporary file and renamed, like snapshots
+        tmp_path = f"{path}.tmp.npz"
+        arrays = dict(
+            generation=self.generation,
+            population=self.population,
+            best_score=self.best_score,
+            history=np.array(self.history, dtype=float),
+            names=np.array(self.names),
+            rng=json.dumps(self.rng.bit_generator.state),
+        )
+        # No best yet (nothing scored above -inf) is stored as no "best"
+        # key: None would need pickling
+        if self.best is not None:
+            arrays["best"] = self.best
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def _load(self, path):
+        with np.load(path) as data:
+            if list(data["names"]) != self.names:
+                raise ValueError(f"{path} searches {list(data['names'])}, not {self.names}")
+            self.generation = int(data["generation"])
+            self.population = data["population"]
+            self.best = data["best"] if "best" in data else None
+            self.best_score = float(data["best_score"])
+            self.history = list(data["history"])
+            self.rng.bit_generator.state = json.loads(str(data["rng"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolve the tuning of a model")
+    parser.add_argument("--model", default="4a", choices=MODELS)
+    parser.add_argument("--fitness", default="orbiter", choices=sorted(FITNESS))
+    parser.add_argument("--param", nargs=3, action="append", metavar=("NAME", "LOW", "HIGH"),
+                        help="parameter to search (repeatable); default: 4a's taste curve")
+    parser.add_argument("--generations", type=int, default=20)
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--trials", type=int, default=4)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--checkpoint", help="resume from / save to this .npz file")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    if args.param:
+        bounds = {name: (float(low), float(high)) for name, low, high in args.param}
+    else:
+        bounds = {"preferred_intensity": (0.1, 0.9), "curve_width": (0.05, 0.5)}
+    search = GeneticSearch(
+        args.model, bounds, FITNESS[args.fitness],
+        steps=args.steps, trials=args.trials, size=args.size,
+        workers=args.workers, checkpoint=args.checkpoint, seed=args.seed,
+    )
+    best, score = search.run(args.generations, log=print)
+    if best is None:
+        # No generations run, or every fitness was -inf / NaN
+        print("no candidate scored")
+        return
+    print(f"best {score:.4g}: " + ", ".join(f"{k}={v:.4g}" for k, v in best.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Detectors that let settled vehicles sleep.
+
+A sleeping vehicle is not stepped; it coasts in closed form (see
+World.sleep) until its environment changes. Each detector is a world
+observer:
+
+    world.observers.append(OrbitDetector())
+
+Populations with noise (noise.py) never move in closed form, so the
+detectors leave them awake.
+
+Sources that change every step (World.set_dynamic, as schedules.py marks
+them) don't hold the detectors back: settling and the wake-up times are
+worked out against the static sources, and every sleeper also gets a wake
+radius, its sensing reach over the motion it coasts through, so a dynamic
+source only wakes the sleepers it comes near. The detectors can't see where
+a schedule will take a source, though, so a sleeper is woken when the
+source arrives rather than ahead of it, and vehicles a dynamic source keeps
+within reach never settle.
+"""
+
+import math
+
+import numpy as np
+
+
+def _param(pop, name, index):
+    """A population parameter for the vehicles at index (scalar or array)."""
+    value = np.asarray(pop.params[name], dtype=float)
+    return value[index] if value.ndim else value
+
+
+def _nearest_source_distance(world, x, y):
+    return world.distances(x, y).min(axis=1, initial=np.inf)
+
+
+class OrbitDetector:
+    """Put Vehicle4a / 4aa vehicles that have settled into an orbit to sleep.
+
+    A vehicle counts as settled once its speed, turn rate and distance to the
+    nearest source have each stayed within tolerance for settle_steps steps
+    with no static source changing. It then drives its circle in closed form
+    until a source is moved or added close enough to change what it senses
+    anywhere on that circle (wake_radius). Vehicles are checked every
+    check_every steps, which keeps the detector cheap next to the step
+    itself.
+    """
+
+    def __init__(self, models=("4a", "4aa"), settle_steps=120, check_every=10,
+                 radius_tolerance=1.0, speed_tolerance=0.01, turn_tolerance=1e-3):
+        self.models = models
+        self.settle_steps = settle_steps
+        self.check_every = check_every
+        self.radius_tolerance = radius_tolerance
+        self.speed_tolerance = speed_tolerance
+        self.turn_tolerance = turn_tolerance
+        # id(population) -> (population, tracking arrays)
+        self._tracks = {}
+
+    def _track(self, world, pop):
+        entry = self._tracks.get(id(pop))
+        if entry is None or entry[0] is not pop or len(entry[1]["count"]) != len(pop):
+            n = len(pop)
+            track = dict(
+                count=np.zeros(n, dtype=np.int64),
+                speed=np.zeros(n), turn=np.zeros(n), radius=np.zeros(n),
+                version=world.static_version,
+            )
+            self._tracks[id(pop)] = entry = (pop, track)
+        return entry[1]
+
+    def __call__(self, world):
+        if not world.n_sources or world.step_count % self.check_every:
+            return
+        for pop in world.populations:
+            if pop.model not in self.models or not len(pop) or pop.noise is not None:
+                continue
+            track = self._track(world, pop)
+            if track["version"] != world.static_version:
+                # A static source changed: everything has to settle again.
+                # Dynamic sources don't reset the count; the vehicles they
+                # disturb are simply not steady
+                track["count"][:] = 0
+                track["version"] = world.static_version
+
+            awake = pop.awake_vehicles()
+            if not len(awake):
+                continue
+            speed, turn = pop.drive()
+            speed, turn = speed[awake], turn[awake]
+            x, y, heading = pop.x[awake], pop.y[awake], pop.heading[awake]
+
+            steady = (
+                (np.abs(speed - track["speed"][awake]) <= self.speed_tolerance)
+                & (np.abs(turn - track["turn"][awake]) <= self.turn_tolerance)
+            )
+            # Distances are only worth measuring for steady drivers; the rest
+            # get NaN, so they compare once more before counting up
+            radius = np.full(len(awake), np.nan)
+            radius[steady] = _nearest_source_distance(world, x[steady], y[steady])
+            steady &= np.abs(radius - track["radius"][awake]) <= self.radius_tolerance
+            count = np.where(steady, track["count"][awake] + self.check_every, 0)
+            # Unsteady vehicles start a new reference from where they are now
+            restart = awake[~steady]
+            track["speed"][restart] = speed[~steady]
+            track["turn"][restart] = turn[~steady]
+            track["radius"][restart] = radius[~steady]
+
+            # Only sleep on circles that stay on screen, so wrapping never
+            # breaks the closed form
+            turning = np.abs(turn) > 1e-9
+            circle = np.abs(speed / np.where(turning, turn, 1.0)) + speed * world.dt
+            centre_x = x - np.sin(heading) * speed / np.where(turning, turn, 1.0)
+            centre_y = y + np.cos(heading) * speed / np.where(turning, turn, 1.0)
+            on_screen = (
+                (centre_x - circle >= 0) & (centre_x + circle <= world.width)
+                & (centre_y - circle >= 0) & (centre_y + circle <= world.height)
+            )
+            settled = (count >= self.settle_steps) & turning & on_screen
+            count[settled] = 0
+            track["count"][awake] = count
+            if settled.any():
+                world.sleep(
+                    pop, awake[settled], speed[settled], turn[settled],
+                    self.wake_radius(pop, awake[settled], 2 * circle[settled], radius[settled]),
+                )
+
+    def wake_radius(self, pop, index, diameter, radius):
+        """Distance within which a source change can affect an orbiter at
+        index: its sensing reach from anywhere on its circle. Vehicle4a
+        senses up to max_distance; 4aa reads the distance to the nearest
+        source, so only a source that could get nearer than the one it
+        circles (radius away) matters."""
+        if pop.model == "4a":
+            reach = _param(pop, "max_distance", index) + _param(pop, "sensor_dist", index)
+        elif pop.model == "4aa":
+            offset = np.hypot(
+                _param(pop, "sensor_forward", index), _param(pop, "sensor_lateral", index)
+            )
+            reach = radius + self.radius_tolerance + 2 * offset
+        else:
+            return np.inf
+        return reach + diameter
+
+
+class ParkingDetector:
+    """Put vehicles whose motors are both off to sleep where they stand.
+
+    A Vehicle4b_ReLU with both sensors at or below relu_threshold does not
+    move, and nothing changes until what it senses crosses the threshold.
+    With a single light of strength 1 that is the light coming inside the
+    decision boundary the script draws, but the World sums the readings of
+    every source, scaled by strength, so a second light anywhere within
+    sensing range (max_distance plus the sensor offset) can tip it over.
+    Parked vehicles therefore sleep until a source within that range moves,
+    appears or changes strength; the world then senses again for them
+    (World._sources_changed) and wakes only those whose motors come on. The
+    step only costs as much as the vehicles that are still active.
+
+    Other deterministic models can be listed too; they sense again on any
+    source change.
+    """
+
+    def __init__(self, models=("4b",)):
+        self.models = models
+
+    def wake_radius(self, pop, index):
+        if pop.model != "4b":
+            return np.inf
+        return _param(pop, "max_distance", index) + _param(pop, "sensor_dist", index)
+
+    def __call__(self, world):
+        for pop in world.populations:
+            if (pop.model not in self.models or pop.model == "1" or not len(pop)
+                    or pop.noise is not None):
+                continue
+            awake = pop.awake_vehicles()
+            motors = pop.motors[awake]
+            parked = awake[(motors[:, 0] == 0) & (motors[:, 1] == 0)]
+            if len(parked):
+                world.sleep(pop, parked, 0.0, 0.0, self.wake_radius(pop, parked))
+
+
+def entry_times(world, x, y, heading, speed, reach, horizon):
+    """Frames until each vehicle, driving straight, first comes within reach
+    of any static source, or inf if that doesn't happen within horizon
+    frames. Dynamic sources are left to the sleepers' wake radius.
+
+    The path wraps around the screen, so it is tested against every copy of
+    each source the path can get near (source + (k * width, l * height)) in
+    unwrapped coordinates. That can only report entries early, never late.
+    """
+    w, h = world.width, world.height
+    ux = speed * np.cos(heading)
+    uy = speed * np.sin(heading)
+    a = ux * ux + uy * uy
+    travel = np.max(speed * horizon, initial=0.0)
+    far = np.max(reach, initial=0.0) + travel
+    kx = np.arange(-1 - math.ceil(far / w), 2 + math.ceil(far / w)) * w
+    ky = np.arange(-1 - math.ceil(far / h), 2 + math.ceil(far / h)) * h
+    static = ~world.source_dynamic
+    sx, sy = world.source_x[static], world.source_y[static]
+    shape = (len(sx), len(kx), len(ky))
+    copies_x = np.broadcast_to(sx[:, None, None] + kx[None, :, None], shape).ravel()
+    copies_y = np.broadcast_to(sy[:, None, None] + ky[None, None, :], shape).ravel()
+
+    # |(p - c) + u t| = reach, solved for the first t >= 0
+    dx = x[:, None] - copies_x[None, :]
+    dy = y[:, None] - copies_y[None, :]
+    b = 2 * (dx * ux[:, None] + dy * uy[:, None])
+    c = dx * dx + dy * dy - np.reshape(reach, (-1, 1)) ** 2
+    disc = b * b - 4 * a[:, None] * c
+    hit = (disc >= 0) & (b < 0)
+    root = np.sqrt(np.where(hit, disc, 0.0))
+    t = np.where(hit, (-b - root) / (2 * a[:, None]), np.inf)
+    # Starting inside a disc means in range right away
+    t = np.where(c <= 0, 0.0, t)
+    t = t.min(axis=1, initial=np.inf)
+    return np.where(t <= horizon, t, np.inf)
+
+
+class FarFieldDetector:
+    """Fast-forward vehicles that are out of range of every source.
+
+    Out of range, VehicleTwo, Vehicle3a, Vehicle3b and Vehicle3c all run
+    both motors at base speed, so they drive a straight line. Such a vehicle
+    sleeps until it is predicted to come within sensing range of a source
+    (max_distance plus the sensor offset, across the screen wrap), so the
+    world jumps over the empty stretch instead of stepping it. Wake-ups go
+    through the world's priority queue; a dynamic source coming within
+    sensing range of a sleeper wakes it early. Vehicles with no entry in sight are
+    re-checked after driving one screen (horizon). In a world with walls a
+    sleep also ends before the vehicle could reach a wall or the screen
+    edge.
+    """
+
+    def __init__(self, models=("2a", "2b", "3a", "3b", "3c"), min_sleep=2,
+                 chunk=4096):
+        self.models = models
+        self.min_sleep = min_sleep
+        self.chunk = chunk
+
+    def __call__(self, world):
+        for pop in world.populations:
+            if pop.model not in self.models or not len(pop) or pop.noise is not None:
+                continue
+            awake = pop.awake_vehicles()
+            # Nothing sensed by either sensor means every source is out of range
+            blind = awake[(pop.sensors[awake, 0] == 0) & (pop.sensors[awake, 1] == 0)]
+            speed, turn = pop.drive()
+            blind = blind[(speed[blind] > 0) & (turn[blind] == 0)]
+            for start in range(0, len(blind), self.chunk):
+                self._sleep(world, pop, blind[start:start + self.chunk], speed)
+
+    def _sleep(self, world, pop, index, speed):
+        reach = _param(pop, "max_distance", index) + _param(pop, "sensor_dist", index)
+        reach = np.broadcast_to(reach, index.shape)
+        dynamic = np.flatnonzero(world.source_dynamic)
+        if len(dynamic):
+            # Vehicles within reach of a dynamic source stay awake: it changes
+            # every step, and may have changed since they last sensed
+            d = np.hypot(
+                pop.x[index, None] - world.source_x[dynamic],
+                pop.y[index, None] - world.source_y[dynamic],
+            )
+            clear = (d >= reach[:, None]).all(axis=1)
+            index, reach = index[clear], reach[clear]
+        speed = speed[index]
+        horizon = min(world.width, world.height) / speed
+        t = entry_times(
+            world, pop.x[index], pop.y[index], pop.heading[index],
+            speed, reach, horizon,
+        )
+        # Sleep until the last whole step before entering range
+        frames = np.where(np.isfinite(t), t, horizon)
+        if world.n_walls:
+            frames = np.minimum(frames, self._wall_frames(world, pop, index, speed, frames))
+        steps = np.floor(frames / world.dt).astype(np.int64)
+        keep = steps >= self.min_sleep
+        if keep.any():
+            world.sleep(
+                pop, index[keep], speed[keep], 0.0, reach[keep],
+                wake_step=world.step_count + steps[keep],
+            )
+
+    def _wall_frames(self, world, pop, index, speed, frames):
+        """Frames until each vehicle could bounce off a wall or reach the
+        screen edge (walls past the wrap aren't cast against), whichever is
+        first."""
+        x, y, heading = pop.x[index], pop.y[index], pop.heading[index]
+        radius = np.asarray(pop.params["radius"], dtype=float)
+        radius = radius[index] if radius.ndim else radius
+        length = speed * frames + radius
+        t, _ = world.walls().cast(
+            x, y, x + np.cos(heading) * length, y + np.sin(heading) * length
+        )
+        with np.errstate(divide="ignore"):
+            # One frame early: the bounce test looks a step ahead
+            to_wall = (t * length - radius) / speed - 1
+            edge_x = np.where(np.cos(heading) > 0, world.width - x, x) / np.abs(np.cos(heading))
+            edge_y = np.where(np.sin(heading) > 0, world.height - y, y) / np.abs(np.sin(heading))
+        to_edge = (np.minimum(edge_x, edge_y) - radius) / speed - 1
+        return np.minimum(to_wall, to_edge)
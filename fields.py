@@ -0,0 +1,353 @@
+"""
+Fast evaluation of VehicleOne's inverse-square field.
+
+VehicleOne senses sum(10000 / (d^2 + 50)) over every source, with no cutoff,
+so a world of N walkers and M lights costs N * M distance evaluations per
+step. QuadTree is a Barnes-Hut evaluator: sources are grouped into a
+quadtree, and a group that is small as seen from the sensor (cell size /
+distance < theta) counts as all its sources sitting at their centroid.
+theta = 0 is exact; at 0.5 the relative error is about 0.5% on average and
+1% at worst, and the cost grows like N log M instead of N * M (3000 lights
+and 5000 walkers: 0.08 s per step instead of 0.6 s).
+
+Worlds with walls always take the exact sum, since a wall can hide one
+source of a group.
+
+FieldGrid builds the whole field on a grid instead, for drawing it or for
+sampling it at many points. It deposits the sources on the grid and
+convolves that density with the falloff kernel by FFT, so a rebuild costs
+O(G log G) for G cells however many sources there are, instead of O(G * M):
+
+    grid = FieldGrid(world.width, world.height, cell=4, kernel="linear", max_distance=200)
+    field = grid.build(world.source_x, world.source_y)     # (rows, cols) array
+    intensity = grid.sample(px, py)
+
+Kernels are "inverse_square" (VehicleOne), "linear" (the max_distance
+cutoff of Vehicle2/3a/3b/3c) and "gaussian" (Vehicle4aa's response to
+distance, peaking optimal_distance px from the source, 0 by default). By default the
+grid wraps around like the screen; periodic=False gives the open-plane sum
+instead, as VehicleOne senses it. On a 1000 x 1000 screen in 4 px cells,
+2000 sources take 2-3 ms against 5.5 s for the exact sum at every cell; the
+error is below 0.1% of the mean for the smooth kernels, and up to a few
+percent for inverse-square right on top of a source, whose peak is narrower
+than a cell.
+
+    world.field_theta = 0.5     # VehicleOne populations then use the tree
+
+Run this file to time it and measure the error against the exact sum:
+
+    python fields.py --sources 5000 --points 20000 --theta 0.3 0.5 0.8
+    python fields.py --grid --sources 5000 --cell 4
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+
+def inverse_square(d2):
+    """VehicleOne's intensity at squared distance d2."""
+    return 10000 / (d2 + 50)
+
+
+def exact_field(px, py, sx, sy, chunk=2048):
+    """Exact summed inverse-square intensity at every point, in chunks of
+    points to bound memory."""
+    total = np.zeros(len(px))
+    for start in range(0, len(px), chunk):
+        stop = start + chunk
+        d2 = (px[start:stop, None] - sx[None, :]) ** 2 + (py[start:stop, None] - sy[None, :]) ** 2
+        total[start:stop] = inverse_square(d2).sum(axis=1)
+    return total
+
+
+class QuadTree:
+    """Barnes-Hut quadtree over point sources, each with a strength (1 by
+    default). A group counts as its total strength at its centroid."""
+
+    def __init__(self, sx, sy, weights=None, leaf_size=8, max_depth=24):
+        sx = np.asarray(sx, dtype=float)
+        sy = np.asarray(sy, dtype=float)
+        weights = np.ones(len(sx)) if weights is None else np.asarray(weights, dtype=float)
+        self.n_sources = len(sx)
+        # Node arrays, filled breadth first so every node's children are
+        # consecutive: children of i are child_start[i] .. + child_count[i]
+        cx, cy, mass, size, child_start, child_count, first, last = ([] for _ in range(8))
+        order = []
+
+        if len(sx):
+            x0, y0 = sx.min(), sy.min()
+            side = max(sx.max() - x0, sy.max() - y0, 1e-9)
+            queue = [(np.arange(len(sx)), x0, y0, side, 0)]
+            head = 0
+            while head < len(queue):
+                index, nx0, ny0, side, depth = queue[head]
+                head += 1
+                w = weights[index]
+                total = w.sum()
+                if total > 0:
+                    cx.append((sx[index] * w).sum() / total)
+                    cy.append((sy[index] * w).sum() / total)
+                else:
+                    cx.append(sx[index].mean())
+                    cy.append(sy[index].mean())
+                mass.append(total)
+                size.append(side)
+                if len(index) <= leaf_size or depth >= max_depth:
+                    child_start.append(0)
+                    child_count.append(0)
+                    first.append(len(order))
+                    order.extend(index)
+                    last.append(len(order))
+                    continue
+                half = side / 2
+                right = sx[index] >= nx0 + half
+                below = sy[index] >= ny0 + half
+                quadrant = right + 2 * below
+                child_start.append(len(queue))
+                children = 0
+                for q in range(4):
+                    part = index[quadrant == q]
+                    if len(part):
+                        queue.append((part, nx0 + half * (q % 2), ny0 + half * (q // 2), half, depth + 1))
+                        children += 1
+                child_count.append(children)
+                first.append(0)
+                last.append(0)
+
+        self.cx = np.array(cx)
+        self.cy = np.array(cy)
+        self.mass = np.array(mass)
+        self.size = np.array(size)
+        self.child_start = np.array(child_start, dtype=np.intp)
+        self.child_count = np.array(child_count, dtype=np.intp)
+        self.first = np.array(first, dtype=np.intp)
+        self.last = np.array(last, dtype=np.intp)
+        # Sources in leaf order
+        order = np.array(order, dtype=np.intp)
+        self.sx = sx[order] if len(order) else sx
+        self.sy = sy[order] if len(order) else sy
+        self.weights = weights[order] if len(order) else weights
+
+    def field(self, px, py, theta=0.5):
+        """Approximate summed inverse-square intensity at every point."""
+        px = np.asarray(px, dtype=float)
+        py = np.asarray(py, dtype=float)
+        total = np.zeros(len(px))
+        if not self.n_sources or not len(px):
+            return total
+        n = len(px)
+        # Walk the tree for all points at once, one level per pass, as
+        # (point, node) pairs
+        point = np.arange(n)
+        node = np.zeros(n, dtype=np.intp)
+        while len(point):
+            dx = px[point] - self.cx[node]
+            dy = py[point] - self.cy[node]
+            d2 = dx * dx + dy * dy
+            leaf = self.child_count[node] == 0
+            far = ~leaf & (self.size[node] ** 2 < theta * theta * d2)
+            if far.any():
+                total += np.bincount(
+                    point[far], self.mass[node[far]] * inverse_square(d2[far]), n
+                )
+            if leaf.any():
+                # Leaves are summed exactly, source by source
+                p, k = point[leaf], node[leaf]
+                counts = self.last[k] - self.first[k]
+                p = np.repeat(p, counts)
+                offset = np.arange(len(p)) - np.repeat(np.cumsum(counts) - counts, counts)
+                s = np.repeat(self.first[k], counts) + offset
+                d2 = (px[p] - self.sx[s]) ** 2 + (py[p] - self.sy[s]) ** 2
+                total += np.bincount(p, self.weights[s] * inverse_square(d2), n)
+            # Open the rest
+            opened = ~leaf & ~far
+            p, k = point[opened], node[opened]
+            counts = self.child_count[k]
+            point = np.repeat(p, counts)
+            offset = np.arange(len(point)) - np.repeat(np.cumsum(counts) - counts, counts)
+            node = np.repeat(self.child_start[k], counts) + offset
+        return total
+
+
+# --- GRID FIELDS ---
+KERNELS = ("inverse_square", "linear", "gaussian")
+
+
+def kernel_value(kind, d, max_distance=200.0, curve_width=100.0, optimal_distance=0.0):
+    """Intensity at distance d from one source for each kernel."""
+    if kind == "inverse_square":
+        return inverse_square(d * d)
+    if kind == "linear":
+        return np.maximum(0.0, 1.0 - d / max_distance)
+    if kind == "gaussian":
+        return np.exp(-((d - optimal_distance) ** 2) / (2 * curve_width**2))
+    raise ValueError(f"unknown kernel {kind!r}, expected one of {KERNELS}")
+
+
+class FieldGrid:
+    """Summed field of point sources on a grid of cell x cell squares,
+    built by FFT convolution.
+
+    Cell (row, col) holds the field at (col * cell, row * cell). Extra
+    keyword arguments are the kernel's parameters (see kernel_value).
+    """
+
+    def __init__(self, width, height, cell=4.0, kernel="inverse_square", periodic=True,
+                 **params):
+        if kernel not in KERNELS:
+            raise ValueError(f"unknown kernel {kernel!r}, expected one of {KERNELS}")
+        self.width = width
+        self.height = height
+        self.cell = cell
+        self.kernel = kernel
+        self.periodic = periodic
+        self.params = params
+        self.cols = max(1, int(round(width / cell)))
+        self.rows = max(1, int(round(height / cell)))
+        # Open boundaries convolve on a grid twice the size, so no source
+        # reaches around to the other side
+        self.shape = (self.rows, self.cols) if periodic else (2 * self.rows, 2 * self.cols)
+
+        # Kernel value at every grid offset, shortest way round
+        dy = np.arange(self.shape[0])
+        dx = np.arange(self.shape[1])
+        dy = np.minimum(dy, self.shape[0] - dy) * cell
+        dx = np.minimum(dx, self.shape[1] - dx) * cell
+        d = np.hypot(dx[None, :], dy[:, None])
+        self._kernel_fft = np.fft.rfft2(kernel_value(kernel, d, **params))
+        self.field = np.zeros((self.rows, self.cols))
+
+    def deposit(self, sx, sy, weights=None):
+        """Source density on the grid, each source shared between its four
+        nearest cells (cloud in cell)."""
+        sx = np.asarray(sx, dtype=float) / self.cell
+        sy = np.asarray(sy, dtype=float) / self.cell
+        weights = np.ones(len(sx)) if weights is None else np.asarray(weights, dtype=float)
+        col = np.floor(sx).astype(np.intp)
+        row = np.floor(sy).astype(np.intp)
+        fx = sx - col
+        fy = sy - row
+        density = np.zeros(self.shape[0] * self.shape[1])
+        for dr, dc, share in (
+            (0, 0, (1 - fy) * (1 - fx)), (0, 1, (1 - fy) * fx),
+            (1, 0, fy * (1 - fx)), (1, 1, fy * fx),
+        ):
+            r = (row + dr) % self.shape[0]
+            c = (col + dc) % self.shape[1]
+            density += np.bincount(r * self.shape[1] + c, weights * share, len(density))
+        return density.reshape(self.shape)
+
+    def build(self, sx, sy, weights=None):
+        """Rebuild the field from sources at (sx, sy), each with the given
+        strength (1 by default), and return it as a (rows, cols) array."""
+        density = np.fft.rfft2(self.deposit(sx, sy, weights))
+        field = np.fft.irfft2(density * self._kernel_fft, s=self.shape)
+        self.field = field[:self.rows, :self.cols]
+        return self.field
+
+    def sample(self, px, py):
+        """Field at points (px, py), interpolated between the four nearest
+        cells (wrapping around the grid)."""
+        px = np.asarray(px, dtype=float) / self.cell
+        py = np.asarray(py, dtype=float) / self.cell
+        col = np.floor(px).astype(np.intp)
+        row = np.floor(py).astype(np.intp)
+        fx = px - col
+        fy = py - row
+        f = self.field
+        r0, r1 = row % self.rows, (row + 1) % self.rows
+        c0, c1 = col % self.cols, (col + 1) % self.cols
+        return (
+            (1 - fy) * ((1 - fx) * f[r0, c0] + fx * f[r0, c1])
+            + fy * ((1 - fx) * f[r1, c0] + fx * f[r1, c1])
+        )
+
+
+def grid_error(n_sources=5000, cell=4.0, kernel="inverse_square", size=1000.0, seed=0,
+               **params):
+    """Time and error of FieldGrid against the exact periodic sum on every
+    cell, for uniformly scattered sources. Errors are relative to the
+    field's mean. Returns a dict."""
+    rng = np.random.default_rng(seed)
+    sx, sy = rng.uniform(0, size, (2, n_sources))
+    grid = FieldGrid(size, size, cell, kernel, **params)
+    gy, gx = np.mgrid[0:grid.rows, 0:grid.cols] * cell
+    px, py = gx.ravel(), gy.ravel()
+
+    start = time.perf_counter()
+    exact = np.zeros(len(px))
+    for first in range(0, len(px), 1024):
+        dx = np.abs(px[first:first + 1024, None] - sx[None, :])
+        dy = np.abs(py[first:first + 1024, None] - sy[None, :])
+        d = np.hypot(np.minimum(dx, size - dx), np.minimum(dy, size - dy))
+        exact[first:first + 1024] = kernel_value(kernel, d, **params).sum(axis=1)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    field = grid.build(sx, sy).ravel()
+    grid_time = time.perf_counter() - start
+
+    error = np.abs(field - exact) / exact.mean()
+    return dict(
+        exact_time=exact_time, grid_time=grid_time, cells=len(px),
+        mean_error=float(error.mean()), max_error=float(error.max()),
+    )
+
+
+def field_error(n_sources=5000, n_points=20000, theta=0.5, size=4000.0, seed=0):
+    """Time and relative error of QuadTree against the exact sum, for
+    uniformly scattered sources and points. Returns a dict."""
+    rng = np.random.default_rng(seed)
+    sx, sy = rng.uniform(0, size, (2, n_sources))
+    px, py = rng.uniform(0, size, (2, n_points))
+
+    start = time.perf_counter()
+    exact = exact_field(px, py, sx, sy)
+    exact_time = time.perf_counter() - start
+    start = time.perf_counter()
+    tree = QuadTree(sx, sy)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    approx = tree.field(px, py, theta)
+    tree_time = time.perf_counter() - start
+
+    error = np.abs(approx - exact) / exact
+    return dict(
+        exact_time=exact_time, build_time=build_time, tree_time=tree_time,
+        mean_error=float(error.mean()), max_error=float(error.max()),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fast fields against the exact sum over sources")
+    parser.add_argument("--sources", type=int, default=5000)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--theta", type=float, nargs="+", default=[0.3, 0.5, 0.8])
+    parser.add_argument("--grid", action="store_true", help="time FieldGrid instead of QuadTree")
+    parser.add_argument("--cell", type=float, default=4.0)
+    args = parser.parse_args()
+
+    if args.grid:
+        print(f"{args.sources} sources on a 1000 x 1000 wrapped screen, {args.cell:g} px cells")
+        print(f"{'kernel':>15}{'exact s':>10}{'fft s':>10}{'mean err':>11}{'max err':>11}")
+        for kernel in KERNELS:
+            r = grid_error(args.sources, args.cell, kernel)
+            print(
+                f"{kernel:>15}{r['exact_time']:>10.3f}{r['grid_time']:>10.3f}"
+                f"{r['mean_error']:>11.2e}{r['max_error']:>11.2e}"
+            )
+        return
+
+    print(f"{args.sources} sources, {args.points} points")
+    print(f"{'theta':>6}{'exact s':>10}{'tree s':>10}{'build s':>10}{'mean err':>11}{'max err':>11}")
+    for theta in args.theta:
+        r = field_error(args.sources, args.points, theta)
+        print(
+            f"{theta:>6g}{r['exact_time']:>10.3f}{r['tree_time']:>10.3f}{r['build_time']:>10.3f}"
+            f"{r['mean_error']:>11.2e}{r['max_error']:>11.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Occupancy heatmap of where vehicles spend their time.
+
+With thousands of vehicles on screen individual bodies stop telling you
+anything. Heatmap is a world observer that bins every vehicle position into
+a grid of cells with one np.bincount per population. With decay < 1 older
+visits fade, so the map shows recent activity (where the 3a lovers are
+settling now, rather than everywhere they have been):
+
+    heat = Heatmap(world.width, world.height, cell=4, decay=0.99)
+    world.observers.append(heat)
+    ...
+    heat.draw(screen)        # semi-transparent overlay
+
+draw() fills a small surface through pygame.surfarray in one go and scales
+it up, instead of drawing cells one by one.
+
+    python heatmap.py --model 3a --vehicles 5000
+    python heatmap.py --model 1 --steps 2000 --save spread.png
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from world import MODELS, World
+
+
+class Heatmap:
+    """World observer binning vehicle positions into cell x cell pixel bins.
+
+    models limits the count to some models (all by default). Each sample
+    first multiplies the counts by decay.
+    """
+
+    def __init__(self, width, height, cell=4, decay=1.0, models=None, every=1):
+        self.cell = cell
+        self.decay = decay
+        self.models = models
+        self.every = every
+        self.cols = math.ceil(width / cell)
+        self.rows = math.ceil(height / cell)
+        self.counts = np.zeros((self.rows, self.cols))
+
+    def clear(self):
+        self.counts[:] = 0
+
+    def __call__(self, world):
+        if world.step_count % self.every:
+            return
+        if self.decay != 1.0:
+            self.counts *= self.decay
+        world.sync()
+        for pop in world.populations:
+            if not len(pop) or (self.models and pop.model not in self.models):
+                continue
+            self.add(pop.x, pop.y)
+
+    def add(self, x, y):
+        """Count one visit at each (x, y)."""
+        col = np.clip((x // self.cell).astype(np.intp), 0, self.cols - 1)
+        row = np.clip((y // self.cell).astype(np.intp), 0, self.rows - 1)
+        binned = np.bincount(row * self.cols + col, minlength=self.rows * self.cols)
+        self.counts += binned.reshape(self.counts.shape)
+
+    def normalized(self, log=True):
+        """Counts scaled to 0..1 (log scaled by default, so sparse trails
+        still show next to dense clusters)."""
+        counts = np.log1p(self.counts) if log else self.counts
+        top = counts.max()
+        return counts / top if top > 0 else counts
+
+    def colors(self, log=True):
+        """(rows, cols, 4) uint8 RGBA image: black-red-yellow-white ramp, with
+        empty cells transparent."""
+        level = self.normalized(log)
+        rgba = np.empty(level.shape + (4,), dtype=np.uint8)
+        rgba[..., 0] = np.interp(level, (0, 1 / 3, 1), (0, 255, 255))
+        rgba[..., 1] = np.interp(level, (0, 1 / 3, 2 / 3, 1), (0, 0, 255, 255))
+        rgba[..., 2] = np.interp(level, (0, 2 / 3, 1), (0, 0, 255))
+        rgba[..., 3] = np.where(level > 0, 255, 0)
+        return rgba
+
+    def draw(self, surface, alpha=160, log=True):
+        """Blend the heatmap over surface in world coordinates: each cell
+        covers cell x cell pixels from the top-left corner, whatever the
+        size of the surface, so it lines up with vehicles drawn there."""
+        import pygame
+
+        rgba = self.colors(log)
+        small = pygame.Surface((self.cols, self.rows), pygame.SRCALPHA)
+        # surfarray is indexed (x, y)
+        pygame.surfarray.pixels3d(small)[...] = rgba[..., :3].transpose(1, 0, 2)
+        pygame.surfarray.pixels_alpha(small)[...] = (rgba[..., 3].T * (alpha / 255)).astype(np.uint8)
+        size = (self.cols * self.cell, self.rows * self.cell)
+        surface.blit(pygame.transform.scale(small, size), (0, 0))
+
+
+# --- DEMO ---
+def main():
+    parser = argparse.ArgumentParser(description="Population heatmap of one model")
+    parser.add_argument("--model", default="3a", choices=MODELS)
+    parser.add_argument("--vehicles", type=int, default=5000)
+    parser.add_argument("--cell", type=int, default=4)
+    parser.add_argument("--decay", type=float, default=0.995)
+    parser.add_argument("--steps", type=int, default=0, help="run headless for this many steps")
+    parser.add_argument("--save", help="with --steps, save the heatmap to this image")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    world = World(900, 700, seed=args.seed)
+    world.add_source(300, 350)
+    world.add_source(600, 350)
+    world.add_population(
+        args.model,
+        world.rng.uniform(0, world.width, args.vehicles),
+        world.rng.uniform(0, world.height, args.vehicles),
+        world.rng.uniform(0, 2 * math.pi, args.vehicles),
+    )
+    heat = Heatmap(world.width, world.height, args.cell, args.decay)
+    world.observers.append(heat)
+
+    import pygame
+
+    if args.steps:
+        for _ in range(args.steps):
+            world.step()
+        if args.save:
+            surface = pygame.Surface((world.width, world.height))
+            heat.draw(surface, alpha=255)
+            pygame.image.save(surface, args.save)
+        return
+
+    from display import get_screen
+
+    screen = get_screen((world.width, world.height), f"Heatmap: {args.vehicles} x {args.model}")
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        world.step()
+        screen.fill((20, 20, 30))
+        heat.draw(screen)
+        for x, y in zip(world.source_x, world.source_y):
+            pygame.draw.circle(screen, (255, 255, 0), (int(x), int(y)), 10, 2)
+        pygame.display.flip()
+        clock.tick(60)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Integrators for differential-drive motion.
+
+Every script moves its vehicle with first-order Euler: turn, then drive
+straight along the new heading. That is only accurate for small steps, so the
+trajectory depends on the frame rate. World(dt=..., integrator=...) can use:
+
+    "euler"     the scripts' update, exact match with dt=1
+    "arc"       follows the exact circular arc the vehicle drives when its
+                motor speeds stay constant over the step
+    "midpoint"  arc, but with the motor speeds sensed halfway along the step;
+                second order for sensor-driven dynamics
+    "rk4"       Runge-Kutta 4: senses three more times along the step and
+                drives one arc with the weighted mean of the four controls
+
+All four work on whole arrays of vehicles at once.
+
+Run this file to measure the position error of each integrator against a
+fine-step reference, e.g.
+
+    python integrators.py --model 4a --duration 120
+
+It also prints the largest step at least as accurate as Euler at dt=1. In
+those single-light scenes (120 frames, 200 vehicles), the largest step
+whose mean error stays below Euler's at dt=1 is (mean error in px there,
+and at the next step tried):
+
+    model   euler dt=1   midpoint                  rk4
+    2b      2.51 px      dt=6  (2.07; 3.46 at 8)   dt=10 (2.00)
+    3a      0.82 px      dt=4  (0.51; 0.85 at 5)   dt=8  (0.79; 1.60 at 10)
+    4a      7.94 px      dt=6  (5.79; 8.78 at 8)   dt=10 (5.88)
+    4b      1.34 px      dt=6  (0.69; 1.36 at 8)   dt=10 (0.63)
+
+So rk4 reaches 10x larger steps at Euler's accuracy for 2b, 4a and 4b, and
+midpoint 6x. 3a, which turns more sharply, falls short: midpoint only
+reaches 4x, and rk4 8x rather than 10x. Max errors don't follow the same
+pattern (4a's orbits are chaotic: a few vehicles end up on another orbit at
+any step size). Midpoint senses twice per step and rk4 four times, so in
+wall time (20000 vehicles) those steps are 2-3.5x faster than Euler at
+dt=1, not 6-10x.
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+INTEGRATORS = ("euler", "arc", "midpoint", "rk4")
+
+
+def euler(x, y, heading, speed, turn, dt):
+    """Turn first, then drive straight along the new heading (the scripts'
+    update, scaled by dt)."""
+    heading = heading + turn * dt
+    return (
+        x + speed * dt * np.cos(heading),
+        y + speed * dt * np.sin(heading),
+        heading,
+    )
+
+
+def arc(x, y, heading, speed, turn, dt):
+    """Exact motion for constant speed and turn rate over dt.
+
+    The vehicle drives a circular arc; the chord to its end point points
+    along the mean heading and has length speed*dt*sinc(turn*dt/2), which is
+    well behaved all the way down to straight-line motion.
+    """
+    half_turn = turn * dt / 2
+    chord = speed * dt * np.sinc(half_turn / np.pi)
+    direction = heading + half_turn
+    return (
+        x + chord * np.cos(direction),
+        y + chord * np.sin(direction),
+        heading + turn * dt,
+    )
+
+
+def coast(x, y, heading, speed, turn, dt, steps, integrator):
+    """Closed form for `steps` steps at constant speed and turn.
+
+    Gives the same result as calling the integrator that many times, in one
+    go, which is what lets settled vehicles sleep.
+    """
+    if integrator in ("arc", "midpoint", "rk4"):
+        # All follow the exact arc when nothing changes
+        return arc(x, y, heading, speed, turn, dt * steps)
+    # Euler visits headings h + a, h + 2a, ... h + k*a; the sum of those unit
+    # vectors has a closed form (a Dirichlet kernel)
+    a = turn * dt
+    sin_half = np.sin(a / 2)
+    straight = np.abs(sin_half) < 1e-12
+    ratio = np.where(
+        straight, steps, np.sin(steps * a / 2) / np.where(straight, 1.0, sin_half)
+    )
+    direction = heading + (steps + 1) * a / 2
+    distance = speed * dt * ratio
+    return (
+        x + distance * np.cos(direction),
+        y + distance * np.sin(direction),
+        heading + steps * a,
+    )
+
+
+# --- ACCURACY ---
+def _scene(model, dt, integrator, n, seed):
+    from world import World
+
+    world = World(900, 700, seed=seed, dt=dt, integrator=integrator)
+    world.add_source(450, 350)
+    rng = np.random.default_rng(seed)
+    world.add_population(
+        model,
+        rng.uniform(150, 750, n),
+        rng.uniform(100, 600, n),
+        rng.uniform(0, 2 * math.pi, n),
+    )
+    return world
+
+
+def trajectory_error(model, dt, integrator, duration=120, reference_dt=1 / 32,
+                     n=200, seed=0):
+    """Mean and max position error (px) after `duration` frames, against a
+    midpoint run with a step of reference_dt frames."""
+    steps = round(duration / dt)
+    world = _scene(model, dt, integrator, n, seed)
+    for _ in range(steps):
+        world.step()
+
+    reference = _scene(model, reference_dt, "midpoint", n, seed)
+    for _ in range(round(steps * dt / reference_dt)):
+        reference.step()
+
+    a, b = world.populations[0], reference.populations[0]
+    # Distance on the wrapped screen
+    dx = np.abs(a.x - b.x)
+    dy = np.abs(a.y - b.y)
+    dx = np.minimum(dx, world.width - dx)
+    dy = np.minimum(dy, world.height - dy)
+    error = np.hypot(dx, dy)
+    return float(error.mean()), float(error.max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Integrator accuracy against a fine-step reference")
+    parser.add_argument("--model", default="4a")
+    parser.add_argument("--duration", type=float, default=120)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--dt", type=float, nargs="+", default=[1, 2, 4, 5, 6, 8, 10])
+    args = parser.parse_args()
+
+    print(f"model {args.model}, {args.duration:g} frames, mean / max error in px")
+    print(f"{'dt':>6}" + "".join(f"{name:>22}" for name in INTEGRATORS))
+    means = {}
+    for dt in args.dt:
+        row = f"{dt:>6g}"
+        for integrator in INTEGRATORS:
+            mean, worst = trajectory_error(
+                args.model, dt, integrator, args.duration, n=args.vehicles
+            )
+            means[integrator, dt] = mean
+            row += f"{mean:>12.3f} /{worst:>8.2f}"
+        print(row)
+
+    baseline = means.get(("euler", 1))
+    if baseline is None:
+        return
+    # The largest step at least as accurate as the scripts' own update
+    print(f"largest dt with a mean error <= euler at dt=1 ({baseline:.3f}):")
+    for integrator in INTEGRATORS:
+        good = [dt for dt in args.dt if means[integrator, dt] <= baseline]
+        print(f"{integrator:>10}: {max(good):g}" if good else f"{integrator:>10}: none")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Streaming behaviour metrics for headless worlds.
+
+Telling a lover from an explorer, or an orbiter from an aggressor, used to
+mean watching the window. Metrics is a world observer that keeps a handful
+of running totals per vehicle instead, so a long run (or a whole sweep)
+reports its behaviour without storing any trajectory:
+
+    metrics = Metrics()
+    world.observers.append(metrics)
+    ...
+    results = metrics.results()[0]     # one dict per population
+
+Per vehicle it tracks
+
+    time_in_range   frames spent within sensing range of each source, (n, m)
+    distance_mean   mean distance to the nearest source, over the samples
+                    taken while the world had sources
+    distance_std    its standard deviation (Welford's running variance)
+    contacts        times the body touched a source, counted on arrival
+    orbit_radius    path length over total heading change, the radius of the
+                    circle the vehicle drives on average (inf if straight)
+    tortuosity      path length over net displacement, 1 for a straight line
+
+Memory is a few numbers per vehicle (and per vehicle and source for the
+range and contact state), however long the run. With every=k the samples
+are taken every k steps, which is cheaper but measures the path by its
+chords.
+
+Run this file for a quick report of one model, e.g.
+
+    python metrics.py --model 3a --steps 2000
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from world import MODELS, World
+
+
+def sensing_range(pop):
+    """Distance from a source within which a vehicle of pop senses it.
+
+    The linear-falloff models stop sensing at max_distance. Vehicle4aa's
+    gaussian never reaches zero, so its range is taken as two curve widths
+    past the optimal distance, and VehicleOne's as where the inverse-square
+    intensity drops below 1.
+    """
+    p = pop.params
+    if "max_distance" in p:
+        return p["max_distance"]
+    if pop.model == "4aa":
+        return p["optimal_distance"] + 2 * p["curve_width"]
+    return math.sqrt(10000 - 50)
+
+
+class Metrics:
+    """World observer accumulating behaviour metrics for every vehicle.
+
+    reach overrides sensing_range() for every population. Tracking restarts
+    for a population whose size changes.
+    """
+
+    def __init__(self, every=1, reach=None):
+        self.every = every
+        self.reach = reach
+        # id(population) -> (population, accumulators)
+        self._tracks = {}
+
+    def _track(self, world, pop):
+        entry = self._tracks.get(id(pop))
+        if entry is None or entry[0] is not pop or len(entry[1]["samples"]) != len(pop):
+            n, m = len(pop), world.n_sources
+            track = dict(
+                samples=np.zeros(n, dtype=np.int64),
+                # Samples taken while there were sources, for the distances
+                sourced=np.zeros(n, dtype=np.int64),
+                in_range=np.zeros((n, m), dtype=np.int64),
+                touching=np.zeros((n, m), dtype=bool),
+                contacts=np.zeros(n, dtype=np.int64),
+                mean=np.zeros(n), m2=np.zeros(n),
+                path=np.zeros(n), turned=np.zeros(n),
+                net=np.zeros((n, 2)),
+                last=np.column_stack((pop.x, pop.y, pop.heading)),
+            )
+            self._tracks[id(pop)] = entry = (pop, track)
+        return entry[1]
+
+    def __call__(self, world):
+        if world.step_count % self.every:
+            return
+        # Sleeping vehicles are measured where they have coasted to
+        world.sync()
+        for pop in world.populations:
+            if len(pop):
+                self._sample(world, pop, self._track(world, pop))
+
+    def _sample(self, world, pop, track):
+        m = world.n_sources
+        grown = m - track["in_range"].shape[1]
+        if grown > 0:
+            # Sources added since tracking started
+            track["in_range"] = np.pad(track["in_range"], ((0, 0), (0, grown)))
+            track["touching"] = np.pad(track["touching"], ((0, 0), (0, grown)))
+
+        # --- Path ---
+        x, y, heading = pop.x, pop.y, pop.heading
+        dx = x - track["last"][:, 0]
+        dy = y - track["last"][:, 1]
+        # Undo the screen wrap: no vehicle crosses half a screen in a sample
+        dx -= np.round(dx / world.width) * world.width
+        dy -= np.round(dy / world.height) * world.height
+        track["path"] += np.hypot(dx, dy)
+        track["net"][:, 0] += dx
+        track["net"][:, 1] += dy
+        turned = heading - track["last"][:, 2]
+        # float32 worlds keep headings within one turn
+        turned -= np.round(turned / (2 * math.pi)) * 2 * math.pi
+        track["turned"] += np.abs(turned)
+        track["last"] = np.column_stack((x, y, heading))
+
+        track["samples"] += 1
+        if not m:
+            return
+
+        # --- Sources ---
+        d = world.distances(x, y)
+        reach = sensing_range(pop) if self.reach is None else self.reach
+        track["in_range"][:, :m] += d <= np.reshape(reach, (-1, 1))
+        touching = d <= world.source_radius[None, :] + np.reshape(pop.params["radius"], (-1, 1))
+        track["contacts"] += (touching & ~track["touching"][:, :m]).sum(axis=1)
+        track["touching"][:, :m] = touching
+
+        # Welford's update for the nearest distance
+        track["sourced"] += 1
+        nearest = d.min(axis=1)
+        delta = nearest - track["mean"]
+        track["mean"] += delta / track["sourced"]
+        track["m2"] += delta * (nearest - track["mean"])
+
+    def results(self, world=None):
+        """Metrics so far, one dict of per-vehicle arrays per tracked
+        population (in world.populations order when world is given)."""
+        pops = world.populations if world is not None else [p for p, _ in self._tracks.values()]
+        frames = self.every * (world.dt if world is not None else 1.0)
+        out = []
+        for pop in pops:
+            entry = self._tracks.get(id(pop))
+            if entry is None or entry[0] is not pop:
+                continue
+            track = entry[1]
+            sourced = np.maximum(track["sourced"], 1)
+            net = np.hypot(track["net"][:, 0], track["net"][:, 1])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                orbit = np.where(track["turned"] > 0, track["path"] / track["turned"], np.inf)
+                tortuosity = np.where(net > 0, track["path"] / net, np.inf)
+            tortuosity[track["path"] == 0] = 1.0
+            out.append(dict(
+                model=pop.model,
+                samples=track["samples"].copy(),
+                time_in_range=track["in_range"] * frames,
+                distance_mean=track["mean"].copy(),
+                distance_std=np.sqrt(track["m2"] / sourced),
+                contacts=track["contacts"].copy(),
+                orbit_radius=orbit,
+                tortuosity=tortuosity,
+            ))
+        return out
+
+
+# --- REPORT ---
+def main():
+    parser = argparse.ArgumentParser(description="Behaviour metrics of one model around a single light")
+    parser.add_argument("--model", default="3a", choices=MODELS)
+    parser.add_argument("--vehicles", type=int, default=500)
+    parser.add_argument("--steps", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    world = World(900, 700, seed=args.seed)
+    world.add_source(450, 350)
+    world.add_population(
+        args.model,
+        world.rng.uniform(0, world.width, args.vehicles),
+        world.rng.uniform(0, world.height, args.vehicles),
+        world.rng.uniform(0, 2 * math.pi, args.vehicles),
+    )
+    metrics = Metrics()
+    world.observers.append(metrics)
+    for _ in range(args.steps):
+        world.step()
+
+    r = metrics.results(world)[0]
+    print(f"model {args.model}, {args.vehicles} vehicles, {args.steps} steps (median over vehicles)")
+    print(f"  time in range   {np.median(r['time_in_range'][:, 0]) / args.steps:.1%}")
+    print(f"  distance        {np.median(r['distance_mean']):.1f} +- {np.median(r['distance_std']):.1f} px")
+    print(f"  contacts        {np.median(r['contacts']):g}")
+    print(f"  orbit radius    {np.median(r['orbit_radius']):.1f} px")
+    print(f"  tortuosity      {np.median(r['tortuosity']):.2f}")
+
+
+if __name__ == "__main__":
+    main()
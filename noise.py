@@ -0,0 +1,236 @@
+"""
+Sensor and motor noise from counter-based random streams.
+
+A population with a Noise perturbs what its sensors read and what its
+motors are sent, every step, with any sequence of
+
+    ("gaussian", std)           reading + N(0, std)
+    ("uniform", half_width)     reading + U(-half_width, half_width)
+    ("multiplicative", std)     reading * (1 + N(0, std))
+    ("dropout", p)              reading = 0 with probability p
+
+    pop.noise = Noise(sensors=[("gaussian", 0.02), ("dropout", 0.05)],
+                      motors=[("multiplicative", 0.1)], seed=7)
+
+The numbers don't come from the world's RNG. Every draw is Philox4x32-10
+(Salmon et al., "Parallel random numbers: as easy as 1, 2, 3") of a counter
+made of the vehicle's id (Population.vehicle_ids), the step, and which
+reading and which noise term it is for, under the key `seed`. A vehicle's
+noise is therefore a pure function of who it is and when, whatever else is
+running: a population stepped in one process, split into chunks over many,
+with some of it asleep, or resumed from a snapshot sees exactly the same
+noise, as long as each vehicle keeps its id. Splits set Population.ids to
+the vehicles' positions in the whole population.
+
+pop.sensors and pop.motors record the noisy values. Each step draws once
+per channel (the motors, the sensors) for the whole population: one Philox
+counter per vehicle gives four uniforms, and its ten rounds are a few dozen
+numpy integer operations over every vehicle at once. A million normals take
+about 120 ms (default_rng, whose stream can't be split by vehicle, about
+20 ms); 100 000 Vehicle2b with the noise above step in about 100 ms
+instead of 50.
+
+    python noise.py --vehicles 10000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+KINDS = ("gaussian", "uniform", "multiplicative", "dropout")
+
+# Philox4x32 multipliers and Weyl key increments
+_M0 = np.uint64(0xD2511F53)
+_M1 = np.uint64(0xCD9E8D57)
+_W0 = np.uint64(0x9E3779B9)
+_W1 = np.uint64(0xBB67AE85)
+_MASK = np.uint64(0xFFFFFFFF)
+_32 = np.uint64(32)
+# Counters per pass of uniforms()
+_CHUNK = 16384
+
+
+# --- STREAMS ---
+def philox(c0, c1, c2, c3, seed, rounds=10):
+    """Philox4x32 of the counter words c0..c3 (arrays of equal shape, values
+    below 2**32) under a 64-bit key. Returns four new uint64 arrays of 32-bit
+    words."""
+    c0, c1, c2, c3 = (np.array(c, dtype=np.uint64) for c in (c0, c1, c2, c3))
+    p0 = np.empty_like(c0)
+    p1 = np.empty_like(c0)
+    k0 = seed & 0xFFFFFFFF
+    k1 = (seed >> 32) & 0xFFFFFFFF
+    for _ in range(rounds):
+        np.multiply(c0, _M0, out=p0)
+        np.multiply(c2, _M1, out=p1)
+        # (c0, c1, c2, c3) = (hi(p1) ^ c1 ^ k0, lo(p1), hi(p0) ^ c3 ^ k1, lo(p0)),
+        # in place
+        np.right_shift(p1, _32, out=c0)
+        c0 ^= c1
+        c0 ^= np.uint64(k0)
+        np.bitwise_and(p1, _MASK, out=c1)
+        np.right_shift(p0, _32, out=c2)
+        c2 ^= c3
+        c2 ^= np.uint64(k1)
+        np.bitwise_and(p0, _MASK, out=c3)
+        k0 = (k0 + _W0) & 0xFFFFFFFF
+        k1 = (k1 + _W1) & 0xFFFFFFFF
+    return c0, c1, c2, c3
+
+
+def uniforms(ids, step, seed, stream, count):
+    """(len(ids), count) uniform draws in (0, 1), at 32-bit resolution: the
+    draws of stream (0-255) at step (below 2**40) for each vehicle id."""
+    ids = np.asarray(ids, dtype=np.uint64)
+    n = len(ids)
+    blocks = -(-count // 4)
+    # Counter: id (64 bits), step (40 bits), stream (8 bits), block (16 bits).
+    # One counter per (vehicle, block), each giving four draws
+    block = np.arange(blocks, dtype=np.uint64) << np.uint64(16)
+    c3 = np.tile(block | np.uint64(((step >> 32) & 0xFF) | (stream << 8)), n)
+    ids = np.repeat(ids, blocks)
+    words = np.empty((n * blocks, 4))
+    # In chunks that stay in cache through the ten rounds
+    for start in range(0, n * blocks, _CHUNK):
+        part = slice(start, start + _CHUNK)
+        c0 = ids[part] & _MASK
+        step_words = np.full_like(c0, step & 0xFFFFFFFF)
+        for column, w in enumerate(philox(c0, ids[part] >> _32, step_words, c3[part], seed)):
+            words[part, column] = w
+    words += 0.5
+    words *= 2.0**-32
+    return words.reshape(n, 4 * blocks)[:, :count]
+
+
+def _box_muller(u, count):
+    """count standard normals per row from 2 * ceil(count / 2) uniforms."""
+    pairs = u.shape[1] // 2
+    r = np.sqrt(-2.0 * np.log(u[:, :pairs]))
+    angle = 2 * np.pi * u[:, pairs:]
+    # The sines only as far as they are needed
+    rest = count - pairs
+    return np.concatenate((r * np.cos(angle), r[:, :rest] * np.sin(angle[:, :rest])), axis=1)
+
+
+def normals(ids, step, seed, stream, count):
+    """(len(ids), count) standard normal draws (Box-Muller of uniforms())."""
+    return _box_muller(uniforms(ids, step, seed, stream, 2 * -(-count // 2)), count)
+
+
+# --- NOISE ---
+def _terms(terms):
+    terms = [(str(kind), float(amount)) for kind, amount in terms]
+    for kind, amount in terms:
+        if kind not in KINDS:
+            raise ValueError(f"unknown noise {kind!r}, expected one of {KINDS}")
+        if amount < 0 or (kind == "dropout" and amount > 1):
+            raise ValueError(f"bad amount {amount} for {kind} noise")
+    return terms
+
+
+class Noise:
+    """Noise terms on a population's sensor readings and motor outputs,
+    applied in order."""
+
+    def __init__(self, sensors=(), motors=(), seed=0):
+        self.sensors = _terms(sensors)
+        self.motors = _terms(motors)
+        self.seed = int(seed)
+
+    def apply(self, values, ids, step, channel):
+        """values (n, k) with the noise of channel added: 0 for the motors,
+        1 + kind for the readings of sources of that kind (the models other
+        than 3c sense everything as kind 0)."""
+        terms = self.motors if channel == 0 else self.sensors
+        if not terms:
+            return values
+        k = values.shape[1]
+        # Every term's draws come from one call: a normal takes two
+        # uniforms for each pair of readings
+        sizes = [2 * -(-k // 2) if kind in ("gaussian", "multiplicative") else k for kind, _ in terms]
+        u = uniforms(ids, step, self.seed, channel, sum(sizes))
+        offset = 0
+        for (kind, amount), size in zip(terms, sizes):
+            draw = u[:, offset:offset + size]
+            offset += size
+            if kind == "gaussian":
+                values = values + amount * _box_muller(draw, k)
+            elif kind == "uniform":
+                values = values + amount * (2 * draw - 1)
+            elif kind == "multiplicative":
+                values = values * (1 + amount * _box_muller(draw, k))
+            else:
+                values = np.where(draw < amount, 0.0, values)
+        return values
+
+    def to_dict(self):
+        return dict(
+            sensors=[list(t) for t in self.sensors],
+            motors=[list(t) for t in self.motors],
+            seed=self.seed,
+        )
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec.get("sensors", ()), spec.get("motors", ()), spec.get("seed", 0))
+
+    def __repr__(self):
+        return f"Noise(sensors={self.sensors}, motors={self.motors}, seed={self.seed})"
+
+
+# --- REPORT ---
+def main():
+    parser = argparse.ArgumentParser(description="Noisy vehicles, in one piece and split in chunks")
+    parser.add_argument("--model", default="2b")
+    parser.add_argument("--vehicles", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from world import World
+
+    noise = Noise(
+        sensors=[("gaussian", 0.02), ("dropout", 0.05)], motors=[("multiplicative", 0.1)],
+        seed=args.seed,
+    )
+    rng = np.random.default_rng(args.seed)
+    x = rng.uniform(0, 1000, args.vehicles)
+    y = rng.uniform(0, 700, args.vehicles)
+    heading = rng.uniform(0, 2 * np.pi, args.vehicles)
+
+    def run(ranges):
+        world = World(1000, 700)
+        world.add_source(300, 300)
+        world.add_source(700, 400)
+        for start, stop in ranges:
+            pop = world.add_population(
+                args.model, x[start:stop], y[start:stop], heading[start:stop]
+            )
+            pop.noise = noise
+            pop.ids = np.arange(start, stop)
+        t0 = time.perf_counter()
+        for _ in range(args.steps):
+            world.step()
+        elapsed = time.perf_counter() - t0
+        return np.concatenate([p.x for p in world.populations]), elapsed
+
+    whole, elapsed = run([(0, args.vehicles)])
+    bounds = np.linspace(0, args.vehicles, args.chunks + 1).astype(int)
+    split, _ = run(list(zip(bounds[:-1], bounds[1:])))
+    print(f"{args.vehicles} vehicles, {args.steps} steps: {elapsed:.2f} s with noise")
+    print(f"in {args.chunks} chunks: largest difference {np.abs(whole - split).max()} px")
+
+    ids = np.arange(1_000_000)
+    t0 = time.perf_counter()
+    normals(ids, 0, args.seed, 0, 1)
+    t1 = time.perf_counter()
+    np.random.default_rng(args.seed).normal(size=1_000_000)
+    t2 = time.perf_counter()
+    print(f"1M normals: {1000 * (t1 - t0):.1f} ms counter-based, "
+          f"{1000 * (t2 - t1):.1f} ms default_rng")
+
+
+if __name__ == "__main__":
+    main()
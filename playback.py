@@ -0,0 +1,242 @@
+"""
+Record and replay the mouse and keyboard input of the scripts.
+
+What the scripts do depends on live input (the light follows the mouse,
+sources are dragged, a click teleports Vehicle4a to a random spot), so no two
+interactive runs are alike. Every script reads its input through an input
+source from this module instead of pygame.event directly:
+
+    python vehicle3a.py --record run.jsonl     # play normally, save the input
+    python vehicle3a.py --play run.jsonl       # replay it, frame for frame
+    python vehicle3a.py --play run.jsonl --unthrottled
+
+A recording is JSON lines: a header with the seed of the `random` module
+(which the scripts use for teleports and Brownian turning), then one line per
+event with the frame it arrived in. Replays hand the same events to the same
+frames and reseed `random` the same way, so the run is identical. When the
+recording ends the player sends QUIT and prints frame-time statistics (the
+time spent per frame, excluding the frame-rate limiter); --unthrottled drops
+the limiter too, for benchmarks.
+
+Recordings also drive headless worlds, see play_world().
+"""
+
+import argparse
+import json
+import random
+import time
+
+# Event attributes worth recording, by event type name
+RECORDED = {
+    "MOUSEMOTION": ("pos", "rel", "buttons"),
+    "MOUSEBUTTONDOWN": ("pos", "button"),
+    "MOUSEBUTTONUP": ("pos", "button"),
+    "KEYDOWN": ("key", "mod"),
+    "KEYUP": ("key", "mod"),
+    "QUIT": (),
+}
+
+
+class LiveInput:
+    """Plain pygame input, plus frame-time measurement."""
+
+    def __init__(self, unthrottled=False):
+        self.unthrottled = unthrottled
+        self.frame = 0
+        self.frame_times = []
+        self._frame_start = None
+
+    def get(self):
+        """Events of this frame, like pygame.event.get()."""
+        import pygame
+
+        self._start_frame()
+        return pygame.event.get()
+
+    def tick(self, clock, fps):
+        """End the frame: record its time, then clock.tick(fps)."""
+        if self._frame_start is not None:
+            self.frame_times.append(time.perf_counter() - self._frame_start)
+            self._frame_start = None
+        self.frame += 1
+        return clock.tick() if self.unthrottled else clock.tick(fps)
+
+    def close(self):
+        pass
+
+    def _start_frame(self):
+        if self._frame_start is None:
+            self._frame_start = time.perf_counter()
+
+    def report(self):
+        """Frame-time summary in milliseconds, or None before any frame."""
+        if not self.frame_times:
+            return None
+        ms = sorted(t * 1000 for t in self.frame_times)
+
+        def percentile(q):
+            return ms[min(len(ms) - 1, int(q / 100 * len(ms)))]
+
+        return dict(
+            frames=len(ms), mean=sum(ms) / len(ms),
+            p50=percentile(50), p95=percentile(95), p99=percentile(99), max=ms[-1],
+        )
+
+
+class Recorder(LiveInput):
+    """Live input that is also written to a recording."""
+
+    def __init__(self, path, seed=None, unthrottled=False):
+        super().__init__(unthrottled)
+        self.seed = random.randrange(2**32) if seed is None else seed
+        random.seed(self.seed)
+        self._file = open(path, "w")
+        self._file.write(json.dumps({"seed": self.seed}) + "\n")
+
+    def get(self):
+        import pygame
+
+        events = super().get()
+        for event in events:
+            name = pygame.event.event_name(event.type).upper()
+            if name in RECORDED:
+                entry = {"frame": self.frame, "type": name}
+                for attr in RECORDED[name]:
+                    value = getattr(event, attr, None)
+                    entry[attr] = list(value) if isinstance(value, tuple) else value
+                self._file.write(json.dumps(entry) + "\n")
+        return events
+
+    def close(self):
+        self._file.close()
+
+
+class Player(LiveInput):
+    """Replays a recording instead of reading the real mouse and keyboard.
+
+    Window events that were not recorded (closing the window) still work.
+    """
+
+    def __init__(self, path, unthrottled=False):
+        super().__init__(unthrottled)
+        with open(path) as f:
+            header = json.loads(f.readline())
+            entries = [json.loads(line) for line in f if line.strip()]
+        self.seed = header["seed"]
+        random.seed(self.seed)
+        self._entries = entries
+        self._next = 0
+
+    @property
+    def finished(self):
+        return self._next >= len(self._entries)
+
+    def entries(self):
+        """Recorded entries (dicts) of this frame; advances the player."""
+        self._start_frame()
+        out = []
+        while not self.finished and self._entries[self._next]["frame"] <= self.frame:
+            out.append(self._entries[self._next])
+            self._next += 1
+        return out
+
+    def get(self):
+        import pygame
+
+        events = [
+            pygame.event.Event(getattr(pygame, entry["type"]), {
+                k: tuple(v) if isinstance(v, list) else v
+                for k, v in entry.items() if k not in ("frame", "type")
+            })
+            for entry in self.entries()
+        ]
+        # Only the window's own close button gets through live
+        events += [e for e in pygame.event.get() if e.type == pygame.QUIT]
+        if self.finished:
+            events.append(pygame.event.Event(pygame.QUIT))
+        return events
+
+    def close(self):
+        stats = self.report()
+        if stats:
+            print(
+                f"{stats['frames']} frames, frame time ms: mean {stats['mean']:.2f}, "
+                f"p50 {stats['p50']:.2f}, p95 {stats['p95']:.2f}, "
+                f"p99 {stats['p99']:.2f}, max {stats['max']:.2f}"
+            )
+
+
+def from_args(argv=None):
+    """The input source asked for on the command line of a script."""
+    parser = argparse.ArgumentParser(add_help=False)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="PATH")
+    group.add_argument("--play", metavar="PATH")
+    parser.add_argument("--unthrottled", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+    if args.record:
+        return Recorder(args.record, unthrottled=args.unthrottled)
+    if args.play:
+        return Player(args.play, unthrottled=args.unthrottled)
+    return LiveInput(args.unthrottled)
+
+
+# --- HEADLESS ---
+class SourceMouse:
+    """Applies recorded mouse input to the sources of a headless World, the
+    way the scripts do.
+
+        "follow"   source 0 follows the mouse (3a, 3b, 4a)
+        "click"    a click, or a drag with the left button, puts source 0
+                   there (2, 4b)
+        "buttons"  left click moves source 0, right click source 1 (1)
+        "drag"     pick, select and drag sources with editor.Editor (3c, 4aa)
+
+    4a's click-to-teleport changes the vehicle, not the world, and is not
+    replayed.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.editor = None
+
+    def __call__(self, world, entry):
+        kind, pos = entry["type"], entry.get("pos")
+        if self.mode == "follow":
+            if kind == "MOUSEMOTION":
+                world.move_source(0, pos)
+        elif self.mode == "click":
+            if kind == "MOUSEBUTTONDOWN" or (kind == "MOUSEMOTION" and entry["buttons"][0]):
+                world.move_source(0, pos)
+        elif self.mode == "buttons":
+            if kind == "MOUSEBUTTONDOWN" and entry["button"] in (1, 3):
+                world.move_source(0 if entry["button"] == 1 else 1, pos)
+        else:
+            import pygame
+
+            from editor import Editor
+
+            if self.editor is None:
+                self.editor = Editor.for_world(world)
+            self.editor.handle(pygame.event.Event(getattr(pygame, kind), {
+                k: tuple(v) if isinstance(v, list) else v
+                for k, v in entry.items() if k not in ("frame", "type")
+            }))
+
+
+def play_world(world, path, handler, steps=None):
+    """Step a headless world through a recording, one step per recorded
+    frame, applying each frame's input before its step like the scripts.
+
+    Returns the wall time of every step in seconds.
+    """
+    player = Player(path)
+    times = []
+    while (len(times) < steps) if steps is not None else not player.finished:
+        for entry in player.entries():
+            handler(world, entry)
+        start = time.perf_counter()
+        world.step()
+        times.append(time.perf_counter() - start)
+        player.frame += 1
+    return times
@@ -0,0 +1,250 @@
+"""
+Sources that move and change strength on a schedule.
+
+Schedules declares, per source, how its position and strength follow the
+clock (t = world.step_count * world.dt, in frames):
+
+    orbit   circles a centre:   orbit(i, center, radius, period, phase=0)
+    path    follows waypoints at a constant speed in px per frame,
+            looping back to the first one: path(i, waypoints, speed, loop=True)
+    pulse   strength base + amplitude * sin(2 pi t / period + phase)
+    duty    on (strength 1) for the first `duty` fraction of every period,
+            off (0) for the rest
+
+Positions come from orbit or path, one per source. The strength of a
+source with a pulse or a duty cycle is set from them (their product when it
+has both), replacing the strength it was added with. Every schedule of
+every source is evaluated in one vectorized call per step (positions(t),
+strengths(t)); the waypoint paths of all sources share one flat array,
+looked up with a single searchsorted.
+
+    schedules = Schedules()
+    schedules.orbit(0, (450, 350), 200, period=600)
+    schedules.duty(1, period=120, duty=0.25)
+    schedules.attach(world)       # sets t = now and updates after every step
+
+attach() marks the scheduled sources as dynamic (World.set_dynamic), so
+caches built over the sources keep the static ones and take only the
+scheduled ones exactly; for instance, the Barnes-Hut tree of
+World.field_theta is built once over the static lights.
+
+    python schedules.py --vehicles 500
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from world import MODELS, World
+
+
+class Schedules:
+    """Declared motion and strength of some of a world's sources."""
+
+    def __init__(self):
+        # Per kind, one tuple of parameters per scheduled source
+        self._orbits = []
+        self._paths = []
+        self._pulses = []
+        self._duties = []
+        self._compiled = None
+
+    # --- DECLARING ---
+    def _moves(self, source):
+        if source in {o[0] for o in self._orbits} | {p[0] for p in self._paths}:
+            raise ValueError(f"source {source} already has an orbit or a path")
+        self._compiled = None
+
+    def orbit(self, source, center, radius, period, phase=0.0):
+        """Circle center at the given radius, once every period frames."""
+        self._moves(source)
+        self._orbits.append((source, center[0], center[1], radius, period, phase))
+
+    def path(self, source, waypoints, speed, loop=True):
+        """Drive through the waypoints at speed px per frame, starting at
+        the first. A path that doesn't loop stops at its last waypoint."""
+        self._moves(source)
+        points = np.asarray(waypoints, dtype=float).reshape(-1, 2)
+        if loop:
+            points = np.vstack((points, points[:1]))
+        if len(points) < 2:
+            raise ValueError("a path needs at least two waypoints")
+        self._paths.append((source, points, speed, loop))
+
+    def pulse(self, source, period, amplitude=0.5, base=1.0, phase=0.0):
+        self._compiled = None
+        self._pulses.append((source, period, amplitude, base, phase))
+
+    def duty(self, source, period, duty=0.5, phase=0.0):
+        """On for duty * period frames, then off for the rest of the period.
+        phase shifts the cycle, as a fraction of the period."""
+        self._compiled = None
+        self._duties.append((source, period, duty, phase))
+
+    @property
+    def sources(self):
+        """Every scheduled source, sorted."""
+        scheduled = {o[0] for o in self._orbits} | {p[0] for p in self._paths}
+        scheduled |= {p[0] for p in self._pulses} | {d[0] for d in self._duties}
+        return np.array(sorted(scheduled), dtype=np.intp)
+
+    # --- EVALUATING ---
+    def _compile(self):
+        """Flatten the declarations into arrays, once per change."""
+        c = {}
+        orbits = np.array([o[1:] for o in self._orbits], dtype=float).reshape(-1, 5)
+        c["orbit_source"] = np.array([o[0] for o in self._orbits], dtype=np.intp)
+        c["orbit_cx"], c["orbit_cy"], c["orbit_r"], c["orbit_period"], c["orbit_phase"] = orbits.T
+
+        # All waypoints in one array. Each path's cumulative distance is
+        # offset by the total length of the paths before it, so one sorted
+        # array covers them all
+        c["path_source"] = np.array([p[0] for p in self._paths], dtype=np.intp)
+        points, cumulative, lengths, first, last = [], [], [], [], []
+        offset = 0.0
+        for _, pts, _, _ in self._paths:
+            seg = np.hypot(*np.diff(pts, axis=0).T)
+            first.append(sum(len(p) for p in points))
+            points.append(pts)
+            cumulative.append(offset + np.concatenate(([0.0], np.cumsum(seg))))
+            lengths.append(seg.sum())
+            offset += seg.sum()
+            last.append(first[-1] + len(pts) - 2)
+        c["path_points"] = np.vstack(points) if points else np.zeros((0, 2))
+        c["path_cumulative"] = np.concatenate(cumulative) if cumulative else np.zeros(0)
+        c["path_length"] = np.array(lengths)
+        c["path_offset"] = np.cumsum([0.0] + lengths[:-1])
+        c["path_first"] = np.array(first, dtype=np.intp)
+        c["path_last_segment"] = np.array(last, dtype=np.intp)
+        c["path_speed"] = np.array([p[2] for p in self._paths], dtype=float)
+        c["path_loop"] = np.array([p[3] for p in self._paths], dtype=bool)
+
+        pulses = np.array([p[1:] for p in self._pulses], dtype=float).reshape(-1, 4)
+        c["pulse_source"] = np.array([p[0] for p in self._pulses], dtype=np.intp)
+        c["pulse_period"], c["pulse_amplitude"], c["pulse_base"], c["pulse_phase"] = pulses.T
+        duties = np.array([d[1:] for d in self._duties], dtype=float).reshape(-1, 3)
+        c["duty_source"] = np.array([d[0] for d in self._duties], dtype=np.intp)
+        c["duty_period"], c["duty_fraction"], c["duty_phase"] = duties.T
+        self._compiled = c
+        return c
+
+    def positions(self, t):
+        """(index, x, y) of every moving source at time t."""
+        c = self._compiled or self._compile()
+        angle = 2 * math.pi * t / c["orbit_period"] + c["orbit_phase"]
+        ox = c["orbit_cx"] + c["orbit_r"] * np.cos(angle)
+        oy = c["orbit_cy"] + c["orbit_r"] * np.sin(angle)
+
+        travelled = c["path_speed"] * t
+        length = c["path_length"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            looped = np.where(length > 0, np.mod(travelled, length), 0.0)
+        along = np.where(c["path_loop"], looped, np.minimum(travelled, length))
+        target = c["path_offset"] + along
+        segment = np.searchsorted(c["path_cumulative"], target, side="right") - 1
+        # Stay within each path's own segments (the end of a path that
+        # doesn't loop, or rounding at the seam between two paths)
+        segment = np.clip(segment, c["path_first"], c["path_last_segment"])
+        start = c["path_cumulative"][segment]
+        seg_length = c["path_cumulative"][segment + 1] - start
+        with np.errstate(divide="ignore", invalid="ignore"):
+            frac = np.clip(np.where(seg_length > 0, (target - start) / seg_length, 0.0), 0.0, 1.0)
+        a = c["path_points"][segment]
+        b = c["path_points"][segment + 1]
+        px = a[:, 0] + frac * (b[:, 0] - a[:, 0])
+        py = a[:, 1] + frac * (b[:, 1] - a[:, 1])
+
+        return (
+            np.concatenate((c["orbit_source"], c["path_source"])),
+            np.concatenate((ox, px)),
+            np.concatenate((oy, py)),
+        )
+
+    def strengths(self, t):
+        """(index, strength) of every source with a pulse or duty cycle."""
+        c = self._compiled or self._compile()
+        pulse = c["pulse_base"] + c["pulse_amplitude"] * np.sin(
+            2 * math.pi * t / c["pulse_period"] + c["pulse_phase"]
+        )
+        on = np.mod(t / c["duty_period"] + c["duty_phase"], 1.0) < c["duty_fraction"]
+
+        index = np.concatenate((c["pulse_source"], c["duty_source"]))
+        factor = np.concatenate((pulse, on.astype(float)))
+        # A source with several factors gets their product
+        sources, inverse = np.unique(index, return_inverse=True)
+        strength = np.ones(len(sources))
+        np.multiply.at(strength, inverse, factor)
+        return sources, strength
+
+    # --- WORLD ---
+    def apply(self, world, t=None):
+        """Move and scale the world's scheduled sources to time t (the
+        world's current time by default)."""
+        if t is None:
+            t = world.step_count * world.dt
+        index, x, y = self.positions(t)
+        if len(index):
+            world.move_sources(index, x, y)
+        index, strength = self.strengths(t)
+        if len(index):
+            world.set_source_strengths(index, strength)
+
+    def attach(self, world):
+        """Mark the scheduled sources dynamic, apply the schedules now and
+        after every step."""
+        world.set_dynamic(self.sources)
+        self.apply(world)
+        world.observers.append(self)
+
+    def __call__(self, world):
+        self.apply(world)
+
+
+# --- DEMO ---
+def main():
+    parser = argparse.ArgumentParser(description="Scheduled sources around a population")
+    parser.add_argument("--model", default="2b", choices=MODELS)
+    parser.add_argument("--vehicles", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import pygame
+
+    from display import get_screen
+    from render import draw_world
+
+    world = World(1000, 700, seed=args.seed)
+    world.add_source(500, 350)
+    world.add_source(200, 200, "light")
+    world.add_source(800, 500, "light")
+    schedules = Schedules()
+    schedules.orbit(0, (500, 350), 220, period=900)
+    schedules.path(1, [(150, 150), (850, 150), (850, 550), (150, 550)], speed=1.5)
+    schedules.duty(2, period=240, duty=0.5)
+    schedules.pulse(1, period=180, amplitude=0.5)
+    world.add_population(
+        args.model,
+        world.rng.uniform(0, world.width, args.vehicles),
+        world.rng.uniform(0, world.height, args.vehicles),
+        world.rng.uniform(0, 2 * math.pi, args.vehicles),
+        radius=6,
+    )
+    schedules.attach(world)
+
+    screen = get_screen((world.width, world.height), "Scheduled sources")
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        world.step()
+        draw_world(screen, world)
+        pygame.display.flip()
+        clock.tick(60)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
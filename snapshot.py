@@ -0,0 +1,194 @@
+"""
+Binary snapshots of a World, for checkpointing and fast resume.
+
+A snapshot holds everything needed to continue a run exactly: world size,
+step counter, RNG state, every source and every population (model, tuning,
+noise and per-vehicle state). Layout, little-endian:
+
+    magic "BVWS", u16 version, u16 flags, u32 table length
+    table      UTF-8 JSON describing the world and every array
+               (name, dtype, shape, byte offset into the data section)
+    padding    up to a 64 byte boundary, where the data section starts
+    arrays     raw array data, each starting on a 64 byte boundary
+
+load() memory-maps the file and hands out views into it, so resuming a large
+world costs no copying or parsing of the vehicle data. The arrays are mapped
+copy-on-write: the resumed world can be stepped freely without ever touching
+the file on disk.
+
+    save(world, "run.bvws")
+    world = load("run.bvws")
+
+Version 1 files come in every layout the World had while it grew (the first
+held only positions, headings, sensors, motors and sources; integrators,
+sleeping, float32, walls, source strengths and noise each added arrays or
+table entries), so load() treats everything past that first layout as
+optional. Version 2 files leave out the sleep arrays of populations that
+never slept, which version 1 readers would fail on.
+
+Checkpointer is a world observer that writes a snapshot every few steps:
+
+    world.observers.append(Checkpointer("run.bvws", every=10_000))
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from noise import Noise
+from world import Population, World
+
+MAGIC = b"BVWS"
+VERSION = 2
+# Versions load() reads
+VERSIONS = (1, 2)
+HEADER = struct.Struct("<4sHHI")
+ALIGN = 64
+
+
+def _align(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _world_arrays(world):
+    """Name every array in the world, in file order."""
+    arrays = {name: getattr(world, name) for name in World.STATE_ARRAYS}
+    for i, pop in enumerate(world.populations):
+        for name in Population.STATE_ARRAYS:
+            # Sleep arrays are None until a vehicle first sleeps
+            if getattr(pop, name) is not None:
+                arrays[f"{i}.{name}"] = getattr(pop, name)
+        for name, value in pop.params.items():
+            if isinstance(value, np.ndarray):
+                arrays[f"{i}.params.{name}"] = value
+        if pop.ids is not None:
+            arrays[f"{i}.ids"] = pop.ids
+    return arrays
+
+
+def save(world, path):
+    """Write a snapshot of world to path (atomically, via a temporary file)."""
+    arrays = {
+        name: np.ascontiguousarray(value, dtype=value.dtype.newbyteorder("<"))
+        for name, value in _world_arrays(world).items()
+    }
+    table = {
+        "width": world.width,
+        "height": world.height,
+        "step_count": world.step_count,
+        "dt": world.dt,
+        "integrator": world.integrator,
+        "dtype": world.dtype.name,
+        "field_theta": world.field_theta,
+        "rng": world.rng.bit_generator.state,
+        "populations": [
+            {
+                "model": pop.model,
+                "params": {
+                    k: v for k, v in pop.params.items()
+                    if not isinstance(v, np.ndarray)
+                },
+                "noise": pop.noise.to_dict() if pop.noise is not None else None,
+            }
+            for pop in world.populations
+        ],
+        "arrays": {},
+    }
+
+    # Offsets are relative to the start of the data section, which follows
+    # the table at the next 64 byte boundary
+    offset = 0
+    for name, value in arrays.items():
+        table["arrays"][name] = [value.dtype.str, list(value.shape), offset]
+        offset = _align(offset + value.nbytes)
+    encoded = json.dumps(table, separators=(",", ":")).encode()
+    data_start = _align(HEADER.size + len(encoded))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(encoded)))
+        f.write(encoded)
+        for name, value in arrays.items():
+            f.seek(data_start + table["arrays"][name][2])
+            f.write(value.tobytes())
+        # Pad the file out so empty trailing arrays still map
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def read_table(path):
+    """Return (table, data_start) for a snapshot without mapping its arrays."""
+    with open(path, "rb") as f:
+        magic, version, _flags, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a world snapshot")
+        if version not in VERSIONS:
+            raise ValueError(f"unsupported snapshot version {version}")
+        return json.loads(f.read(length)), _align(HEADER.size + length)
+
+
+def load(path, writable=True):
+    """Resume a World from a snapshot.
+
+    With writable=False the arrays are read-only views of the file, which is
+    enough for inspecting a checkpoint but not for stepping it.
+    """
+    table, data_start = read_table(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode="c" if writable else "r")
+
+    def array(name):
+        dtype, shape, offset = table["arrays"][name]
+        return np.ndarray(shape, dtype, mapped, data_start + offset)
+
+    world = World(
+        table["width"], table["height"],
+        dt=table.get("dt", 1.0), integrator=table.get("integrator", "euler"),
+        dtype=table.get("dtype", "float64"),
+    )
+    world.field_theta = table.get("field_theta")
+    world.step_count = table["step_count"]
+    bit_generator = getattr(np.random, table["rng"]["bit_generator"])()
+    bit_generator.state = table["rng"]
+    world.rng = np.random.Generator(bit_generator)
+    for name in World.STATE_ARRAYS:
+        # Snapshots from before walls existed have no wall arrays
+        if name in table["arrays"]:
+            setattr(world, name, array(name))
+    # ... and older ones no source strengths or dynamic flags either
+    if "source_strength" not in table["arrays"]:
+        world.source_strength = np.ones(world.n_sources)
+    if "source_dynamic" not in table["arrays"]:
+        world.source_dynamic = np.zeros(world.n_sources, dtype=bool)
+
+    for i, entry in enumerate(table["populations"]):
+        params = dict(entry["params"])
+        prefix = f"{i}.params."
+        for name in table["arrays"]:
+            if name.startswith(prefix):
+                params[name[len(prefix):]] = array(name)
+        arrays = {
+            name: array(f"{i}.{name}")
+            for name in Population.STATE_ARRAYS if f"{i}.{name}" in table["arrays"]
+        }
+        population = Population.from_arrays(entry["model"], params, arrays)
+        if entry.get("noise") is not None:
+            population.noise = Noise.from_dict(entry["noise"])
+        if f"{i}.ids" in table["arrays"]:
+            population.ids = array(f"{i}.ids")
+        world.populations.append(population)
+    world.rebuild_wake_queue()
+    return world
+
+
+class Checkpointer:
+    """World observer that saves a snapshot every `every` steps."""
+
+    def __init__(self, path, every=1000):
+        self.path = path
+        self.every = every
+
+    def __call__(self, world):
+        if world.step_count % self.every == 0:
+            save(world, self.path)
@@ -0,0 +1,386 @@
+"""
+Live telemetry for headless worlds.
+
+A TelemetryServer runs an asyncio server on a background thread and streams
+compact binary frames to any number of local subscribers. Each frame holds
+the step counter, every source (position and type) and every vehicle
+(position, heading and the sensor/motor values of its last update).
+
+Wire format, all little-endian:
+
+    u32 frame length (bytes that follow)
+    header  "BVTF", u16 version, u16 flags, u64 step, u32 n_sources, u32 n_vehicles
+    n_sources  x f32, y f32, kind u8
+    n_vehicles id u32, model u8, x f32, y f32, heading f32,
+               sensor_l f32, sensor_r f32, motor_l f32, motor_r f32
+
+kind indexes world.SOURCE_TYPES and model indexes world.MODELS. A frame with
+the ERROR flag set holds no sources or vehicles; its header is followed by a
+UTF-8 message instead.
+
+Subscribers open the socket and send one JSON line, for example
+
+    {"decimation": 10, "region": [0, 0, 400, 300]}
+
+to receive every 10th step and only the vehicles inside that rectangle. An
+empty line subscribes to everything. A request that can't be read gets one
+ERROR frame back before the server closes the connection.
+
+The simulation never waits for a subscriber: publish() only copies the
+arrays and hands them to the server thread. Each subscriber keeps at most
+max_pending frames; when it falls behind the oldest frames are dropped, and a
+subscriber that stays stalled for stall_timeout seconds is disconnected.
+
+Run this file to serve a demo world, or with --watch to print what a server
+is streaming:
+
+    python telemetry.py --port 8765
+    python telemetry.py --watch --port 8765 --decimation 30
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from world import MODELS, SOURCE_TYPES, World
+
+# --- WIRE FORMAT ---
+MAGIC = b"BVTF"
+VERSION = 1
+LENGTH = struct.Struct("<I")
+HEADER = struct.Struct("<4sHHQII")
+# Header flags
+ERROR = 1
+SOURCE_DTYPE = np.dtype([("x", "<f4"), ("y", "<f4"), ("kind", "u1")])
+VEHICLE_DTYPE = np.dtype([
+    ("id", "<u4"), ("model", "u1"),
+    ("x", "<f4"), ("y", "<f4"), ("heading", "<f4"),
+    ("sensor", "<f4", (2,)), ("motor", "<f4", (2,)),
+])
+
+
+def encode_frame(step, sources, vehicles):
+    """Pack structured source and vehicle arrays into one length-prefixed frame."""
+    body = b"".join((
+        HEADER.pack(MAGIC, VERSION, 0, step, len(sources), len(vehicles)),
+        sources.tobytes(),
+        vehicles.tobytes(),
+    ))
+    return LENGTH.pack(len(body)) + body
+
+
+def encode_error(message):
+    """An ERROR frame carrying message."""
+    body = HEADER.pack(MAGIC, VERSION, ERROR, 0, 0, 0) + message.encode()
+    return LENGTH.pack(len(body)) + body
+
+
+def decode_frame(body):
+    """Unpack a frame body (without its length prefix).
+
+    Returns (step, sources, vehicles) where sources and vehicles are
+    structured arrays viewing the body without copying. An ERROR frame
+    raises ValueError with the server's message.
+    """
+    magic, version, flags, step, n_sources, n_vehicles = HEADER.unpack_from(body)
+    if magic != MAGIC:
+        raise ValueError("not a telemetry frame")
+    if version != VERSION:
+        raise ValueError(f"unsupported telemetry version {version}")
+    if flags & ERROR:
+        raise ValueError(f"telemetry server: {bytes(body[HEADER.size:]).decode()}")
+    offset = HEADER.size
+    sources = np.frombuffer(body, SOURCE_DTYPE, n_sources, offset)
+    offset += n_sources * SOURCE_DTYPE.itemsize
+    vehicles = np.frombuffer(body, VEHICLE_DTYPE, n_vehicles, offset)
+    return step, sources, vehicles
+
+
+def world_frame(world):
+    """Copy the current state of a world into (sources, vehicles) arrays."""
+    sources = np.empty(world.n_sources, SOURCE_DTYPE)
+    sources["x"] = world.source_x
+    sources["y"] = world.source_y
+    sources["kind"] = world.source_kind
+
+    state = world.vehicle_arrays()
+    vehicles = np.empty(len(state["x"]), VEHICLE_DTYPE)
+    vehicles["id"] = np.arange(len(vehicles))
+    vehicles["model"] = state["model"]
+    vehicles["x"] = state["x"]
+    vehicles["y"] = state["y"]
+    vehicles["heading"] = state["heading"]
+    vehicles["sensor"] = state["sensors"]
+    vehicles["motor"] = state["motors"]
+    return sources, vehicles
+
+
+# --- SERVER ---
+class _Subscriber:
+    def __init__(self, writer, decimation, region, max_pending):
+        self.writer = writer
+        self.decimation = max(1, int(decimation))
+        self.region = region
+        self.queue = asyncio.Queue(max_pending)
+        self.dropped = 0
+        self.stalled_since = None
+
+    def wants(self, step):
+        return step % self.decimation == 0
+
+    def offer(self, step, sources, vehicles):
+        if self.region is not None:
+            x0, y0, x1, y1 = self.region
+            inside = (
+                (vehicles["x"] >= x0) & (vehicles["x"] < x1)
+                & (vehicles["y"] >= y0) & (vehicles["y"] < y1)
+            )
+            vehicles = vehicles[inside]
+        if self.queue.full():
+            # Throttle: the newest frame matters more than the oldest one
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(encode_frame(step, sources, vehicles))
+
+
+class TelemetryServer:
+    """Stream world frames to local subscribers over TCP or a Unix socket.
+
+    Pass path to listen on a Unix socket, otherwise host and port are used
+    (port 0 picks a free port, see .port after start()).
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, path=None,
+                 max_pending=8, stall_timeout=2.0):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_pending = max_pending
+        self.stall_timeout = stall_timeout
+
+        self.subscribers = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        # Raised by the server thread while starting, re-raised by start()
+        self._error = None
+
+    # --- Simulation side (any thread) ---
+    def start(self):
+        """Start serving on a background thread. Raises whatever stopped the
+        server from listening (e.g. OSError for a port in use)."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+        return self
+
+    def publish(self, world):
+        """Offer the current world state to subscribers. Never blocks.
+
+        Has the right signature to be used directly as a world observer.
+        """
+        if self._loop is None:
+            return
+        step = world.step_count
+        if not any(s.wants(step) for s in list(self.subscribers)):
+            return
+        sources, vehicles = world_frame(world)
+        self._loop.call_soon_threadsafe(self._dispatch, step, sources, vehicles)
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result()
+        self._thread.join()
+        self._loop = None
+        if self.path:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    # --- Server thread ---
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            if self.path:
+                start = asyncio.start_unix_server(self._handle, path=self.path)
+            else:
+                start = asyncio.start_server(self._handle, self.host, self.port)
+            self._server = loop.run_until_complete(start)
+            if not self.path:
+                self.port = self._server.sockets[0].getsockname()[1]
+            self._loop = loop
+        except BaseException as error:
+            self._error = error
+            loop.close()
+            return
+        finally:
+            self._ready.set()
+        try:
+            self._loop.run_until_complete(self._server.serve_forever())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    async def _shutdown(self):
+        for subscriber in list(self.subscribers):
+            subscriber.writer.close()
+        self._server.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    def _dispatch(self, step, sources, vehicles):
+        now = time.monotonic()
+        for subscriber in list(self.subscribers):
+            if not subscriber.wants(step):
+                continue
+            if subscriber.queue.full():
+                # Still hasn't taken the frames it was offered
+                if subscriber.stalled_since is None:
+                    subscriber.stalled_since = now
+                elif now - subscriber.stalled_since > self.stall_timeout:
+                    self._drop(subscriber)
+                    continue
+            else:
+                subscriber.stalled_since = None
+            subscriber.offer(step, sources, vehicles)
+
+    def _drop(self, subscriber):
+        self.subscribers.discard(subscriber)
+        subscriber.writer.transport.abort()
+
+    async def _handle(self, reader, writer):
+        try:
+            line = await asyncio.wait_for(reader.readline(), 5.0)
+        except (asyncio.TimeoutError, ValueError):
+            writer.close()
+            return
+        try:
+            request = json.loads(line) if line.strip() else {}
+            region = request.get("region")
+            if region:
+                region = tuple(float(v) for v in region)
+                if len(region) != 4:
+                    raise ValueError(f"region needs 4 values [x0, y0, x1, y1], got {len(region)}")
+            subscriber = _Subscriber(
+                writer, request.get("decimation", 1), region or None, self.max_pending,
+            )
+        except (ValueError, TypeError, AttributeError) as error:
+            # Checked here rather than when the first frame is filtered on
+            # the event loop
+            writer.write(encode_error(f"bad subscription: {error}"))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+            return
+
+        self.subscribers.add(subscriber)
+        try:
+            while True:
+                frame = await subscriber.queue.get()
+                writer.write(frame)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            writer.close()
+
+
+# --- CLIENT ---
+async def subscribe(host="127.0.0.1", port=8765, path=None,
+                    decimation=1, region=None):
+    """Async generator yielding (step, sources, vehicles) from a server."""
+    if path:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    request = {"decimation": decimation}
+    if region is not None:
+        request["region"] = list(region)
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    try:
+        while True:
+            (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+            yield decode_frame(await reader.readexactly(length))
+    except asyncio.IncompleteReadError:
+        return
+    finally:
+        writer.close()
+
+
+# --- DEMO ---
+def demo_world(seed=0, per_model=20):
+    """The four sources from vehicle3c.py and a few vehicles of every model."""
+    world = World(1000, 700, seed=seed)
+    world.add_source(200, 200, "light")
+    world.add_source(800, 200, "temp")
+    world.add_source(200, 600, "oxygen")
+    world.add_source(800, 600, "organic")
+    for model in MODELS:
+        world.add_population(
+            model,
+            world.rng.uniform(0, world.width, per_model),
+            world.rng.uniform(0, world.height, per_model),
+            world.rng.uniform(0, 2 * math.pi, per_model),
+        )
+    return world
+
+
+async def _watch(args):
+    async for step, sources, vehicles in subscribe(
+        args.host, args.port, args.path, args.decimation
+    ):
+        kinds = ", ".join(SOURCE_TYPES[k] for k in sources["kind"])
+        print(f"step {step}: {len(vehicles)} vehicles, sources: {kinds}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--path", help="Unix socket path instead of TCP")
+    parser.add_argument("--watch", action="store_true", help="print a server's frames")
+    parser.add_argument("--decimation", type=int, default=1)
+    parser.add_argument("--fps", type=float, default=60.0, help="0 runs flat out")
+    args = parser.parse_args()
+
+    if args.watch:
+        asyncio.run(_watch(args))
+        return
+
+    world = demo_world()
+    server = TelemetryServer(args.host, args.port, args.path).start()
+    world.observers.append(server.publish)
+    print(f"Serving telemetry on {args.path or f'{args.host}:{server.port}'}")
+    try:
+        while True:
+            world.step()
+            if args.fps:
+                time.sleep(1.0 / args.fps)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
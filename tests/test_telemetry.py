@@ -0,0 +1,17 @@
+import socket
+
+import pytest
+
+from telemetry import TelemetryServer
+
+
+def test_start_raises_when_the_port_is_taken():
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        server = TelemetryServer(port=port)
+        with pytest.raises(OSError):
+            server.start()
+        # Nothing left running to close
+        server.close()
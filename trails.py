@@ -0,0 +1,195 @@
+"""
+Fixed-length trails behind vehicles.
+
+Trails is a world observer that writes every vehicle's position into a ring
+buffer after each step: one preallocated float32 array of length x vehicles
+x 2 per population, so memory is fixed from the start (see nbytes) however
+long the run, even with tens of thousands of trailed vehicles.
+
+    trails = Trails(length=120)
+    world.observers.append(trails)
+    ...
+    trails.draw(screen, background=(240, 240, 240))
+
+draw() splits each trail into a few age bands, in a colour fading towards
+the background with age, and rasterizes each band for all vehicles at once
+with numpy, straight into the surface's pixels (like render.py's crowds):
+the cost is a few array operations per band, not a draw call per vehicle.
+pygame.draw.lines can't take the place of that, since one call draws a
+single connected polyline. The lines are aliased, one pixel sample per
+pixel of length, and width thickens them with a square pen; pixels off the
+surface are dropped (its clip rect is not applied). Trails are broken
+where a vehicle wraps around the screen.
+
+    python trails.py --model 3b --vehicles 200
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from world import MODELS, World
+
+
+class Trails:
+    """Ring buffers of the last `length` positions of every vehicle.
+
+    models limits the trails to some models (all by default). A population
+    whose size changes starts a new trail.
+    """
+
+    def __init__(self, length=64, every=1, models=None):
+        self.length = length
+        self.every = every
+        self.models = models
+        # id(population) -> (population, buffer, state)
+        self._buffers = {}
+
+    def _buffer(self, pop):
+        entry = self._buffers.get(id(pop))
+        if entry is None or entry[0] is not pop or entry[1].shape[1] != len(pop):
+            buffer = np.zeros((self.length, len(pop), 2), dtype=np.float32)
+            # Next slot to write and the number of slots filled
+            entry = (pop, buffer, {"head": 0, "count": 0})
+            self._buffers[id(pop)] = entry
+        return entry
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for _, buffer, _ in self._buffers.values())
+
+    @staticmethod
+    def bytes_for(n_vehicles, length):
+        """Memory the trails of n_vehicles will take, before running."""
+        return n_vehicles * length * 2 * np.dtype(np.float32).itemsize
+
+    def __call__(self, world):
+        if world.step_count % self.every:
+            return
+        world.sync()
+        for pop in world.populations:
+            if not len(pop) or (self.models and pop.model not in self.models):
+                continue
+            _, buffer, state = self._buffer(pop)
+            buffer[state["head"], :, 0] = pop.x
+            buffer[state["head"], :, 1] = pop.y
+            state["head"] = (state["head"] + 1) % self.length
+            state["count"] = min(state["count"] + 1, self.length)
+
+    def points(self, pop):
+        """Trail of every vehicle in pop, oldest first, shape (count, n, 2)."""
+        entry = self._buffers.get(id(pop))
+        if entry is None or entry[0] is not pop:
+            return np.zeros((0, len(pop), 2), dtype=np.float32)
+        _, buffer, state = entry
+        order = (state["head"] - state["count"] + np.arange(state["count"])) % self.length
+        return buffer[order]
+
+    def draw(self, surface, color=(60, 60, 200), background=(255, 255, 255),
+             bands=4, width=1):
+        """Draw every trail, fading from color (newest) to background."""
+        import pygame
+
+        w, h = surface.get_size()
+        color = np.array(color, dtype=float)
+        background = np.array(background, dtype=float)
+        # pixels2d takes 8, 16 and 32-bit surfaces; 24-bit ones are written
+        # per channel
+        rgb = surface.get_bytesize() == 3
+        if rgb:
+            pixels = pygame.surfarray.pixels3d(surface)
+        else:
+            pixels = pygame.surfarray.pixels2d(surface)
+        for pop, _, _ in list(self._buffers.values()):
+            points = self.points(pop)
+            if len(points) < 2:
+                continue
+            # Segments that jump more than half the screen are wraps
+            step = np.abs(np.diff(points, axis=0))
+            wraps = (step[..., 0] > w / 2) | (step[..., 1] > h / 2)
+
+            edges = np.linspace(0, len(points) - 1, bands + 1).round().astype(int)
+            for band in range(bands):
+                start, stop = edges[band], edges[band + 1]
+                if stop <= start:
+                    continue
+                age = 1 - (band + 1) / bands
+                shade = tuple(int(c) for c in color + (background - color) * age)
+                if not rgb:
+                    shade = surface.map_rgb(shade)
+                # Every segment of the band, of every vehicle, at once
+                keep = ~wraps[start:stop]
+                x, y = _rasterize(
+                    points[start:stop][keep], points[start + 1:stop + 1][keep], width
+                )
+                inside = (x >= 0) & (x < w) & (y >= 0) & (y < h)
+                pixels[x[inside], y[inside]] = shade
+        del pixels
+
+
+def _rasterize(a, b, width=1):
+    """Pixels (x, y) covering the segments a[i] -> b[i], sampled once per
+    pixel along their longer axis and thickened to width x width. The end
+    point is left out: it is the start of the next segment of the trail."""
+    d = b - a
+    samples = np.maximum(np.ceil(np.abs(d).max(axis=1, initial=0)).astype(np.intp), 1)
+    d /= samples[:, None]
+    # Sample k of every segment, spread with repeat rather than gathered
+    k = np.arange(samples.sum()) - np.repeat(np.cumsum(samples) - samples, samples)
+    k = k.astype(np.float32)
+    x = np.rint(np.repeat(a[:, 0], samples) + np.repeat(d[:, 0], samples) * k).astype(np.intp)
+    y = np.rint(np.repeat(a[:, 1], samples) + np.repeat(d[:, 1], samples) * k).astype(np.intp)
+    if width > 1:
+        offset = np.arange(width) - (width - 1) // 2
+        ox, oy = np.meshgrid(offset, offset)
+        x = (x[:, None] + ox.ravel()).ravel()
+        y = (y[:, None] + oy.ravel()).ravel()
+    return x, y
+
+
+# --- DEMO ---
+def main():
+    parser = argparse.ArgumentParser(description="Trails of a population of one model")
+    parser.add_argument("--model", default="3b", choices=MODELS)
+    parser.add_argument("--vehicles", type=int, default=200)
+    parser.add_argument("--length", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import pygame
+
+    from display import get_screen
+
+    world = World(900, 700, seed=args.seed)
+    world.add_source(450, 350)
+    world.add_population(
+        args.model,
+        world.rng.uniform(0, world.width, args.vehicles),
+        world.rng.uniform(0, world.height, args.vehicles),
+        world.rng.uniform(0, 2 * math.pi, args.vehicles),
+    )
+    trails = Trails(args.length)
+    world.observers.append(trails)
+    print(f"trail memory: {Trails.bytes_for(args.vehicles, args.length) / 1024:.0f} KiB")
+
+    screen = get_screen((world.width, world.height), f"Trails: {args.vehicles} x {args.model}")
+    clock = pygame.time.Clock()
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            if event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                world.move_source(0, event.pos)
+        world.step()
+        screen.fill((255, 255, 255))
+        trails.draw(screen)
+        pygame.draw.circle(screen, (255, 200, 0), (int(world.source_x[0]), int(world.source_y[0])), 12)
+        pygame.display.flip()
+        clock.tick(60)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
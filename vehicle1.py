@@ -3,18 +3,23 @@ import pygame
 import math
 import random
 
-# --- Pygame Setup (No changes here) ---
-pygame.init()
+from display import get_font, get_screen
+import playback
+
+# --- Pygame Setup ---
+# The window and font are only created once main() starts rendering
 WIDTH, HEIGHT = 600, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-# MODIFIED: Updated caption
-pygame.display.set_caption("Two Vehicles, Two Sources (Pygame-ce)")
-clock = pygame.time.Clock()
 fps = 60
-font = pygame.font.SysFont("consolas", 16)
 
 
 class VehicleOne:
+    __slots__ = (
+        "x", "y", "radius", "heading", "intensity", "speed", "turning_rate",
+        "color", "max_perturbation", "sensor_dist",
+        "sensor_x", "sensor_y",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_dist",
+    )
+
     # MODIFIED: Added 'color' as an initialization parameter
     def __init__(self, x, y, radius=20, heading=0, max_perturbation=math.radians(1.0), color=(128, 128, 128)):
         # Vehicle state
@@ -33,17 +38,29 @@ class VehicleOne:
 
         # Sensor configuration
         self.sensor_dist = self.radius
+        # Sensor position, cached for the pose it was computed at so that
+        # update() and draw() share it
+        self.sensor_x = self.sensor_y = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_dist = None
 
     # Calculate sensor position based on vehicle position and heading
     def _sensor_position(self):
-        # Calculate sensor position relative to world
-        sensor_x = self.x + math.cos(self.heading) * self.sensor_dist
-        sensor_y = self.y + math.sin(self.heading) * self.sensor_dist
-        return (sensor_x, sensor_y)
+        # Only recomputed when the vehicle has moved (or was moved), or
+        # sensor_dist changed, since the last call
+        if (self.x != self._sensed_x or self.y != self._sensed_y
+                or self.heading != self._sensed_heading
+                or self.sensor_dist != self._sensed_dist):
+            self.sensor_x = self.x + math.cos(self.heading) * self.sensor_dist
+            self.sensor_y = self.y + math.sin(self.heading) * self.sensor_dist
+            self._sensed_x = self.x
+            self._sensed_y = self.y
+            self._sensed_heading = self.heading
+            self._sensed_dist = self.sensor_dist
 
     # Calculate intensity value of a particular source at a given point
     def _intensity_at(self, point_x, point_y, source_x, source_y):
-        distance = math.dist((point_x, point_y), (source_x, source_y))
+        distance = math.hypot(point_x - source_x, point_y - source_y)
         # Using inverse-square law
         intensity = 10000 / (distance**2 + 50)
         return intensity
@@ -51,13 +68,13 @@ class VehicleOne:
     # MODIFIED: Update now accepts a LIST of source positions
     def update(self, source_positions):
         # Get sensor position
-        sensor_pos = self._sensor_position()
+        self._sensor_position()
 
         # MODIFIED: Calculate total intensity by summing all sources
         total_intensity = 0
         for source_pos in source_positions:
             total_intensity += self._intensity_at(
-                sensor_pos[0], sensor_pos[1], source_pos[0], source_pos[1]
+                self.sensor_x, self.sensor_y, source_pos[0], source_pos[1]
             )
         self.intensity = total_intensity
 
@@ -87,13 +104,14 @@ class VehicleOne:
             surface, (0, 0, 0), (int(self.x), int(self.y)), self.radius, 2
         )
 
-        # Draw the single sensor
-        sensor_pos = self._sensor_position()
+        # Draw the single sensor (computed once per frame, shared with update)
+        self._sensor_position()
         pygame.draw.circle(
-            surface, (255, 0, 0), (int(sensor_pos[0]), int(sensor_pos[1])), 5
+            surface, (255, 0, 0), (int(self.sensor_x), int(self.sensor_y)), 5
         )
 
         # Optionally draw debug info
+        font = get_font("consolas", 16)
         if font:
             # MODIFIED: All debug text now uses the info_y_offset
             surface.blit(
@@ -143,63 +161,74 @@ class Source:
         )
 
 
-# MODIFIED: Create lists for multiple sources and vehicles
-sources = [
-    Source(WIDTH // 3, HEIGHT // 2, radius=15),
-    Source(WIDTH * 2 // 3, HEIGHT // 2, radius=15)
-]
-
-vehicles = [
-    VehicleOne(
-        WIDTH // 2 - 150, 
-        HEIGHT // 2, 
-        radius=20, 
-        max_perturbation=math.radians(1.0),
-        color=(100, 100, 100)  # Dark Grey
-    ),
-    VehicleOne(
-        WIDTH // 2 + 150, 
-        HEIGHT // 2, 
-        radius=20,
-        heading=math.pi, # Start facing left
-        max_perturbation=math.radians(2.5), # More erratic
-        color=(180, 180, 180)  # Light Grey
-    )
-]
-
-running = True
-while running:
-    screen.fill((255, 255, 255))
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        # MODIFIED: Move sources with the mouse
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  # Left-click
-                sources[0].move_source(event.pos)
-                print("Left-click: Moved source 1")
-            elif event.button == 3: # Right-click
-                sources[1].move_source(event.pos)
-                print("Right-click: Moved source 2")
-
-
-    # MODIFIED: Draw all sources
-    for source in sources:
-        source.draw(screen)
-
-    # MODIFIED: Get a list of all source positions
-    source_positions = [s.pos() for s in sources]
-    
-    # MODIFIED: Update and draw all vehicles
-    info_display_offset = 10
-    for vehicle in vehicles:
-        vehicle.update(source_positions)
-        # Pass the offset so debug text doesn't overlap
-        vehicle.draw(screen, info_display_offset)
-        info_display_offset += 70 # Increment offset for the next vehicle
-
-    pygame.display.flip()
-    clock.tick(fps)
-
-pygame.quit()
\ No newline at end of file
+def main():
+    # MODIFIED: Updated caption
+    screen = get_screen((WIDTH, HEIGHT), "Two Vehicles, Two Sources (Pygame-ce)")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+
+    # MODIFIED: Create lists for multiple sources and vehicles
+    sources = [
+        Source(WIDTH // 3, HEIGHT // 2, radius=15),
+        Source(WIDTH * 2 // 3, HEIGHT // 2, radius=15)
+    ]
+
+    vehicles = [
+        VehicleOne(
+            WIDTH // 2 - 150, 
+            HEIGHT // 2, 
+            radius=20, 
+            max_perturbation=math.radians(1.0),
+            color=(100, 100, 100)  # Dark Grey
+        ),
+        VehicleOne(
+            WIDTH // 2 + 150, 
+            HEIGHT // 2, 
+            radius=20,
+            heading=math.pi, # Start facing left
+            max_perturbation=math.radians(2.5), # More erratic
+            color=(180, 180, 180)  # Light Grey
+        )
+    ]
+
+    running = True
+    while running:
+        screen.fill((255, 255, 255))
+
+        for event in events.get():
+            if event.type == pygame.QUIT:
+                running = False
+            # MODIFIED: Move sources with the mouse
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left-click
+                    sources[0].move_source(event.pos)
+                    print("Left-click: Moved source 1")
+                elif event.button == 3: # Right-click
+                    sources[1].move_source(event.pos)
+                    print("Right-click: Moved source 2")
+
+
+        # MODIFIED: Draw all sources
+        for source in sources:
+            source.draw(screen)
+
+        # MODIFIED: Get a list of all source positions
+        source_positions = [s.pos() for s in sources]
+
+        # MODIFIED: Update and draw all vehicles
+        info_display_offset = 10
+        for vehicle in vehicles:
+            vehicle.update(source_positions)
+            # Pass the offset so debug text doesn't overlap
+            vehicle.draw(screen, info_display_offset)
+            info_display_offset += 70 # Increment offset for the next vehicle
+
+        pygame.display.flip()
+        events.tick(clock, fps)
+
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
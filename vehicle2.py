@@ -1,23 +1,27 @@
 import pygame
 import math
 
-pygame.init()
+from display import get_font, get_screen
+import playback
 
-# Setup Pygame window
+# Setup Pygame window (opened lazily by main())
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Braitenberg Vehicle 2: Fear & Aggression")
 
-# Setup clock for controlling frame rate
-clock = pygame.time.Clock()
+# Frame rate
 fps = 60
 
-# Setup font for debug info
-font = pygame.font.SysFont("consolas", 16)
-
 
 # Vehicle Two
 class VehicleTwo:
+    __slots__ = (
+        "x", "y", "radius", "heading", "vehicle_type", "color",
+        "speed_scaler", "base_speed", "turning_scaler", "light_max_distance",
+        "sensor_offset_angle", "sensor_dist",
+        "intensity_left", "intensity_right", "forward_speed", "turning_rate",
+        "left_x", "left_y", "right_x", "right_y",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(
         self,
         x,
@@ -56,9 +60,22 @@ class VehicleTwo:
         self.forward_speed = 0.0
         self.turning_rate = 0.0
 
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.left_x = self.left_y = self.right_x = self.right_y = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
+
     # Calculate sensor positions based on vehicle position and heading
     def _sensor_positions(self):
-        """Calculates the world coordinates of the left and right sensors."""
+        """Sets left_x, left_y, right_x, right_y to the world coordinates of
+        the sensors, unless neither the vehicle nor its sensor angle or
+        distance changed since the last call."""
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_offset_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
         angle = self.sensor_offset_angle
         distance = self.sensor_dist
 
@@ -72,19 +89,19 @@ class VehicleTwo:
         cos_heading = math.cos(self.heading)
         sin_heading = math.sin(self.heading)
 
-        left_world_x = self.x + cos_heading * left_local_x - sin_heading * left_local_y
-        left_world_y = self.y + sin_heading * left_local_x + cos_heading * left_local_y
-        right_world_x = (
+        self.left_x = self.x + cos_heading * left_local_x - sin_heading * left_local_y
+        self.left_y = self.y + sin_heading * left_local_x + cos_heading * left_local_y
+        self.right_x = (
             self.x + cos_heading * right_local_x - sin_heading * right_local_y
         )
-        right_world_y = (
+        self.right_y = (
             self.y + sin_heading * right_local_x + cos_heading * right_local_y
         )
-
-        # Return sensor positions
-        left_sensor_position = (left_world_x, left_world_y)
-        right_sensor_position = (right_world_x, right_world_y)
-        return left_sensor_position, right_sensor_position
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_offset_angle
+        self._sensed_dist = self.sensor_dist
 
     # Calculate intensity value of a particular source at a given point
     def _intensity_at(self, point_x, point_y, light_x, light_y):
@@ -109,14 +126,14 @@ class VehicleTwo:
     def update(self, light_pos):
         """Update the vehicle's state for one frame."""
         # Get sensor positions
-        left_sensor, right_sensor = self._sensor_positions()
+        self._sensor_positions()
 
         # Calculate intensities at each sensor
         self.intensity_left = self._intensity_at(
-            left_sensor[0], left_sensor[1], light_pos[0], light_pos[1]
+            self.left_x, self.left_y, light_pos[0], light_pos[1]
         )
         self.intensity_right = self._intensity_at(
-            right_sensor[0], right_sensor[1], light_pos[0], light_pos[1]
+            self.right_x, self.right_y, light_pos[0], light_pos[1]
         )
 
         # --- This is the core logic for Vehicle 2a vs 2b ---
@@ -178,23 +195,24 @@ class VehicleTwo:
             surface, (0, 0, 0), (int(self.x), int(self.y)), (int(nose_x), int(nose_y)), 3
         )
 
-        # Draw sensors
-        left_sensor, right_sensor = self._sensor_positions()
+        # Draw sensors (computed once per frame, shared with update)
+        self._sensor_positions()
         # Draw sensor intensity (red circle size)
         pygame.draw.circle(
             surface,
             (255, 0, 0),
-            (int(left_sensor[0]), int(left_sensor[1])),
+            (int(self.left_x), int(self.left_y)),
             int(2 + self.intensity_left * 6),
         )
         pygame.draw.circle(
             surface,
             (255, 0, 0),
-            (int(right_sensor[0]), int(right_sensor[1])),
+            (int(self.right_x), int(self.right_y)),
             int(2 + self.intensity_right * 6),
         )
 
         # Optionally draw debug info
+        font = get_font("consolas", 16)
         if font:
             label = "FEAR (2a)" if self.vehicle_type == "2a" else "AGGRESSION (2b)"
             surface.blit(
@@ -244,51 +262,62 @@ class Light:
         )
 
 
-# CREATE instances of vehicles and light sources
-light = Light(WIDTH // 2, HEIGHT // 2, radius=20)
-
-# Create one of each vehicle type
-vehicle_fear = VehicleTwo(
-    WIDTH // 2 - 150,
-    HEIGHT // 2,
-    radius=20,
-    vehicle_type="2a",
-    color=(60, 100, 255),  # Blue
-)
-vehicle_aggro = VehicleTwo(
-    WIDTH // 2 + 150,
-    HEIGHT // 2,
-    radius=20,
-    vehicle_type="2b",
-    color=(60, 200, 100),  # Green
-)
-
-
-running = True
-while running:
-    screen.fill((220, 220, 220))  # Light gray background
-
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        # Move light with mouse click
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            light.move_light(event.pos)
-        # Also move light with mouse drag
-        if event.type == pygame.MOUSEMOTION and event.buttons[0]:
-             light.move_light(event.pos)
-
-    # Draw light source(s)
-    light.draw(screen)
-
-    # Update and draw vehicles
-    vehicle_fear.update(light.pos())
-    vehicle_fear.draw(screen, debug_pos=(10, 10))
-
-    vehicle_aggro.update(light.pos())
-    vehicle_aggro.draw(screen, debug_pos=(10, 70))
-
-    pygame.display.flip()
-    clock.tick(fps)
-
-pygame.quit()
\ No newline at end of file
+def main():
+    # Setup Pygame window and clock for controlling frame rate
+    screen = get_screen((WIDTH, HEIGHT), "Braitenberg Vehicle 2: Fear & Aggression")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+
+    # CREATE instances of vehicles and light sources
+    light = Light(WIDTH // 2, HEIGHT // 2, radius=20)
+
+    # Create one of each vehicle type
+    vehicle_fear = VehicleTwo(
+        WIDTH // 2 - 150,
+        HEIGHT // 2,
+        radius=20,
+        vehicle_type="2a",
+        color=(60, 100, 255),  # Blue
+    )
+    vehicle_aggro = VehicleTwo(
+        WIDTH // 2 + 150,
+        HEIGHT // 2,
+        radius=20,
+        vehicle_type="2b",
+        color=(60, 200, 100),  # Green
+    )
+
+
+    running = True
+    while running:
+        screen.fill((220, 220, 220))  # Light gray background
+
+        for event in events.get():
+            if event.type == pygame.QUIT:
+                running = False
+            # Move light with mouse click
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                light.move_light(event.pos)
+            # Also move light with mouse drag
+            if event.type == pygame.MOUSEMOTION and event.buttons[0]:
+                 light.move_light(event.pos)
+
+        # Draw light source(s)
+        light.draw(screen)
+
+        # Update and draw vehicles
+        vehicle_fear.update(light.pos())
+        vehicle_fear.draw(screen, debug_pos=(10, 10))
+
+        vehicle_aggro.update(light.pos())
+        vehicle_aggro.draw(screen, debug_pos=(10, 70))
+
+        pygame.display.flip()
+        events.tick(clock, fps)
+
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
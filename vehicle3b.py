@@ -2,14 +2,19 @@
 import pygame
 import math
 
-pygame.init()
+from display import get_font, get_screen
+import playback
+
 WIDTH, HEIGHT = 800, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vehicle 3b: The explorer (crossed Inhibitory)")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 16)
 
 class Vehicle3b:
+    __slots__ = (
+        "x", "y", "radius", "heading", "color", "base_speed", "inhibition_scaler",
+        "turning_scaler", "light_max_distance", "sensor_angle", "sensor_dist",
+        "lx", "ly", "rx", "ry",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -28,20 +33,37 @@ class Vehicle3b:
         self.sensor_angle = math.radians(45)
         self.sensor_dist = 20
 
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.lx = self.ly = self.rx = self.ry = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
+
     def _get_sensor_pos(self):
+        # Sets lx, ly, rx, ry, unless neither the vehicle nor its sensor angle
+        # or distance changed since the last call
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
         # Calculate sensor coordinates
-        lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
-        ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
-        rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
-        ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
-        return (lx, ly), (rx, ry)
+        self.lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
+        self.ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
+        self.rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
+        self.ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_angle
+        self._sensed_dist = self.sensor_dist
 
     def update(self, light_pos):
-        l_pos, r_pos = self._get_sensor_pos()
+        self._get_sensor_pos()
         
         # Calculate Intensity (0.0 to 1.0)
-        dist_l = math.hypot(l_pos[0] - light_pos[0], l_pos[1] - light_pos[1])
-        dist_r = math.hypot(r_pos[0] - light_pos[0], r_pos[1] - light_pos[1])
+        dist_l = math.hypot(self.lx - light_pos[0], self.ly - light_pos[1])
+        dist_r = math.hypot(self.rx - light_pos[0], self.ry - light_pos[1])
         
         int_l = max(0.0, 1.0 - (dist_l / self.light_max_distance))
         int_r = max(0.0, 1.0 - (dist_r / self.light_max_distance))
@@ -70,37 +92,48 @@ class Vehicle3b:
     def draw(self, surface):
         pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
         # Draw Sensors
-        l_pos, r_pos = self._get_sensor_pos()
-        pygame.draw.circle(surface, (255,0,0), (int(l_pos[0]), int(l_pos[1])), 5)
-        pygame.draw.circle(surface, (255,0,0), (int(r_pos[0]), int(r_pos[1])), 5)
+        self._get_sensor_pos()
+        pygame.draw.circle(surface, (255,0,0), (int(self.lx), int(self.ly)), 5)
+        pygame.draw.circle(surface, (255,0,0), (int(self.rx), int(self.ry)), 5)
         # Draw Nose
         nx = self.x + math.cos(self.heading) * self.radius
         ny = self.y + math.sin(self.heading) * self.radius
         pygame.draw.line(surface, (0,0,0), (self.x, self.y), (nx, ny), 2)
 
-# Main Loop
-vehicle = Vehicle3b(WIDTH//2, HEIGHT//2)
-light_pos = [WIDTH//2, HEIGHT//2]
-
-running = True
-while running:
-    screen.fill((220, 220, 220))
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: running = False
-        if event.type == pygame.MOUSEMOTION: light_pos = event.pos
-
-    # Draw Light
-    pygame.draw.circle(screen, (255, 255, 0), light_pos, 30)
-    
-    # Update Vehicle
-    il, ir, ml, mr = vehicle.update(light_pos)
-    vehicle.draw(screen)
-
-    # Debug
-    info = f"Sensors: {il:.2f} / {ir:.2f} | Motors: {ml:.2f} / {mr:.2f}"
-    screen.blit(font.render(info, True, (0,0,0)), (10, 10))
-    screen.blit(font.render("b: CROSSED INHIBITORY (explorer)", True, (0,0,0)), (10, 30))
-
-    pygame.display.flip()
-    clock.tick(60)
-pygame.quit()
\ No newline at end of file
+def main():
+    screen = get_screen((WIDTH, HEIGHT), "Vehicle 3b: The explorer (crossed Inhibitory)")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    font = get_font("consolas", 16)
+
+    # Main Loop
+    vehicle = Vehicle3b(WIDTH//2, HEIGHT//2)
+    light_pos = [WIDTH//2, HEIGHT//2]
+
+    running = True
+    while running:
+        screen.fill((220, 220, 220))
+        for event in events.get():
+            if event.type == pygame.QUIT: running = False
+            if event.type == pygame.MOUSEMOTION: light_pos = event.pos
+
+        # Draw Light
+        pygame.draw.circle(screen, (255, 255, 0), light_pos, 30)
+
+        # Update Vehicle
+        il, ir, ml, mr = vehicle.update(light_pos)
+        vehicle.draw(screen)
+
+        # Debug
+        info = f"Sensors: {il:.2f} / {ir:.2f} | Motors: {ml:.2f} / {mr:.2f}"
+        screen.blit(font.render(info, True, (0,0,0)), (10, 10))
+        screen.blit(font.render("b: CROSSED INHIBITORY (explorer)", True, (0,0,0)), (10, 30))
+
+        pygame.display.flip()
+        events.tick(clock, 60)
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -10,28 +10,40 @@
 import pygame
 import math
 
-pygame.init()
+from display import get_font, get_screen
+from editor import Editor
+import playback
+
 WIDTH, HEIGHT = 1000, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vehicle 3c: System of Values")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 14)
 
 class Source:
+    __slots__ = ("x", "y", "type", "color", "radius")
+
     def __init__(self, x, y, type_name, color):
         self.x = x
         self.y = y
         self.type = type_name # 'light', 'temp', 'oxygen', 'organic'
         self.color = color
         self.radius = 25
+
+    def move_to(self, x, y):
+        self.x, self.y = x, y
     
     def draw(self, surface):
         pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
         # Label
-        text = font.render(self.type[0].upper(), True, (0,0,0))
+        text = get_font("consolas", 14).render(self.type[0].upper(), True, (0,0,0))
         surface.blit(text, (self.x-5, self.y-8))
 
 class Vehicle3c:
+    __slots__ = (
+        "x", "y", "radius", "heading", "color", "base_speed", "max_speed",
+        "turning_scaler", "sensor_dist", "sensor_angle",
+        "sense_range", "gain_excite", "gain_inhibit",
+        "lx", "ly", "rx", "ry",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -51,19 +63,36 @@ class Vehicle3c:
         self.gain_excite = 3.0
         self.gain_inhibit = 2.5
 
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.lx = self.ly = self.rx = self.ry = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
+
     def _get_sensor_pos(self):
-        lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
-        ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
-        rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
-        ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
-        return (lx, ly), (rx, ry)
+        # Sets lx, ly, rx, ry, unless neither the vehicle nor its sensor angle
+        # or distance changed since the last call
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
+        self.lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
+        self.ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
+        self.rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
+        self.ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_angle
+        self._sensed_dist = self.sensor_dist
 
     def calculate_intensity(self, sensor_x, sensor_y, source):
         dist = math.hypot(sensor_x - source.x, sensor_y - source.y)
         return max(0.0, 1.0 - (dist / self.sense_range))
 
     def update(self, sources):
-        l_pos, r_pos = self._get_sensor_pos()
+        self._get_sensor_pos()
         
         # Initialize motor commands with base speed
         # We process all inputs cumulatively
@@ -73,8 +102,8 @@ class Vehicle3c:
         # Process every source in the environment
         for s in sources:
             # Calculate intensity for this specific source on Left/Right sensors
-            i_l = self.calculate_intensity(l_pos[0], l_pos[1], s)
-            i_r = self.calculate_intensity(r_pos[0], r_pos[1], s)
+            i_l = self.calculate_intensity(self.lx, self.ly, s)
+            i_r = self.calculate_intensity(self.rx, self.ry, s)
             
             # [cite_start]Apply wiring logic based on source type [cite: 28, 29]
             
@@ -120,58 +149,67 @@ class Vehicle3c:
         pygame.draw.line(surface, (0,0,0), (self.x, self.y), (nx, ny), 2)
         
         # Draw sensor eyes
-        l, r = self._get_sensor_pos()
-        pygame.draw.circle(surface, (50,50,50), (int(l[0]), int(l[1])), 5)
-        pygame.draw.circle(surface, (50,50,50), (int(r[0]), int(r[1])), 5)
-
-
-# --- SETUP ---
-# Create Sources
-sources = [
-    Source(200, 200, 'light', (255, 255, 0)),    # Yellow (Aggro target)
-    Source(800, 200, 'temp', (255, 0, 0)),       # Red (Fear target)
-    Source(200, 600, 'oxygen', (0, 100, 255)),   # Blue (Explorer target)
-    Source(800, 600, 'organic', (0, 255, 0))     # Green (Lover target)
-]
-
-vehicle = Vehicle3c(WIDTH//2, HEIGHT//2)
-dragging_source = None
-
-running = True
-while running:
-    screen.fill((230, 230, 230))
-    
-    # Event Handling (Mouse drags sources)
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: running = False
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            for s in sources:
-                if math.hypot(event.pos[0]-s.x, event.pos[1]-s.y) < s.radius:
-                    dragging_source = s
-        elif event.type == pygame.MOUSEBUTTONUP:
-            dragging_source = None
-        elif event.type == pygame.MOUSEMOTION and dragging_source:
-            dragging_source.x, dragging_source.y = event.pos
-
-    # Draw Sources
-    for s in sources: s.draw(screen)
-
-    # Update Vehicle
-    vehicle.update(sources)
-    vehicle.draw(screen)
-
-    # UI Instructions
-    ui = [
-        "Vehicle 3c Logic:",
-        "LIGHT (Yellow): Attacks (Crossed Excitatory)",
-        "TEMP (Red): Flees (Uncrossed Excitatory)",
-        "OXYGEN (Blue): Explores (Crossed Inhibitory)",
-        "ORGANIC (Green): Loves (Uncrossed Inhibitory)",
-        "Drag circles to move them!"
+        self._get_sensor_pos()
+        pygame.draw.circle(surface, (50,50,50), (int(self.lx), int(self.ly)), 5)
+        pygame.draw.circle(surface, (50,50,50), (int(self.rx), int(self.ry)), 5)
+
+
+def main():
+    screen = get_screen((WIDTH, HEIGHT), "Vehicle 3c: System of Values")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    font = get_font("consolas", 14)
+
+    # --- SETUP ---
+    # Create Sources
+    sources = [
+        Source(200, 200, 'light', (255, 255, 0)),    # Yellow (Aggro target)
+        Source(800, 200, 'temp', (255, 0, 0)),       # Red (Fear target)
+        Source(200, 600, 'oxygen', (0, 100, 255)),   # Blue (Explorer target)
+        Source(800, 600, 'organic', (0, 255, 0))     # Green (Lover target)
     ]
-    for i, line in enumerate(ui):
-        screen.blit(font.render(line, True, (0,0,0)), (10, 10 + i*20))
 
-    pygame.display.flip()
-    clock.tick(60)
-pygame.quit()
\ No newline at end of file
+    vehicle = Vehicle3c(WIDTH//2, HEIGHT//2)
+    # Picks, selects and drags sources through a spatial index
+    editor = Editor()
+    for s in sources:
+        editor.add(s.x, s.y, s.radius, on_move=s.move_to)
+
+    running = True
+    while running:
+        screen.fill((230, 230, 230))
+
+        # Event Handling (Mouse drags sources)
+        for event in events.get():
+            if event.type == pygame.QUIT: running = False
+            editor.handle(event)
+
+        # Draw Sources
+        for s in sources: s.draw(screen)
+        editor.draw(screen)
+
+        # Update Vehicle
+        vehicle.update(sources)
+        vehicle.draw(screen)
+
+        # UI Instructions
+        ui = [
+            "Vehicle 3c Logic:",
+            "LIGHT (Yellow): Attacks (Crossed Excitatory)",
+            "TEMP (Red): Flees (Uncrossed Excitatory)",
+            "OXYGEN (Blue): Explores (Crossed Inhibitory)",
+            "ORGANIC (Green): Loves (Uncrossed Inhibitory)",
+            "Drag circles to move them!",
+            "Shift-click or drag a box to select several"
+        ]
+        for i, line in enumerate(ui):
+            screen.blit(font.render(line, True, (0,0,0)), (10, 10 + i*20))
+
+        pygame.display.flip()
+        events.tick(clock, 60)
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
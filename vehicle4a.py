@@ -1,14 +1,19 @@
 import pygame
 import math
 
-pygame.init()
+from display import get_font, get_screen
+import playback
+
 WIDTH, HEIGHT = 900, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vehicle 4a: Special Tastes (The Orbiter)")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 16)
 
 class Vehicle4a:
+    __slots__ = (
+        "x", "y", "radius", "heading", "color", "sensor_angle", "sensor_dist",
+        "preferred_intensity", "curve_width", "max_motor_speed", "base_speed",
+        "lx", "ly", "rx", "ry",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -26,12 +31,29 @@ class Vehicle4a:
         self.max_motor_speed = 4.0
         self.base_speed = 2.0  # Constant base movement
 
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.lx = self.ly = self.rx = self.ry = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
+
     def _get_sensor_pos(self):
-        lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
-        ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
-        rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
-        ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
-        return (lx, ly), (rx, ry)
+        # Sets lx, ly, rx, ry, unless neither the vehicle nor its sensor angle
+        # or distance changed since the last call
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
+        self.lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
+        self.ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
+        self.rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
+        self.ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_angle
+        self._sensed_dist = self.sensor_dist
 
     def gaussian(self, intensity):
         """
@@ -44,11 +66,11 @@ class Vehicle4a:
         return math.exp(numerator / denominator)
 
     def update(self, light_pos):
-        l_pos, r_pos = self._get_sensor_pos()
+        self._get_sensor_pos()
         
         # Calculate distance and intensity for each sensor
-        dist_l = math.hypot(l_pos[0] - light_pos[0], l_pos[1] - light_pos[1])
-        dist_r = math.hypot(r_pos[0] - light_pos[0], r_pos[1] - light_pos[1])
+        dist_l = math.hypot(self.lx - light_pos[0], self.ly - light_pos[1])
+        dist_r = math.hypot(self.rx - light_pos[0], self.ry - light_pos[1])
         
         # Raw intensity (1.0 = very close, 0.0 = far away)
         raw_l = max(0.0, 1.0 - (dist_l / 500.0))
@@ -86,125 +108,136 @@ class Vehicle4a:
         pygame.draw.circle(surface, self.color, (int(self.x), int(self.y)), self.radius)
         
         # Sensors
-        l, r = self._get_sensor_pos()
-        pygame.draw.circle(surface, (200,0,0), (int(l[0]), int(l[1])), 6)
-        pygame.draw.circle(surface, (200,0,0), (int(r[0]), int(r[1])), 6)
+        self._get_sensor_pos()
+        pygame.draw.circle(surface, (200,0,0), (int(self.lx), int(self.ly)), 6)
+        pygame.draw.circle(surface, (200,0,0), (int(self.rx), int(self.ry)), 6)
         
         # Direction indicator (nose)
         nx = self.x + math.cos(self.heading) * self.radius
         ny = self.y + math.sin(self.heading) * self.radius
         pygame.draw.line(surface, (0,0,0), (self.x, self.y), (nx, ny), 3)
 
-# --- MAIN LOOP ---
-vehicle = Vehicle4a(200, 350)
-light_pos = [WIDTH//2, HEIGHT//2]
-
-running = True
-paused = False
-
-while running:
-    screen.fill((240, 240, 240))
-    
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: 
-            running = False
-        if event.type == pygame.MOUSEMOTION: 
-            light_pos = event.pos
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 1:  # Left click - teleport vehicle
-                import random
-                vehicle.x = random.randint(100, WIDTH-100)
-                vehicle.y = random.randint(100, HEIGHT-100)
-                vehicle.heading = random.uniform(0, 2*math.pi)
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_SPACE:
-                paused = not paused
-
-    # Draw light source
-    pygame.draw.circle(screen, (255, 255, 0), light_pos, 30)
-    pygame.draw.circle(screen, (255, 200, 0), light_pos, 30, 3)
-    
-    # Draw "sweet spot" orbit ring (where intensity ≈ 0.5)
-    # At 250px distance, intensity = 0.5
-    pygame.draw.circle(screen, (100, 255, 100), light_pos, 250, 3)
-    
-    # Draw weaker orbit rings for reference
-    pygame.draw.circle(screen, (200, 200, 200), light_pos, 150, 1)
-    pygame.draw.circle(screen, (200, 200, 200), light_pos, 350, 1)
-
-    if not paused:
-        # Update vehicle
-        rl, rr, lm, rm, vl, vr = vehicle.update(light_pos)
-    else:
-        # Get values without moving
-        l_pos, r_pos = vehicle._get_sensor_pos()
-        dist_l = math.hypot(l_pos[0] - light_pos[0], l_pos[1] - light_pos[1])
-        dist_r = math.hypot(r_pos[0] - light_pos[0], r_pos[1] - light_pos[1])
-        rl = max(0.0, 1.0 - (dist_l / 500.0))
-        rr = max(0.0, 1.0 - (dist_r / 500.0))
-        vl = vehicle.gaussian(rl)
-        vr = vehicle.gaussian(rr)
-        lm = vehicle.base_speed + (vl * vehicle.max_motor_speed)
-        rm = vehicle.base_speed + (vr * vehicle.max_motor_speed)
-    
-    vehicle.draw(screen)
-
-    # Calculate distance to light
-    dist_to_light = math.hypot(vehicle.x - light_pos[0], vehicle.y - light_pos[1])
-    avg_intensity = (rl + rr) / 2
-
-    # UI / Debug Info
-    ui_text = [
-        "Vehicle 4a: 'Special Tastes' - Figure 6 Behavior",
-        "Wiring: UNCROSSED (direct) + Gaussian Bell Curve",
-        "Sweet Spot: 250px (green ring) where intensity = 0.5",
-        f"Distance to light: {dist_to_light:.0f}px | Avg Intensity: {avg_intensity:.2f}",
-        "",
-        f"Left:  Raw={rl:.2f} → Gauss={vl:.2f} → Motor={lm:.2f}",
-        f"Right: Raw={rr:.2f} → Gauss={vr:.2f} → Motor={rm:.2f}",
-        "",
-        "Controls:",
-        "• Move mouse = move light source",
-        "• Click = teleport vehicle to random position",
-        "• SPACE = pause/unpause"
-    ]
-    
-    y_offset = 10
-    for line in ui_text:
-        if line == "":
-            y_offset += 10
+def main():
+    screen = get_screen((WIDTH, HEIGHT), "Vehicle 4a: Special Tastes (The Orbiter)")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    font = get_font("consolas", 16)
+
+    # --- MAIN LOOP ---
+    vehicle = Vehicle4a(200, 350)
+    light_pos = [WIDTH//2, HEIGHT//2]
+
+    running = True
+    paused = False
+
+    while running:
+        screen.fill((240, 240, 240))
+
+        for event in events.get():
+            if event.type == pygame.QUIT: 
+                running = False
+            if event.type == pygame.MOUSEMOTION: 
+                light_pos = event.pos
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button == 1:  # Left click - teleport vehicle
+                    import random
+                    vehicle.x = random.randint(100, WIDTH-100)
+                    vehicle.y = random.randint(100, HEIGHT-100)
+                    vehicle.heading = random.uniform(0, 2*math.pi)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+
+        # Draw light source
+        pygame.draw.circle(screen, (255, 255, 0), light_pos, 30)
+        pygame.draw.circle(screen, (255, 200, 0), light_pos, 30, 3)
+
+        # Draw "sweet spot" orbit ring (where intensity ≈ 0.5)
+        # At 250px distance, intensity = 0.5
+        pygame.draw.circle(screen, (100, 255, 100), light_pos, 250, 3)
+
+        # Draw weaker orbit rings for reference
+        pygame.draw.circle(screen, (200, 200, 200), light_pos, 150, 1)
+        pygame.draw.circle(screen, (200, 200, 200), light_pos, 350, 1)
+
+        if not paused:
+            # Update vehicle
+            rl, rr, lm, rm, vl, vr = vehicle.update(light_pos)
         else:
-            text_surface = font.render(line, True, (0,0,0))
-            screen.blit(text_surface, (10, y_offset))
-            y_offset += 20
-
-    # Draw Gaussian curve visualization
-    curve_x, curve_y = WIDTH - 220, 20
-    curve_w, curve_h = 200, 100
-    
-    pygame.draw.rect(screen, (255, 255, 255), (curve_x, curve_y, curve_w, curve_h))
-    pygame.draw.rect(screen, (0, 0, 0), (curve_x, curve_y, curve_w, curve_h), 1)
-    
-    # Draw bell curve
-    for i in range(curve_w):
-        intensity = i / curve_w
-        gauss_val = vehicle.gaussian(intensity)
-        px = curve_x + i
-        py = curve_y + curve_h - (gauss_val * curve_h)
-        pygame.draw.circle(screen, (255, 0, 255), (int(px), int(py)), 1)
-    
-    # Mark preferred intensity
-    pref_x = curve_x + int(vehicle.preferred_intensity * curve_w)
-    pygame.draw.line(screen, (0, 255, 0), (pref_x, curve_y), (pref_x, curve_y + curve_h), 2)
-    
-    # Mark current avg intensity
-    curr_x = curve_x + int(avg_intensity * curve_w)
-    pygame.draw.line(screen, (255, 0, 0), (curr_x, curve_y), (curr_x, curve_y + curve_h), 1)
-    
-    label = font.render("Gaussian Response", True, (0,0,0))
-    screen.blit(label, (curve_x + 5, curve_y + 5))
-
-    pygame.display.flip()
-    clock.tick(60)
-
-pygame.quit()
\ No newline at end of file
+            # Get values without moving
+            vehicle._get_sensor_pos()
+            dist_l = math.hypot(vehicle.lx - light_pos[0], vehicle.ly - light_pos[1])
+            dist_r = math.hypot(vehicle.rx - light_pos[0], vehicle.ry - light_pos[1])
+            rl = max(0.0, 1.0 - (dist_l / 500.0))
+            rr = max(0.0, 1.0 - (dist_r / 500.0))
+            vl = vehicle.gaussian(rl)
+            vr = vehicle.gaussian(rr)
+            lm = vehicle.base_speed + (vl * vehicle.max_motor_speed)
+            rm = vehicle.base_speed + (vr * vehicle.max_motor_speed)
+
+        vehicle.draw(screen)
+
+        # Calculate distance to light
+        dist_to_light = math.hypot(vehicle.x - light_pos[0], vehicle.y - light_pos[1])
+        avg_intensity = (rl + rr) / 2
+
+        # UI / Debug Info
+        ui_text = [
+            "Vehicle 4a: 'Special Tastes' - Figure 6 Behavior",
+            "Wiring: UNCROSSED (direct) + Gaussian Bell Curve",
+            "Sweet Spot: 250px (green ring) where intensity = 0.5",
+            f"Distance to light: {dist_to_light:.0f}px | Avg Intensity: {avg_intensity:.2f}",
+            "",
+            f"Left:  Raw={rl:.2f} → Gauss={vl:.2f} → Motor={lm:.2f}",
+            f"Right: Raw={rr:.2f} → Gauss={vr:.2f} → Motor={rm:.2f}",
+            "",
+            "Controls:",
+            "• Move mouse = move light source",
+            "• Click = teleport vehicle to random position",
+            "• SPACE = pause/unpause"
+        ]
+
+        y_offset = 10
+        for line in ui_text:
+            if line == "":
+                y_offset += 10
+            else:
+                text_surface = font.render(line, True, (0,0,0))
+                screen.blit(text_surface, (10, y_offset))
+                y_offset += 20
+
+        # Draw Gaussian curve visualization
+        curve_x, curve_y = WIDTH - 220, 20
+        curve_w, curve_h = 200, 100
+
+        pygame.draw.rect(screen, (255, 255, 255), (curve_x, curve_y, curve_w, curve_h))
+        pygame.draw.rect(screen, (0, 0, 0), (curve_x, curve_y, curve_w, curve_h), 1)
+
+        # Draw bell curve
+        for i in range(curve_w):
+            intensity = i / curve_w
+            gauss_val = vehicle.gaussian(intensity)
+            px = curve_x + i
+            py = curve_y + curve_h - (gauss_val * curve_h)
+            pygame.draw.circle(screen, (255, 0, 255), (int(px), int(py)), 1)
+
+        # Mark preferred intensity
+        pref_x = curve_x + int(vehicle.preferred_intensity * curve_w)
+        pygame.draw.line(screen, (0, 255, 0), (pref_x, curve_y), (pref_x, curve_y + curve_h), 2)
+
+        # Mark current avg intensity
+        curr_x = curve_x + int(avg_intensity * curve_w)
+        pygame.draw.line(screen, (255, 0, 0), (curr_x, curve_y), (curr_x, curve_y + curve_h), 1)
+
+        label = font.render("Gaussian Response", True, (0,0,0))
+        screen.blit(label, (curve_x + 5, curve_y + 5))
+
+        pygame.display.flip()
+        events.tick(clock, 60)
+
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
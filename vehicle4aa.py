@@ -2,12 +2,13 @@ import pygame
 import random
 import math
 
+from display import get_font, get_screen
+from editor import Editor
+import playback
+
 # --- 1. SETUP ---
-pygame.init()
+# The window and font are only created once main() starts rendering
 WIDTH, HEIGHT = 1200, 800
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-clock = pygame.time.Clock()
-font = pygame.font.SysFont('Consolas', 20)
 
 # --- 2. CONSTANTS ---
 FPS = 60 
@@ -28,23 +29,45 @@ TURN_SENSITIVITY = 0.05
 
 
 class Source:
+    __slots__ = ("position", "radius", "color")
+
     def __init__(self, position, radius, color):
         self.position = pygame.math.Vector2(position)
         self.radius = radius
         self.color = color
-        
+
+    def move_to(self, x, y):
+        self.position.update(x, y)
+
     def draw(self, surface):
         pygame.draw.circle(surface, self.color, self.position, self.radius)
         
         # Draw the "Sweet Spot" ring (where speed is highest)
         # This helps you visualize the non-linear logic
         pygame.draw.circle(surface, (100, 100, 100), self.position, int(OPTIMAL_DISTANCE), 2)
-        label = font.render("Peak Speed Zone", True, (150, 150, 150))
+        label = get_font('Consolas', 20).render("Peak Speed Zone", True, (150, 150, 150))
         surface.blit(label, self.position + pygame.math.Vector2(-60, -OPTIMAL_DISTANCE - 25))
 
 
+# Vector2.rotate() snaps angles within this many radians of a quarter turn.
+# conformance.check_rotation() fails if pygame stops rotating this way
+ROTATE_EPSILON = 1e-6
+
+
 class Vehicle():
-    """Vehicle 4a: Non-Linear 'Bell Curve' Logic."""
+    """Vehicle 4a: Non-Linear 'Bell Curve' Logic.
+
+    Steps in plain floats: the rotations and distances are written out the
+    way pygame's Vector2.rotate() and distance_to() compute them (same
+    rounding, same quarter-turn snapping), without a Vector2 per call.
+    """
+    __slots__ = (
+        "position", "angle", "color", "radius", "sensor_distance", "wheel_distance",
+        "speed_L", "speed_R", "_cos", "_sin", "_rotated_angle",
+        "sensor_lx", "sensor_ly", "sensor_rx", "sensor_ry",
+        "_sensed_x", "_sensed_y", "_sensed_angle", "_sensed_sensor", "_sensed_wheel",
+    )
+
     def __init__(self, position, angle):
         self.position = pygame.math.Vector2(position)
         self.angle = angle
@@ -57,20 +80,69 @@ class Vehicle():
         self.speed_L = 0.0
         self.speed_R = 0.0
 
+        # Rotation by angle, and sensor positions for the pose and sensor
+        # geometry they were last computed at
+        self._cos = self._sin = 0.0
+        self._rotated_angle = None
+        self.sensor_lx = self.sensor_ly = self.sensor_rx = self.sensor_ry = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_angle = None
+        self._sensed_sensor = self._sensed_wheel = None
+
     def draw(self, surface):
         pygame.draw.circle(surface, self.color, self.position, self.radius)
-        end_point = self.position + pygame.math.Vector2(0, -self.radius).rotate(self.angle)
+        self._rotation()
+        end_point = (
+            self.position.x + self._sin * self.radius,
+            self.position.y - self._cos * self.radius,
+        )
         pygame.draw.line(surface, (255, 255, 255), self.position, end_point, 3)
 
-        # Sensors
-        s_L = self._get_sensor_pos(-1)
-        s_R = self._get_sensor_pos(1)
-        pygame.draw.circle(surface, (0, 255, 0), s_L, 8)
-        pygame.draw.circle(surface, (0, 255, 0), s_R, 8)
-
-    def _get_sensor_pos(self, side):
-        rel = pygame.math.Vector2(side * self.wheel_distance, -self.sensor_distance)
-        return self.position + rel.rotate(self.angle)
+        # Sensors (computed once per frame, shared with move_and_think)
+        self._get_sensor_pos()
+        pygame.draw.circle(surface, (0, 255, 0), (self.sensor_lx, self.sensor_ly), 8)
+        pygame.draw.circle(surface, (0, 255, 0), (self.sensor_rx, self.sensor_ry), 8)
+
+    def _rotation(self):
+        """Sets _cos and _sin to those Vector2.rotate(angle) uses."""
+        if self.angle == self._rotated_angle:
+            return
+        self._rotated_angle = self.angle
+        radians = math.fmod(self.angle * math.pi / 180.0, 2 * math.pi)
+        if radians < 0:
+            radians += 2 * math.pi
+        if math.fmod(radians + ROTATE_EPSILON, math.pi / 2) < 2 * ROTATE_EPSILON:
+            quarter = int((radians + ROTATE_EPSILON) / (math.pi / 2)) % 4
+            self._cos = (1.0, 0.0, -1.0, 0.0)[quarter]
+            self._sin = (0.0, 1.0, 0.0, -1.0)[quarter]
+        else:
+            self._cos = math.cos(radians)
+            self._sin = math.sin(radians)
+
+    def _get_sensor_pos(self):
+        """Sets sensor_lx, sensor_ly (side -1) and sensor_rx, sensor_ry
+        (side 1), unless neither the vehicle nor its sensor_distance or
+        wheel_distance changed since the last call."""
+        x = self.position.x
+        y = self.position.y
+        if (x == self._sensed_x and y == self._sensed_y and self.angle == self._sensed_angle
+                and self.sensor_distance == self._sensed_sensor
+                and self.wheel_distance == self._sensed_wheel):
+            return
+        self._rotation()
+        c = self._cos
+        s = self._sin
+        # (side * wheel_distance, -sensor_distance) rotated by angle
+        side_x = self.wheel_distance
+        ahead = -self.sensor_distance
+        self.sensor_lx = x + (c * -side_x - s * ahead)
+        self.sensor_ly = y + (s * -side_x + c * ahead)
+        self.sensor_rx = x + (c * side_x - s * ahead)
+        self.sensor_ry = y + (s * side_x + c * ahead)
+        self._sensed_x = x
+        self._sensed_y = y
+        self._sensed_angle = self.angle
+        self._sensed_sensor = self.sensor_distance
+        self._sensed_wheel = self.wheel_distance
 
     def _gaussian_activation(self, distance):
         """
@@ -86,11 +158,17 @@ class Vehicle():
 
     def move_and_think(self, source):
         # 1. SENSE
-        sensor_L = self._get_sensor_pos(-1)
-        sensor_R = self._get_sensor_pos(1)
+        self._get_sensor_pos()
         
-        dist_L = sensor_L.distance_to(source.position)
-        dist_R = sensor_R.distance_to(source.position)
+        # Distances as Vector2.distance_to computes them
+        source_x = source.position.x
+        source_y = source.position.y
+        dx = self.sensor_lx - source_x
+        dy = self.sensor_ly - source_y
+        dist_L = math.sqrt(dx * dx + dy * dy)
+        dx = self.sensor_rx - source_x
+        dy = self.sensor_ry - source_y
+        dist_R = math.sqrt(dx * dx + dy * dy)
         
         # 2. THINK (Non-Linear / Special Tastes)
         # Instead of 1/distance, we use the Bell Curve function
@@ -110,57 +188,64 @@ class Vehicle():
         
         avg_speed = (self.speed_L + self.speed_R) / 2
         
-        move_vector = pygame.math.Vector2(0, -1).rotate(self.angle)
-        self.position += move_vector * avg_speed
+        # (0, -1) rotated by angle is (sin, -cos)
+        self._rotation()
+        position = self.position
+        position.x += self._sin * avg_speed
+        position.y -= self._cos * avg_speed
 
         # Screen Wrap
-        if self.position.x < 0: self.position.x = WIDTH
-        if self.position.x > WIDTH: self.position.x = 0
-        if self.position.y < 0: self.position.y = HEIGHT
-        if self.position.y > HEIGHT: self.position.y = 0
+        if position.x < 0: position.x = WIDTH
+        if position.x > WIDTH: position.x = 0
+        if position.y < 0: position.y = HEIGHT
+        if position.y > HEIGHT: position.y = 0
 
 
-# --- GAME LOOP ---
-source = Source(position=(WIDTH / 2, HEIGHT / 2), radius=40, color=YELLOW)
-vehicle = Vehicle(position=(100, 100), angle=135) 
+def main():
+    screen = get_screen((WIDTH, HEIGHT))
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    font = get_font('Consolas', 20)
 
-running = True
-dragging_source = None
+    # --- GAME LOOP ---
+    source = Source(position=(WIDTH / 2, HEIGHT / 2), radius=40, color=YELLOW)
+    vehicle = Vehicle(position=(100, 100), angle=135) 
 
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: running = False
-        
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = pygame.math.Vector2(event.pos)
-            if source.position.distance_to(mouse_pos) < source.radius:
-                dragging_source = source
-        if event.type == pygame.MOUSEBUTTONUP:
-            dragging_source = None
-            
-    if dragging_source:
-        dragging_source.position = pygame.math.Vector2(pygame.mouse.get_pos())
-
-    vehicle.move_and_think(source)
-    
-    screen.fill(SCREEN_COLOR)
-    source.draw(screen)
-    vehicle.draw(screen)
-    
-    # Debug
-    dist = vehicle.position.distance_to(source.position)
-    # Visual bar for speed
-    bar_width = (vehicle.speed_L + vehicle.speed_R) * 20
-    pygame.draw.rect(screen, (0, 255, 0), (10, 40, bar_width, 20))
-    
-    text_dist = f"Distance: {dist:.0f} (Target: {OPTIMAL_DISTANCE:.0f})"
-    text_speed = f"Current Speed: {(vehicle.speed_L + vehicle.speed_R)/2:.2f}"
-    
-    screen.blit(font.render(text_dist, True, (255, 255, 255)), (10, 10))
-    screen.blit(font.render(text_speed, True, (255, 255, 255)), (10, 70))
-    screen.blit(font.render("Speed peaks at the grey circle!", True, (150, 150, 150)), (10, 100))
-    
-    pygame.display.flip()
-    clock.tick(FPS)
-
-pygame.quit()
\ No newline at end of file
+    running = True
+    editor = Editor()
+    editor.add(source.position.x, source.position.y, source.radius, on_move=source.move_to)
+
+    while running:
+        for event in events.get():
+            if event.type == pygame.QUIT: running = False
+            editor.handle(event)
+
+        vehicle.move_and_think(source)
+
+        screen.fill(SCREEN_COLOR)
+        source.draw(screen)
+        editor.draw(screen)
+        vehicle.draw(screen)
+
+        # Debug
+        dist = vehicle.position.distance_to(source.position)
+        # Visual bar for speed
+        bar_width = (vehicle.speed_L + vehicle.speed_R) * 20
+        pygame.draw.rect(screen, (0, 255, 0), (10, 40, bar_width, 20))
+
+        text_dist = f"Distance: {dist:.0f} (Target: {OPTIMAL_DISTANCE:.0f})"
+        text_speed = f"Current Speed: {(vehicle.speed_L + vehicle.speed_R)/2:.2f}"
+
+        screen.blit(font.render(text_dist, True, (255, 255, 255)), (10, 10))
+        screen.blit(font.render(text_speed, True, (255, 255, 255)), (10, 70))
+        screen.blit(font.render("Speed peaks at the grey circle!", True, (150, 150, 150)), (10, 100))
+
+        pygame.display.flip()
+        events.tick(clock, FPS)
+
+    events.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,14 +1,12 @@
 import pygame
 import math
 
+from display import get_font, get_screen
+import playback
+
 # --- INITIALIZATION ---
-pygame.init()
+# The window and fonts are only created once main() starts rendering
 WIDTH, HEIGHT = 900, 700
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vehicle 4b: ReLU Logic & Decisions")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont("consolas", 16)
-bold_font = pygame.font.SysFont("consolas", 16, bold=True)
 
 # --- COLORS ---
 BG_COLOR = (20, 20, 30)  # Dark background to make lights pop
@@ -19,6 +17,13 @@ THRESHOLD_RING_COLOR = (255, 50, 50)
 
 # --- VEHICLE CLASS ---
 class Vehicle4b_ReLU:
+    __slots__ = (
+        "x", "y", "radius", "heading", "sensor_angle", "sensor_dist",
+        "relu_threshold", "relu_gain", "max_speed", "status_left", "status_right",
+        "lx", "ly", "rx", "ry",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -43,13 +48,30 @@ class Vehicle4b_ReLU:
         self.status_left = False # False = Stopped (Red), True = Moving (Green)
         self.status_right = False
 
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.lx = self.ly = self.rx = self.ry = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
+
     def _get_sensor_pos(self):
-        # Calculate positions of left and right sensors
-        lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
-        ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
-        rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
-        ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
-        return (lx, ly), (rx, ry)
+        # Calculate positions of left and right sensors into lx, ly, rx, ry,
+        # unless neither the vehicle nor its sensor angle or distance changed
+        # since the last call
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
+        self.lx = self.x + math.cos(self.heading + self.sensor_angle) * self.sensor_dist
+        self.ly = self.y + math.sin(self.heading + self.sensor_angle) * self.sensor_dist
+        self.rx = self.x + math.cos(self.heading - self.sensor_angle) * self.sensor_dist
+        self.ry = self.y + math.sin(self.heading - self.sensor_angle) * self.sensor_dist
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_angle
+        self._sensed_dist = self.sensor_dist
 
     def relu_activation(self, intensity):
         """
@@ -63,13 +85,13 @@ class Vehicle4b_ReLU:
             return (intensity - self.relu_threshold) * self.relu_gain
 
     def update(self, light_pos):
-        l_pos, r_pos = self._get_sensor_pos()
+        self._get_sensor_pos()
         
         # 1. CALCULATE INPUT INTENSITY (Inverse Linear Distance)
         # Max sensing distance is 600px
         max_dist = 600.0
-        dist_l = math.hypot(l_pos[0] - light_pos[0], l_pos[1] - light_pos[1])
-        dist_r = math.hypot(r_pos[0] - light_pos[0], r_pos[1] - light_pos[1])
+        dist_l = math.hypot(self.lx - light_pos[0], self.ly - light_pos[1])
+        dist_r = math.hypot(self.rx - light_pos[0], self.ry - light_pos[1])
         
         raw_l = max(0.0, 1.0 - (dist_l / max_dist))
         raw_r = max(0.0, 1.0 - (dist_r / max_dist))
@@ -113,9 +135,9 @@ class Vehicle4b_ReLU:
         pygame.draw.circle(surface, VEHICLE_COLOR, (int(self.x), int(self.y)), self.radius)
         
         # Draw Sensors
-        l_pos, r_pos = self._get_sensor_pos()
-        pygame.draw.circle(surface, SENSOR_COLOR, (int(l_pos[0]), int(l_pos[1])), 6)
-        pygame.draw.circle(surface, SENSOR_COLOR, (int(r_pos[0]), int(r_pos[1])), 6)
+        self._get_sensor_pos()
+        pygame.draw.circle(surface, SENSOR_COLOR, (int(self.lx), int(self.ly)), 6)
+        pygame.draw.circle(surface, SENSOR_COLOR, (int(self.rx), int(self.ry)), 6)
         
         # Draw Nose Line
         nose_x = self.x + math.cos(self.heading) * self.radius
@@ -143,64 +165,75 @@ class Vehicle4b_ReLU:
         pygame.draw.circle(surface, color_r, (int(rx), int(ry)), 4) # Light
 
 
-# --- MAIN SETUP ---
-vehicle = Vehicle4b_ReLU(100, 100)
-light_pos = [WIDTH//2, HEIGHT//2]
-
-running = True
-while running:
-    screen.fill(BG_COLOR)
-    
-    # --- EVENTS ---
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: running = False
-        # Move light source
-        if event.type == pygame.MOUSEMOTION:
-            if event.buttons[0]: # Click and drag
+def main():
+    screen = get_screen((WIDTH, HEIGHT), "Vehicle 4b: ReLU Logic & Decisions")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+    font = get_font("consolas", 16)
+
+    # --- MAIN SETUP ---
+    vehicle = Vehicle4b_ReLU(100, 100)
+    light_pos = [WIDTH//2, HEIGHT//2]
+
+    running = True
+    while running:
+        screen.fill(BG_COLOR)
+
+        # --- EVENTS ---
+        for event in events.get():
+            if event.type == pygame.QUIT: running = False
+            # Move light source
+            if event.type == pygame.MOUSEMOTION:
+                if event.buttons[0]: # Click and drag
+                    light_pos = list(event.pos)
+            if event.type == pygame.MOUSEBUTTONDOWN:
                 light_pos = list(event.pos)
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            light_pos = list(event.pos)
 
-    # --- DRAW LIGHT SOURCE & THRESHOLD BOUNDARY ---
-    pygame.draw.circle(screen, LIGHT_SOURCE_COLOR, light_pos, 25)
-    
-    # CALCULATE VISUAL THRESHOLD RING
-    # If threshold is 0.4, that means distance is (1 - 0.4) * max_dist = 0.6 * 600 = 360
-    # The vehicle will only react if it enters this circle.
-    thresh_px = (1.0 - vehicle.relu_threshold) * 600.0
-    pygame.draw.circle(screen, THRESHOLD_RING_COLOR, light_pos, int(thresh_px), 2)
-    
-    # Draw Label for Threshold
-    label = font.render("DECISION BOUNDARY (ReLU Threshold)", True, THRESHOLD_RING_COLOR)
-    screen.blit(label, (light_pos[0] - 100, light_pos[1] + int(thresh_px) + 10))
+        # --- DRAW LIGHT SOURCE & THRESHOLD BOUNDARY ---
+        pygame.draw.circle(screen, LIGHT_SOURCE_COLOR, light_pos, 25)
 
-    # --- UPDATE & DRAW VEHICLE ---
-    raw_l, raw_r, mot_l, mot_r = vehicle.update(light_pos)
-    vehicle.draw(screen)
+        # CALCULATE VISUAL THRESHOLD RING
+        # If threshold is 0.4, that means distance is (1 - 0.4) * max_dist = 0.6 * 600 = 360
+        # The vehicle will only react if it enters this circle.
+        thresh_px = (1.0 - vehicle.relu_threshold) * 600.0
+        pygame.draw.circle(screen, THRESHOLD_RING_COLOR, light_pos, int(thresh_px), 2)
 
-    # --- UI / TELEMETRY ---
-    # Display the math
-    ui_y = 10
-    
-    lines = [
-        ("VEHICLE 4b: RELU ACTIVATION", (255, 255, 255)),
-        (f"ReLU Threshold: {vehicle.relu_threshold}", (200, 200, 200)),
-        (f"Input Left: {raw_l:.2f} -> ReLU -> Motor Right: {mot_r:.2f}", (200, 255, 200) if mot_r > 0 else (255, 100, 100)),
-        (f"Input Right: {raw_r:.2f} -> ReLU -> Motor Left:  {mot_l:.2f}", (200, 255, 200) if mot_l > 0 else (255, 100, 100)),
-        ("--------------------------------", (255,255,255)),
-        ("RED LIGHTS  = 'Pondering' (Input < Threshold)", (255, 100, 100)),
-        ("GREEN LIGHTS = 'Decided'   (Input > Threshold)", (100, 255, 100)),
-    ]
-    
-    for text, color in lines:
-        surf = font.render(text, True, color)
-        screen.blit(surf, (10, ui_y))
-        ui_y += 20
+        # Draw Label for Threshold
+        label = font.render("DECISION BOUNDARY (ReLU Threshold)", True, THRESHOLD_RING_COLOR)
+        screen.blit(label, (light_pos[0] - 100, light_pos[1] + int(thresh_px) + 10))
+
+        # --- UPDATE & DRAW VEHICLE ---
+        raw_l, raw_r, mot_l, mot_r = vehicle.update(light_pos)
+        vehicle.draw(screen)
+
+        # --- UI / TELEMETRY ---
+        # Display the math
+        ui_y = 10
+
+        lines = [
+            ("VEHICLE 4b: RELU ACTIVATION", (255, 255, 255)),
+            (f"ReLU Threshold: {vehicle.relu_threshold}", (200, 200, 200)),
+            (f"Input Left: {raw_l:.2f} -> ReLU -> Motor Right: {mot_r:.2f}", (200, 255, 200) if mot_r > 0 else (255, 100, 100)),
+            (f"Input Right: {raw_r:.2f} -> ReLU -> Motor Left:  {mot_l:.2f}", (200, 255, 200) if mot_l > 0 else (255, 100, 100)),
+            ("--------------------------------", (255,255,255)),
+            ("RED LIGHTS  = 'Pondering' (Input < Threshold)", (255, 100, 100)),
+            ("GREEN LIGHTS = 'Decided'   (Input > Threshold)", (100, 255, 100)),
+        ]
+
+        for text, color in lines:
+            surf = font.render(text, True, color)
+            screen.blit(surf, (10, ui_y))
+            ui_y += 20
+
+        pygame.display.flip()
+        events.tick(clock, 60)
+
+    events.close()
+    pygame.quit()
 
-    pygame.display.flip()
-    clock.tick(60)
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
 
 # import pygame
 # import math
@@ -1,23 +1,30 @@
 import pygame
 import math
 
-pygame.init()
+from display import get_font, get_screen
+import playback
 
-# Setup Pygame window
+# Setup Pygame window (opened lazily by main())
 WIDTH, HEIGHT = 600, 600
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Vehicles")
 
-# Setup clock for controlling frame rate
-clock = pygame.time.Clock()
+# Frame rate
 fps = 60
 
-# Setup font for debug info
-font = pygame.font.SysFont("consolas", 16)
-
 
 # Vehicle Two
 class VehicleTwo:
+    # All the script vehicles list their attributes in __slots__: with no
+    # per-instance __dict__ a crowd of them stays small, and update() keeps
+    # its state in plain float attributes (sensor positions are cached until
+    # the pose changes), so a step allocates nothing but the floats it
+    # computes. ADD any new attribute here too
+    __slots__ = (
+        "x", "y", "radius", "heading", "sensor_offset_angle", "sensor_dist",
+        "intensity_left", "intensity_right",
+        "left_x", "left_y", "right_x", "right_y",
+        "_sensed_x", "_sensed_y", "_sensed_heading", "_sensed_angle", "_sensed_dist",
+    )
+
     def __init__(self, x, y, radius=20, heading=0):
         # Vehicle state
         self.x = x
@@ -28,9 +35,23 @@ class VehicleTwo:
         # Sensor configuration
         self.sensor_offset_angle = math.radians(30)
         self.sensor_dist = self.radius
+        self.intensity_left = self.intensity_right = 0.0
+
+        # Sensor positions, for the pose and sensor geometry they were last
+        # computed at
+        self.left_x = self.left_y = self.right_x = self.right_y = 0.0
+        self._sensed_x = self._sensed_y = self._sensed_heading = None
+        self._sensed_angle = self._sensed_dist = None
 
     # Calculate sensor positions based on vehicle position and heading
+    # (cached until the vehicle moves or its sensors are reconfigured, so
+    # draw() reuses update()'s)
     def _sensor_positions(self):
+        if (self.x == self._sensed_x and self.y == self._sensed_y
+                and self.heading == self._sensed_heading
+                and self.sensor_offset_angle == self._sensed_angle
+                and self.sensor_dist == self._sensed_dist):
+            return
         angle = self.sensor_offset_angle
         distance = self.sensor_dist
 
@@ -44,19 +65,19 @@ class VehicleTwo:
         cos_heading = math.cos(self.heading)
         sin_heading = math.sin(self.heading)
 
-        left_world_x = self.x + cos_heading * left_local_x - sin_heading * left_local_y
-        left_world_y = self.y + sin_heading * left_local_x + cos_heading * left_local_y
-        right_world_x = (
+        self.left_x = self.x + cos_heading * left_local_x - sin_heading * left_local_y
+        self.left_y = self.y + sin_heading * left_local_x + cos_heading * left_local_y
+        self.right_x = (
             self.x + cos_heading * right_local_x - sin_heading * right_local_y
         )
-        right_world_y = (
+        self.right_y = (
             self.y + sin_heading * right_local_x + cos_heading * right_local_y
         )
-
-        # Return sensor positions
-        left_sensor_position = (left_world_x, left_world_y)
-        right_sensor_position = (right_world_x, right_world_y)
-        return left_sensor_position, right_sensor_position
+        self._sensed_x = self.x
+        self._sensed_y = self.y
+        self._sensed_heading = self.heading
+        self._sensed_angle = self.sensor_offset_angle
+        self._sensed_dist = self.sensor_dist
 
     # Calculate intensity value of a particular source at a given point
     def _intensity_at(self, point_x, point_y, light_x, light_y):
@@ -68,15 +89,15 @@ class VehicleTwo:
     # Update sensor intensities based on light position(s)
     def update(self, light_pos):
         # Get sensor positions
-        left_sensor, right_sensor = self._sensor_positions()
+        self._sensor_positions()
 
         # Calculate intensities at each sensor
         # Update this section to handle multiple light sources if needed
         self.intensity_left = self._intensity_at(
-            left_sensor[0], left_sensor[1], light_pos[0], light_pos[1]
+            self.left_x, self.left_y, light_pos[0], light_pos[1]
         )
         self.intensity_right = self._intensity_at(
-            right_sensor[0], right_sensor[1], light_pos[0], light_pos[1]
+            self.right_x, self.right_y, light_pos[0], light_pos[1]
         )
         left_motor_speed = (
             1  # EDIT this value to set left motor speed based on intensity
@@ -106,15 +127,16 @@ class VehicleTwo:
             surface, (0, 0, 0), (int(self.x), int(self.y)), self.radius, 2
         )
 
-        left_sensor, right_sensor = self._sensor_positions()
+        self._sensor_positions()
         pygame.draw.circle(
-            surface, (255, 0, 0), (int(left_sensor[0]), int(left_sensor[1])), 5
+            surface, (255, 0, 0), (int(self.left_x), int(self.left_y)), 5
         )
         pygame.draw.circle(
-            surface, (255, 0, 0), (int(right_sensor[0]), int(right_sensor[1])), 5
+            surface, (255, 0, 0), (int(self.right_x), int(self.right_y)), 5
         )
 
         # Optionally draw debug info
+        font = get_font("consolas", 16)
         if font:
             surface.blit(
                 font.render(
@@ -156,32 +178,43 @@ class Light:
         )
 
 
-# CREATE instances of vehicles and light sources
-# ADJUST as needed to create multiple vehicles or lights
-light = Light(WIDTH // 2, HEIGHT // 2, radius=20)
-vehicle = VehicleTwo(WIDTH // 2 - 100, HEIGHT // 2, radius=20)
+def main():
+    # Setup Pygame window and clock for controlling frame rate
+    screen = get_screen((WIDTH, HEIGHT), "Vehicles")
+    clock = pygame.time.Clock()
+    events = playback.from_args()
+
+    # CREATE instances of vehicles and light sources
+    # ADJUST as needed to create multiple vehicles or lights
+    light = Light(WIDTH // 2, HEIGHT // 2, radius=20)
+    vehicle = VehicleTwo(WIDTH // 2 - 100, HEIGHT // 2, radius=20)
+
+    running = True
+    while running:
+        screen.fill((255, 255, 255))
+
+        for event in events.get():
+            if event.type == pygame.QUIT:
+                running = False
+            # OPTIONAL functionality to move light with mouse
+            # If needed, extend this to handle multiple lights
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                light.move_light(event.pos)
 
-running = True
-while running:
-    screen.fill((255, 255, 255))
+        # Draw light source(s)
+        light.draw(screen)
 
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        # OPTIONAL functionality to move light with mouse
-        # If needed, extend this to handle multiple lights
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            light.move_light(event.pos)
+        # Update and draw vehicle(s)
+        # EDIT the update method to pass multiple light positions if needed
+        vehicle.update(light.pos())
+        vehicle.draw(screen)
 
-    # Draw light source(s)
-    light.draw(screen)
+        pygame.display.flip()
+        events.tick(clock, fps)
 
-    # Update and draw vehicle(s)
-    # EDIT the update method to pass multiple light positions if needed
-    vehicle.update(light.pos())
-    vehicle.draw(screen)
+    events.close()
+    pygame.quit()
 
-    pygame.display.flip()
-    clock.tick(fps)
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
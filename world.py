@@ -0,0 +1,1037 @@
+"""
+Headless, batched version of the vehicles in this repo.
+
+Every script keeps one vehicle in one object and steps it with Python floats.
+Here a World holds whole populations of vehicles as numpy arrays and steps
+each population with a handful of array operations, so thousands of vehicles
+can run without a window.
+
+The wiring of every model is copied from its script:
+
+    "1"   VehicleOne       (vehicle1.py)   single sensor, inverse-square, Brownian
+    "2a"  VehicleTwo 2a    (vehicle2.py)   uncrossed excitatory (fear)
+    "2b"  VehicleTwo 2b    (vehicle2.py)   crossed excitatory (aggression)
+    "3a"  Vehicle3a        (vehicle3a.py)  crossed inhibitory (lover)
+    "3b"  Vehicle3b        (vehicle3b.py)  uncrossed inhibitory (explorer)
+    "3c"  Vehicle3c        (vehicle3c.py)  one wiring per source type
+    "4a"  Vehicle4a        (vehicle4a.py)  gaussian taste on intensity
+    "4aa" Vehicle          (vehicle4aa.py) gaussian taste on distance
+    "4b"  Vehicle4b_ReLU   (vehicle4b.py)  thresholded (ReLU) crossed wiring
+    "retina"                               any number of sensors on an arc
+
+Models other than 3c treat every source as a light and sum what they sense,
+so a scene with a single source behaves exactly like the script.
+"""
+
+import heapq
+import itertools
+import math
+
+import numpy as np
+
+import fields
+import integrators
+from obstacles import SegmentGrid
+
+# --- MODELS & SOURCES ---
+MODELS = ("1", "2a", "2b", "3a", "3b", "3c", "4a", "4aa", "4b", "retina")
+SOURCE_TYPES = ("light", "temp", "oxygen", "organic")
+
+# wake_step of a sleeper that only a source change can wake
+NEVER = np.iinfo(np.int64).max
+
+# Tuning copied from the scalar classes. Any of these can be overridden per
+# population, either with a scalar or with one value per vehicle.
+DEFAULTS = {
+    "1": dict(
+        radius=20, sensor_dist=20, max_perturbation=math.radians(1.0),
+    ),
+    "2a": dict(
+        radius=20, sensor_dist=20, sensor_angle=math.radians(45),
+        speed_scaler=2.0, base_speed=1.0, turning_scaler=0.8,
+        max_distance=600.0,
+    ),
+    "2b": dict(
+        radius=20, sensor_dist=20, sensor_angle=math.radians(45),
+        speed_scaler=2.0, base_speed=1.0, turning_scaler=0.8,
+        max_distance=600.0,
+    ),
+    "3a": dict(
+        radius=20, sensor_dist=20, sensor_angle=math.radians(45),
+        base_speed=3.0, inhibition_scaler=2.8, turning_scaler=0.8,
+        max_distance=400.0,
+    ),
+    "3b": dict(
+        radius=20, sensor_dist=20, sensor_angle=math.radians(45),
+        base_speed=3.0, inhibition_scaler=2.8, turning_scaler=0.8,
+        max_distance=400.0,
+    ),
+    "3c": dict(
+        radius=25, sensor_dist=25, sensor_angle=math.radians(40),
+        base_speed=2.0, max_speed=6.0, turning_scaler=0.6,
+        max_distance=350.0, gain_excite=3.0, gain_inhibit=2.5,
+    ),
+    "4a": dict(
+        radius=20, sensor_dist=25, sensor_angle=math.radians(45),
+        preferred_intensity=0.5, curve_width=0.2, max_motor_speed=4.0,
+        base_speed=2.0, turning_scaler=0.12, max_distance=500.0,
+    ),
+    "4aa": dict(
+        radius=30, sensor_forward=40, sensor_lateral=30,
+        optimal_distance=250.0, curve_width=100.0, max_speed=5.0,
+        turning_scaler=5.0,  # degrees per unit of motor difference
+    ),
+    "4b": dict(
+        radius=25, sensor_dist=25, sensor_angle=math.radians(40),
+        relu_threshold=0.4, relu_gain=8.0, max_speed=6.0,
+        turning_scaler=0.15, max_distance=600.0,
+    ),
+    # n_sensors sensors spread evenly over field_of_view, each splitting its
+    # reading between the motors by how far to its side it sits. gain < 0
+    # inhibits; crossed=1 swaps the sides. n_sensors=2 with field_of_view=90
+    # degrees is VehicleTwo (gain=2) or Vehicle3a/3b (gain=-2.8, base 3)
+    "retina": dict(
+        radius=20, sensor_dist=20, n_sensors=8, field_of_view=math.radians(120),
+        base_speed=1.0, gain=2.0, crossed=1.0, max_speed=6.0,
+        turning_scaler=0.8, max_distance=600.0,
+    ),
+}
+
+
+def _col(value):
+    """Turn a scalar or per-vehicle parameter into something that broadcasts
+    against an (n_vehicles, n_sources) array."""
+    value = np.asarray(value, dtype=float)
+    return value[:, None] if value.ndim == 1 else value
+
+
+class Population:
+    """A batch of vehicles that all run the same model."""
+
+    # Per-vehicle arrays that make up the state of a population
+    STATE_ARRAYS = (
+        "x", "y", "heading", "sensors", "motors",
+        "awake", "anchor_step", "coast", "wake_radius", "wake_step",
+    )
+
+    def __init__(self, model, x, y, heading=0.0, dtype=np.float64, **params):
+        if model not in MODELS:
+            raise ValueError(f"unknown model {model!r}, expected one of {MODELS}")
+        unknown = set(params) - set(DEFAULTS[model])
+        if unknown:
+            raise ValueError(f"unknown parameters for model {model}: {sorted(unknown)}")
+
+        self.model = model
+        self.x = np.array(x, dtype=dtype, ndmin=1)
+        self.y = np.array(y, dtype=dtype, ndmin=1)
+        self.heading = np.broadcast_to(
+            np.asarray(heading, dtype=dtype), self.x.shape
+        ).copy()
+
+        self.params = dict(DEFAULTS[model])
+        for name, value in params.items():
+            value = np.asarray(value, dtype=float)
+            self.params[name] = value if value.ndim else float(value)
+        if model == "retina" and np.ndim(self.params["n_sensors"]):
+            raise ValueError("n_sensors must be the same for the whole population")
+
+        # Last values seen by the sensors and sent to the motors (left, right),
+        # the same numbers the scripts return from update()
+        self.sensors = np.zeros((len(self.x), 2), dtype=dtype)
+        self.motors = np.zeros((len(self.x), 2), dtype=dtype)
+        self._init_sleep()
+        self._init_noise()
+
+    def _init_noise(self):
+        # Sensor and motor noise (a noise.Noise), drawn from streams keyed by
+        # each vehicle's id; ids None numbers the vehicles 0..n-1
+        self.noise = None
+        self.ids = None
+
+    def _init_sleep(self):
+        # Sleeping vehicles (see World.sleep) are not stepped. Their x, y and
+        # heading hold the state at anchor_step, from where they coast with
+        # constant (speed, turn) until a step or a source change wakes them.
+        # A sleeper wakes when a source moves or appears within wake_radius,
+        # or when the world reaches its wake_step. The arrays are allocated by
+        # the first sleep(); until then they are None and everyone is awake.
+        self.awake = None
+        self.anchor_step = None
+        self.coast = None
+        self.wake_radius = None
+        self.wake_step = None
+
+    def _alloc_sleep(self):
+        if self.awake is not None:
+            return
+        n, dtype = len(self.x), self.x.dtype
+        self.awake = np.ones(n, dtype=bool)
+        self.anchor_step = np.zeros(n, dtype=np.int64)
+        self.coast = np.zeros((n, 2), dtype=dtype)
+        self.wake_radius = np.full(n, np.inf, dtype=dtype)
+        self.wake_step = np.full(n, NEVER, dtype=np.int64)
+
+    def awake_vehicles(self):
+        """Indices of the vehicles that are stepped."""
+        if self.awake is None:
+            return np.arange(len(self.x))
+        return np.flatnonzero(self.awake)
+
+    def sleeping_vehicles(self):
+        """Indices of the vehicles that sleep."""
+        if self.awake is None:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(~self.awake)
+
+    @classmethod
+    def from_arrays(cls, model, params, arrays):
+        """Build a population around existing state arrays without copying
+        them (used to resume from a snapshot). Missing sleep arrays start
+        out awake."""
+        population = cls.__new__(cls)
+        population.model = model
+        population.params = dict(DEFAULTS[model])
+        population.params.update(params)
+        population._init_sleep()
+        population._init_noise()
+        for name in cls.STATE_ARRAYS:
+            if arrays.get(name) is not None:
+                setattr(population, name, arrays[name])
+        return population
+
+    def take(self, index):
+        """A new population holding copies of the vehicles at index."""
+        params = {
+            name: value[index] if isinstance(value, np.ndarray) else value
+            for name, value in self.params.items()
+        }
+        arrays = {
+            name: getattr(self, name)[index]
+            for name in self.STATE_ARRAYS if getattr(self, name) is not None
+        }
+        population = Population.from_arrays(self.model, params, arrays)
+        if self.noise is not None:
+            population.noise = self.noise
+            population.ids = self.vehicle_ids[index]
+        return population
+
+    def put(self, index, other):
+        """Write the state of a population made by take(index) back."""
+        for name in self.STATE_ARRAYS:
+            if getattr(self, name) is not None:
+                getattr(self, name)[index] = getattr(other, name)
+
+    def drive(self):
+        """Forward speed and turn rate per frame implied by the last motor
+        values. VehicleOne's turning is random, so its turn is reported as 0."""
+        left, right = self.motors[:, 0], self.motors[:, 1]
+        speed = (left + right) / 2
+        scaler = self.params.get("turning_scaler", 0.0)
+        if self.model == "1":
+            turn = np.zeros(len(self))
+        elif self.model == "4a":
+            turn = (right - left) * scaler
+        elif self.model == "4aa":
+            turn = np.radians((left - right) * scaler)
+        else:
+            turn = (left - right) * scaler
+        return speed, turn
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def vehicle_ids(self):
+        """Id of every vehicle, which picks its noise streams: ids, or the
+        position in the population when ids is None."""
+        return np.arange(len(self.x)) if self.ids is None else self.ids
+
+    @property
+    def nbytes(self):
+        """Bytes held by the per-vehicle state and parameter arrays."""
+        total = sum(
+            getattr(self, name).nbytes
+            for name in self.STATE_ARRAYS if getattr(self, name) is not None
+        )
+        return total + sum(
+            value.nbytes for value in self.params.values() if isinstance(value, np.ndarray)
+        )
+
+    def sensor_positions(self, x=None, y=None, heading=None):
+        """World coordinates of the left and right sensors, as (x, y) pairs of
+        arrays. VehicleOne has a single sensor, returned twice.
+
+        x, y and heading default to the current state.
+        """
+        p = self.params
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        heading = self.heading if heading is None else heading
+        if self.model == "1":
+            sx = x + np.cos(heading) * p["sensor_dist"]
+            sy = y + np.sin(heading) * p["sensor_dist"]
+            return (sx, sy), (sx, sy)
+        if self.model == "retina":
+            # The outermost sensors
+            px, py = self.sensor_points(x, y, heading)
+            return (px[:, 0], py[:, 0]), (px[:, -1], py[:, -1])
+        if self.model == "4aa":
+            # Sensors sit ahead of the body and out to the sides
+            cos_h, sin_h = np.cos(heading), np.sin(heading)
+            fwd, lat = p["sensor_forward"], p["sensor_lateral"]
+            lx = x + cos_h * fwd + sin_h * lat
+            ly = y + sin_h * fwd - cos_h * lat
+            rx = x + cos_h * fwd - sin_h * lat
+            ry = y + sin_h * fwd + cos_h * lat
+            return (lx, ly), (rx, ry)
+        # cos(heading +- angle) rather than a rotation of fixed offsets, so the
+        # result rounds exactly like the scripts
+        a, d = p["sensor_angle"], p["sensor_dist"]
+        lx = x + np.cos(heading + a) * d
+        ly = y + np.sin(heading + a) * d
+        rx = x + np.cos(heading - a) * d
+        ry = y + np.sin(heading - a) * d
+        return (lx, ly), (rx, ry)
+
+    def sensor_offsets(self):
+        """Sensor positions relative to the body as (forward, left) pairs,
+        shape (k, 2), plus each sensor's share of its reading that goes to
+        the left motor, shape (k,). Computed once per population."""
+        cached = getattr(self, "_offsets", None)
+        if cached is not None:
+            return cached
+        p = self.params
+        if self.model == "retina":
+            k = int(p["n_sensors"])
+            half = p["field_of_view"] / 2
+            angles = np.linspace(half, -half, k) if k > 1 else np.zeros(1)
+            d = p["sensor_dist"]
+            offsets = np.column_stack((np.cos(angles) * d, np.sin(angles) * d))
+            side = np.sin(angles)
+            reach = np.abs(side).max()
+            left_share = (1 + (side / reach if reach > 0 else side)) / 2
+        elif self.model == "4aa":
+            offsets = np.array([
+                [p["sensor_forward"], -p["sensor_lateral"]],
+                [p["sensor_forward"], p["sensor_lateral"]],
+            ])
+            left_share = np.array([1.0, 0.0])
+        elif self.model == "1":
+            offsets = np.array([[p["sensor_dist"], 0.0]] * 2)
+            left_share = np.array([1.0, 0.0])
+        else:
+            a, d = p["sensor_angle"], p["sensor_dist"]
+            offsets = np.array([
+                [math.cos(a) * d, math.sin(a) * d],
+                [math.cos(a) * d, -math.sin(a) * d],
+            ])
+            left_share = np.array([1.0, 0.0])
+        self._offsets = (offsets, left_share)
+        return self._offsets
+
+    def sensor_points(self, x=None, y=None, heading=None):
+        """World coordinates of every sensor, as x and y arrays of shape
+        (n, k), from one rotation of the local offsets."""
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        heading = self.heading if heading is None else heading
+        offsets, _ = self.sensor_offsets()
+        cos_h = np.cos(heading)[:, None]
+        sin_h = np.sin(heading)[:, None]
+        forward, left = offsets[:, 0], offsets[:, 1]
+        # Left is the +angle side, like sensor_angle in the scripts
+        px = x[:, None] + cos_h * forward - sin_h * left
+        py = y[:, None] + sin_h * forward + cos_h * left
+        return px, py
+
+
+class World:
+    """Sources and vehicle populations sharing one wrapped screen."""
+
+    # Per-source and per-wall arrays that make up the state of the world
+    STATE_ARRAYS = (
+        "source_x", "source_y", "source_kind", "source_radius",
+        "source_strength", "source_dynamic",
+        "wall_x0", "wall_y0", "wall_x1", "wall_y1",
+    )
+
+    def __init__(self, width, height, seed=None, dt=1.0, integrator="euler",
+                 dtype=np.float64):
+        if integrator not in integrators.INTEGRATORS:
+            raise ValueError(
+                f"unknown integrator {integrator!r}, expected one of {integrators.INTEGRATORS}"
+            )
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"dtype must be float32 or float64, not {dtype}")
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+        self.step_count = 0
+
+        # Each step advances dt frames (the scripts use dt=1 with "euler")
+        self.dt = dt
+        self.integrator = integrator
+        # Storage type of the vehicle state. float32 halves the memory of a
+        # population; steps still compute in float64 and round on store
+        self.dtype = dtype
+
+        # Sources, one entry per source
+        self.source_x = np.zeros(0)
+        self.source_y = np.zeros(0)
+        self.source_kind = np.zeros(0, dtype=np.int8)
+        self.source_radius = np.zeros(0)
+        # Scales everything sensed from a source; 0 switches it off
+        self.source_strength = np.zeros(0)
+        # Sources that change every step (see schedules.py); caches such as
+        # the field quadtree hold only the others
+        self.source_dynamic = np.zeros(0, dtype=bool)
+
+        # Wall segments, which hide sources and which vehicles bounce off
+        self.wall_x0 = np.zeros(0)
+        self.wall_y0 = np.zeros(0)
+        self.wall_x1 = np.zeros(0)
+        self.wall_y1 = np.zeros(0)
+        self.wall_cell = 32.0
+        self._wall_grid = None
+
+        # Opening angle of the Barnes-Hut evaluator for VehicleOne's
+        # inverse-square field (see fields.py); None sums every source exactly
+        self.field_theta = None
+        self._field_tree = None
+
+        self.populations = []
+        # Callables run after every step as observer(world)
+        self.observers = []
+        # Bumped whenever a source is added or changed, and static_version
+        # only when a static (not dynamic) source is
+        self.source_version = 0
+        self.static_version = 0
+        # Timed wake-ups as (step, tie breaker, population, indices)
+        self._wake_queue = []
+        self._wake_counter = itertools.count()
+
+    # --- SOURCES ---
+    def add_source(self, x, y, kind="light", radius=20, strength=1.0):
+        """Add a source and return its index."""
+        self.source_x = np.append(self.source_x, float(x))
+        self.source_y = np.append(self.source_y, float(y))
+        self.source_kind = np.append(
+            self.source_kind, np.int8(SOURCE_TYPES.index(kind))
+        )
+        self.source_radius = np.append(self.source_radius, float(radius))
+        self.source_strength = np.append(self.source_strength, float(strength))
+        self.source_dynamic = np.append(self.source_dynamic, False)
+        index = len(self.source_x) - 1
+        self._sources_changed([index])
+        return index
+
+    def move_source(self, index, new_position):
+        self.source_x[index], self.source_y[index] = new_position
+        self._sources_changed([index])
+
+    def move_sources(self, index, x, y):
+        """Move several sources at once."""
+        self.source_x[index] = x
+        self.source_y[index] = y
+        self._sources_changed(index)
+
+    def set_source_strengths(self, index, strength):
+        self.source_strength[index] = strength
+        self._sources_changed(index)
+
+    def set_dynamic(self, index, dynamic=True):
+        """Mark sources as changing every step (or not any more)."""
+        index = np.atleast_1d(np.asarray(index, dtype=np.intp))
+        index = index[self.source_dynamic[index] != dynamic]
+        if not len(index):
+            return
+        self.source_dynamic[index] = dynamic
+        # Either way the set of static sources changed, and with it what the
+        # timed sleepers were scheduled against
+        self._sources_changed(index, static=True)
+
+    def _sources_changed(self, index, static=None):
+        """Wake the sleepers that a change of the given sources can affect.
+
+        A sleeper is affected when a changed source is within its
+        wake_radius of where it has coasted to by now. Parked sleepers
+        (coasting with speed and turn 0) then sense again, since what they
+        read is summed over every source and scaled by strength: they stay
+        asleep, with fresh sensor values, while their motors stay off.
+
+        Timed sleepers were scheduled against the static sources, so a
+        change of a static source wakes all of them; dynamic sources, which
+        change every step, only wake the sleepers they come near. static
+        overrides which of the two the change counts as.
+        """
+        index = np.atleast_1d(np.asarray(index, dtype=np.intp))
+        self.source_version += 1
+        if static is None:
+            static = not self.source_dynamic[index].all()
+        if static:
+            self.static_version += 1
+        if not len(index):
+            return
+        sx = self.source_x[index]
+        sy = self.source_y[index]
+        for pop in self.populations:
+            asleep = pop.sleeping_vehicles()
+            if not len(asleep):
+                continue
+            # Where the sleepers are now, without moving them
+            x, y, _ = self._coasted(pop, asleep)
+            d = np.hypot(x[:, None] - sx[None, :], y[:, None] - sy[None, :])
+            affected = d.min(axis=1) < pop.wake_radius[asleep]
+            if static:
+                affected |= pop.wake_step[asleep] != NEVER
+            near = asleep[affected]
+            if pop.model != "1" and pop.noise is None:
+                parked = near[(pop.coast[near] == 0).all(axis=1)]
+                if len(parked):
+                    self._coast(pop, parked)
+                    still = parked[~self._resense(pop, parked)]
+                    near = np.setdiff1d(near, still, assume_unique=True)
+            if len(near):
+                self.wake(pop, near)
+
+    def _resense(self, pop, index):
+        """Sense again for the vehicles at index, storing their sensor and
+        motor values, and return which of them would move."""
+        sub = pop.take(index)
+        self._controls(sub, sub.x, sub.y, sub.heading)
+        pop.sensors[index] = sub.sensors
+        pop.motors[index] = sub.motors
+        return (sub.motors != 0).any(axis=1)
+
+    @property
+    def n_sources(self):
+        return len(self.source_x)
+
+    def field_tree(self):
+        """The fields.QuadTree of the static sources (rebuilt when one of
+        them changes)."""
+        tree = self._field_tree
+        if tree is None or tree[0] != (self.static_version, self.n_sources):
+            static = ~self.source_dynamic
+            tree = self._field_tree = (
+                (self.static_version, self.n_sources),
+                fields.QuadTree(
+                    self.source_x[static], self.source_y[static],
+                    weights=self.source_strength[static],
+                ),
+            )
+        return tree[1]
+
+    # --- WALLS ---
+    def add_wall(self, x0, y0, x1, y1):
+        """Add a wall segment and return its index. Sleeping vehicles are
+        woken, since they may coast into it."""
+        self.wall_x0 = np.append(self.wall_x0, float(x0))
+        self.wall_y0 = np.append(self.wall_y0, float(y0))
+        self.wall_x1 = np.append(self.wall_x1, float(x1))
+        self.wall_y1 = np.append(self.wall_y1, float(y1))
+        self._wall_grid = None
+        self.source_version += 1
+        for pop in self.populations:
+            asleep = pop.sleeping_vehicles()
+            if len(asleep):
+                self.wake(pop, asleep)
+        return len(self.wall_x0) - 1
+
+    def add_box(self, x, y, width, height):
+        """Add the four walls of a rectangle."""
+        corners = [(x, y), (x + width, y), (x + width, y + height), (x, y + height)]
+        for (ax, ay), (bx, by) in zip(corners, corners[1:] + corners[:1]):
+            self.add_wall(ax, ay, bx, by)
+
+    @property
+    def n_walls(self):
+        return len(self.wall_x0)
+
+    def walls(self):
+        """The SegmentGrid of the current walls (rebuilt after changes)."""
+        grid = self._wall_grid
+        if grid is None or len(grid) != self.n_walls:
+            grid = self._wall_grid = SegmentGrid(
+                self.wall_x0, self.wall_y0, self.wall_x1, self.wall_y1,
+                self.width, self.height, self.wall_cell,
+            )
+        return grid
+
+    # --- VEHICLES ---
+    def add_population(self, model, x, y, heading=0.0, **params):
+        """Add a batch of vehicles of one model and return the Population."""
+        population = Population(model, x, y, heading, self.dtype, **params)
+        self.populations.append(population)
+        return population
+
+    @property
+    def n_vehicles(self):
+        return sum(len(p) for p in self.populations)
+
+    def memory(self):
+        """Bytes of vehicle state held by the world, and bytes per vehicle."""
+        total = sum(p.nbytes for p in self.populations)
+        return total, total / max(self.n_vehicles, 1)
+
+    def vehicle_arrays(self):
+        """Concatenate every population into flat arrays, with sleeping
+        vehicles brought up to the current step.
+
+        Returns a dict with model (index into MODELS), x, y, heading,
+        sensors (n, 2) and motors (n, 2).
+        """
+        self.sync()
+        pops = self.populations
+        if not pops:
+            empty = np.zeros(0)
+            return dict(
+                model=np.zeros(0, dtype=np.uint8), x=empty, y=empty,
+                heading=empty, sensors=np.zeros((0, 2)), motors=np.zeros((0, 2)),
+            )
+        return dict(
+            model=np.concatenate([
+                np.full(len(p), MODELS.index(p.model), dtype=np.uint8) for p in pops
+            ]),
+            x=np.concatenate([p.x for p in pops]),
+            y=np.concatenate([p.y for p in pops]),
+            heading=np.concatenate([p.heading for p in pops]),
+            sensors=np.concatenate([p.sensors for p in pops]),
+            motors=np.concatenate([p.motors for p in pops]),
+        )
+
+    # --- SENSING ---
+    def distances(self, px, py, kinds=None):
+        """Distances from every point to every source, shape (n, m).
+
+        kinds optionally limits the sources to one SOURCE_TYPES index.
+        """
+        sx, sy = self.source_x, self.source_y
+        if kinds is not None:
+            mask = self.source_kind == kinds
+            sx, sy = sx[mask], sy[mask]
+        return np.hypot(px[:, None] - sx[None, :], py[:, None] - sy[None, :])
+
+    def _strengths(self, kinds=None):
+        """Strengths of the sources (of one kind), or None while they are
+        all 1."""
+        strength = self.source_strength
+        if kinds is not None:
+            strength = strength[self.source_kind == kinds]
+        return None if (strength == 1).all() else strength
+
+    def _sensed_distances(self, px, py, kinds=None, reach=None):
+        """Like distances, but inf for sources hidden behind a wall and for
+        sources switched off (strength 0).
+
+        Only pairs closer than reach (scalar or per point) are ray cast; the
+        rest are returned as they are.
+        """
+        d = self.distances(px, py, kinds)
+        strength = self._strengths(kinds)
+        if strength is not None:
+            d[:, strength == 0] = np.inf
+        if not self.n_walls or not d.size:
+            return d
+        sx, sy = self.source_x, self.source_y
+        if kinds is not None:
+            mask = self.source_kind == kinds
+            sx, sy = sx[mask], sy[mask]
+        near = d < (np.inf if reach is None else _col(reach))
+        point, source = np.nonzero(near)
+        t, _ = self.walls().cast(px[point], py[point], sx[source], sy[source])
+        hidden = t < 1
+        d[point[hidden], source[hidden]] = np.inf
+        return d
+
+    def _linear(self, px, py, max_distance, kinds=None):
+        """Summed linear-falloff intensity, 1.0 on a source, 0.0 at max_distance."""
+        d = self._sensed_distances(px, py, kinds, max_distance)
+        intensity = np.maximum(0.0, 1.0 - d / _col(max_distance))
+        strength = self._strengths(kinds)
+        if strength is not None:
+            intensity *= strength
+        return intensity.sum(axis=1)
+
+    def _inverse_square(self, px, py):
+        """Summed inverse-square intensity as VehicleOne measures it."""
+        if self.field_theta is not None and not self.n_walls:
+            # Walls hide single sources, which a tree of grouped sources
+            # can't, so worlds with walls always take the exact sum
+            total = self.field_tree().field(px, py, self.field_theta)
+            dynamic = np.flatnonzero(self.source_dynamic)
+            if len(dynamic):
+                # Sources that change every step are summed exactly instead
+                # of rebuilding the tree
+                dx = px[:, None] - self.source_x[dynamic]
+                dy = py[:, None] - self.source_y[dynamic]
+                d2 = dx * dx + dy * dy
+                total += (fields.inverse_square(d2) * self.source_strength[dynamic]).sum(axis=1)
+            return total
+        d = self._sensed_distances(px, py)
+        intensity = 10000 / (d**2 + 50)
+        strength = self._strengths()
+        if strength is not None:
+            intensity *= strength
+        return intensity.sum(axis=1)
+
+    # --- STEPPING ---
+    def step(self):
+        """Advance every vehicle by one step of dt frames."""
+        self._wake_due()
+        for population in self.populations:
+            if len(population):
+                self._step_population(population)
+        self.step_count += 1
+        for observer in self.observers:
+            observer(self)
+
+    def _step_population(self, pop):
+        if pop.awake is None or pop.awake.all():
+            self._advance(pop)
+            return
+        # Only step the awake vehicles
+        awake = pop.awake_vehicles()
+        if len(awake):
+            active = pop.take(awake)
+            self._advance(active)
+            pop.put(awake, active)
+
+    def _advance(self, pop):
+        dt = self.dt
+        speed, turn = self._controls(pop, pop.x, pop.y, pop.heading)
+        if self.integrator == "euler":
+            x, y, heading = integrators.euler(pop.x, pop.y, pop.heading, speed, turn, dt)
+        elif self.integrator == "arc":
+            x, y, heading = integrators.arc(pop.x, pop.y, pop.heading, speed, turn, dt)
+        elif self.integrator == "midpoint":
+            # Midpoint: sense again halfway along the arc, then take the whole
+            # step with the controls found there
+            x, y, heading = integrators.arc(pop.x, pop.y, pop.heading, speed, turn, dt / 2)
+            x, y = self._wrap(pop.model, x, y)
+            speed, turn = self._controls(
+                pop, x, y, heading, turn_noise=turn, record=False
+            )
+            x, y, heading = integrators.arc(pop.x, pop.y, pop.heading, speed, turn, dt)
+        else:
+            x, y, heading = self._rk4(pop, speed, turn, dt)
+        if self.n_walls:
+            x, y, heading = self._bounce(pop, x, y, heading)
+        x, y = self._wrap(pop.model, x, y)
+        dtype = pop.x.dtype
+        pop.x = x.astype(dtype, copy=False)
+        pop.y = y.astype(dtype, copy=False)
+        pop.heading = self._store_heading(heading, dtype)
+
+    def _rk4(self, pop, speed, turn, dt):
+        """Runge-Kutta 4 on the arc form: the stages sense at the ends of
+        arcs of dt/2, dt/2 and dt driven with the previous stage's controls,
+        and the step is one arc with the controls weighted 1, 2, 2, 1."""
+        x0, y0, h0 = pop.x, pop.y, pop.heading
+        sum_speed, sum_turn = speed.copy(), np.array(turn, dtype=float)
+        for fraction, weight in ((0.5, 2), (0.5, 2), (1.0, 1)):
+            x, y, heading = integrators.arc(x0, y0, h0, speed, turn, dt * fraction)
+            x, y = self._wrap(pop.model, x, y)
+            speed, turn = self._controls(pop, x, y, heading, turn_noise=turn, record=False)
+            sum_speed += weight * speed
+            sum_turn = sum_turn + weight * turn
+        return integrators.arc(x0, y0, h0, sum_speed / 6, sum_turn / 6, dt)
+
+    def _bounce(self, pop, x, y, heading):
+        """Vehicles whose step (plus their body radius) would cross a wall
+        stay put and reflect their heading off the wall."""
+        dx = x - pop.x
+        dy = y - pop.y
+        length = np.hypot(dx, dy)
+        moving = np.flatnonzero(length > 0)
+        if not len(moving):
+            return x, y, heading
+        radius = np.asarray(pop.params["radius"], dtype=float)
+        if radius.ndim:
+            radius = radius[moving]
+        reach = (length[moving] + radius) / length[moving]
+        ox, oy = pop.x[moving], pop.y[moving]
+        ex, ey = ox + dx[moving] * reach, oy + dy[moving] * reach
+        grid = self.walls()
+        t, wall = grid.cast(ox, oy, ex, ey)
+        # Steps running off the screen continue on the other side
+        shift_x = np.floor(ex / self.width) * self.width
+        shift_y = np.floor(ey / self.height) * self.height
+        wrapped = np.flatnonzero((shift_x != 0) | (shift_y != 0))
+        if len(wrapped):
+            sx, sy = shift_x[wrapped], shift_y[wrapped]
+            t2, wall2 = grid.cast(ox[wrapped] - sx, oy[wrapped] - sy, ex[wrapped] - sx, ey[wrapped] - sy)
+            closer = t2 < t[wrapped]
+            t[wrapped[closer]] = t2[closer]
+            wall[wrapped[closer]] = wall2[closer]
+        hit = np.isfinite(t)
+        if not hit.any():
+            return x, y, heading
+        index, wall = moving[hit], wall[hit]
+        angle = np.arctan2(
+            self.wall_y1[wall] - self.wall_y0[wall], self.wall_x1[wall] - self.wall_x0[wall]
+        )
+        x, y, heading = x.copy(), y.copy(), np.array(heading, dtype=float)
+        x[index] = pop.x[index]
+        y[index] = pop.y[index]
+        heading[index] = 2 * angle - heading[index]
+        return x, y, heading
+
+    def _store_heading(self, heading, dtype):
+        if dtype == np.float32:
+            # Headings grow without bound; in float32 they would lose their
+            # fractional part, so keep them within one turn
+            heading = np.mod(heading, 2 * math.pi)
+        return heading.astype(dtype, copy=False)
+
+    def _controls(self, pop, x, y, heading, turn_noise=None, record=True):
+        """Sense at the given state and return (speed, turn) per frame.
+
+        With record the sensor and motor values are stored on the population.
+        turn_noise reuses VehicleOne's random turning instead of drawing anew.
+        The population's noise (if any) is drawn for the current step, so
+        both calls of the midpoint integrator see the same noise.
+        """
+        p = pop.params
+        model = pop.model
+        if model == "retina":
+            return self._retina_controls(pop, x, y, heading, record)
+        (lx, ly), (rx, ry) = pop.sensor_positions(x, y, heading)
+
+        if model == "1":
+            # Direct connection, plus Brownian turning
+            intensity, = self._noisy(pop, 1, self._inverse_square(lx, ly))
+            speed, = self._noisy(pop, 0, intensity)
+            if turn_noise is None:
+                turn_noise = self.rng.uniform(
+                    -p["max_perturbation"], p["max_perturbation"], len(pop)
+                )
+            if record:
+                pop.sensors[:, 0] = pop.sensors[:, 1] = intensity
+                pop.motors[:, 0] = pop.motors[:, 1] = speed
+            return speed, turn_noise
+
+        if model == "4aa":
+            # Gaussian of the distance to the nearest source
+            dist_l = self._sensed_distances(lx, ly).min(axis=1, initial=np.inf)
+            dist_r = self._sensed_distances(rx, ry).min(axis=1, initial=np.inf)
+            # Its sensors read distances, so that is what the noise perturbs
+            dist_l, dist_r = self._noisy(pop, 1, dist_l, dist_r)
+            width = 2 * p["curve_width"] ** 2
+            signal_l = np.exp(-((dist_l - p["optimal_distance"]) ** 2) / width) * p["max_speed"]
+            signal_r = np.exp(-((dist_r - p["optimal_distance"]) ** 2) / width) * p["max_speed"]
+            # Crossed wiring
+            left_motor, right_motor = self._noisy(pop, 0, signal_r, signal_l)
+            if record:
+                pop.sensors[:, 0], pop.sensors[:, 1] = dist_l, dist_r
+                pop.motors[:, 0], pop.motors[:, 1] = left_motor, right_motor
+            turn = np.radians((left_motor - right_motor) * p["turning_scaler"])
+            return (left_motor + right_motor) / 2, turn
+
+        if model == "3c":
+            left_motor = np.full(len(pop), p["base_speed"], dtype=float)
+            right_motor = left_motor.copy()
+            excite, inhibit = p["gain_excite"], p["gain_inhibit"]
+            sensed_l = np.zeros(len(pop))
+            sensed_r = np.zeros(len(pop))
+            for kind, name in enumerate(SOURCE_TYPES):
+                i_l = self._linear(lx, ly, p["max_distance"], kind)
+                i_r = self._linear(rx, ry, p["max_distance"], kind)
+                i_l, i_r = self._noisy(pop, 1 + kind, i_l, i_r)
+                sensed_l += i_l
+                sensed_r += i_r
+                if name == "light":  # aggression, crossed excitatory
+                    left_motor += i_r * excite
+                    right_motor += i_l * excite
+                elif name == "temp":  # fear, uncrossed excitatory
+                    left_motor += i_l * excite
+                    right_motor += i_r * excite
+                elif name == "oxygen":  # explorer, crossed inhibitory
+                    left_motor -= i_r * inhibit
+                    right_motor -= i_l * inhibit
+                else:  # organic: lover, uncrossed inhibitory
+                    left_motor -= i_l * inhibit
+                    right_motor -= i_r * inhibit
+            left_motor = np.clip(left_motor, 0.0, p["max_speed"])
+            right_motor = np.clip(right_motor, 0.0, p["max_speed"])
+        else:
+            sensed_l, sensed_r = int_l, int_r = self._noisy(
+                pop, 1,
+                self._linear(lx, ly, p["max_distance"]), self._linear(rx, ry, p["max_distance"]),
+            )
+
+            if model == "2a":  # fear, uncrossed excitatory
+                left_motor = p["base_speed"] + int_l * p["speed_scaler"]
+                right_motor = p["base_speed"] + int_r * p["speed_scaler"]
+            elif model == "2b":  # aggression, crossed excitatory
+                left_motor = p["base_speed"] + int_r * p["speed_scaler"]
+                right_motor = p["base_speed"] + int_l * p["speed_scaler"]
+            elif model == "3a":  # lover, crossed inhibitory
+                left_motor = np.maximum(0, p["base_speed"] - int_r * p["inhibition_scaler"])
+                right_motor = np.maximum(0, p["base_speed"] - int_l * p["inhibition_scaler"])
+            elif model == "3b":  # explorer, uncrossed inhibitory
+                left_motor = np.maximum(0, p["base_speed"] - int_l * p["inhibition_scaler"])
+                right_motor = np.maximum(0, p["base_speed"] - int_r * p["inhibition_scaler"])
+            elif model == "4a":  # uncrossed, through a bell curve
+                width = 2 * p["curve_width"] ** 2
+                val_l = np.exp(-((int_l - p["preferred_intensity"]) ** 2) / width)
+                val_r = np.exp(-((int_r - p["preferred_intensity"]) ** 2) / width)
+                left_motor = p["base_speed"] + val_l * p["max_motor_speed"]
+                right_motor = p["base_speed"] + val_r * p["max_motor_speed"]
+            else:  # 4b: crossed, through a shifted ReLU
+                threshold = p["relu_threshold"]
+                val_l = np.where(int_l <= threshold, 0.0, (int_l - threshold) * p["relu_gain"])
+                val_r = np.where(int_r <= threshold, 0.0, (int_r - threshold) * p["relu_gain"])
+                left_motor = np.minimum(p["max_speed"], val_r)
+                right_motor = np.minimum(p["max_speed"], val_l)
+
+        left_motor, right_motor = self._noisy(pop, 0, left_motor, right_motor)
+        if record:
+            pop.sensors[:, 0], pop.sensors[:, 1] = sensed_l, sensed_r
+            pop.motors[:, 0], pop.motors[:, 1] = left_motor, right_motor
+        if model == "4a":
+            # Vehicle4a turns by (right - left), all the others by (left - right)
+            turn = (right_motor - left_motor) * p["turning_scaler"]
+        else:
+            turn = (left_motor - right_motor) * p["turning_scaler"]
+        return (left_motor + right_motor) / 2, turn
+
+    def _noisy(self, pop, channel, *readings):
+        """readings (one array per sensor or motor) with the population's
+        noise for channel added (see noise.Noise.apply); unchanged without
+        noise."""
+        noise = pop.noise
+        if noise is None or not (noise.motors if channel == 0 else noise.sensors):
+            return readings
+        values = noise.apply(
+            np.column_stack(readings), pop.vehicle_ids, self.step_count, channel
+        )
+        return tuple(values.T)
+
+    def _retina_controls(self, pop, x, y, heading, record):
+        p = pop.params
+        px, py = pop.sensor_points(x, y, heading)
+        n, k = px.shape
+        max_distance = p["max_distance"]
+        if np.ndim(max_distance):
+            max_distance = np.repeat(max_distance, k)
+        readings = self._linear(px.ravel(), py.ravel(), max_distance).reshape(n, k)
+        if pop.noise is not None and pop.noise.sensors:
+            readings = pop.noise.apply(readings, pop.vehicle_ids, self.step_count, 1)
+        _, left_share = pop.sensor_offsets()
+        # Row by row rather than with a matrix product, whose rounding
+        # depends on how many vehicles there are
+        sensed_l = (readings * left_share).sum(axis=1)
+        sensed_r = (readings * (1 - left_share)).sum(axis=1)
+
+        crossed = np.asarray(p["crossed"]) > 0.5
+        drive_l = np.where(crossed, sensed_r, sensed_l)
+        drive_r = np.where(crossed, sensed_l, sensed_r)
+        left_motor = np.clip(p["base_speed"] + drive_l * p["gain"], 0.0, p["max_speed"])
+        right_motor = np.clip(p["base_speed"] + drive_r * p["gain"], 0.0, p["max_speed"])
+        left_motor, right_motor = self._noisy(pop, 0, left_motor, right_motor)
+        if record:
+            pop.sensors[:, 0], pop.sensors[:, 1] = sensed_l, sensed_r
+            pop.motors[:, 0], pop.motors[:, 1] = left_motor, right_motor
+        turn = (left_motor - right_motor) * p["turning_scaler"]
+        return (left_motor + right_motor) / 2, turn
+
+    def _wrap(self, model, x, y):
+        """Wrap positions back onto the screen."""
+        if model == "4aa":
+            # The script teleports to the opposite edge instead of using modulo
+            w, h = self.width, self.height
+            x = np.where(x < 0, w, x)
+            x = np.where(x > w, 0.0, x)
+            y = np.where(y < 0, h, y)
+            y = np.where(y > h, 0.0, y)
+            return x, y
+        return x % self.width, y % self.height
+
+    # --- SLEEPING ---
+    def sleep(self, pop, index, speed, turn, wake_radius=np.inf, wake_step=None):
+        """Stop stepping the vehicles at index and let them coast in closed
+        form with constant speed and turn (per frame) from their current
+        state, until a source change within wake_radius wakes them, or the
+        world reaches wake_step (a scalar or one step per vehicle)."""
+        index = np.asarray(index)
+        pop._alloc_sleep()
+        pop.awake[index] = False
+        pop.anchor_step[index] = self.step_count
+        pop.coast[index, 0] = speed
+        pop.coast[index, 1] = turn
+        pop.wake_radius[index] = wake_radius
+        if wake_step is None:
+            pop.wake_step[index] = NEVER
+            return
+        pop.wake_step[index] = wake_step
+        self._schedule(pop, index)
+
+    def wake(self, pop, index):
+        """Resume stepping sleeping vehicles from where they have coasted to."""
+        index = np.asarray(index)
+        self._coast(pop, index)
+        pop.awake[index] = True
+        pop.wake_step[index] = NEVER
+
+    def _schedule(self, pop, index):
+        # One queue entry per distinct wake step, so the queue stays small
+        # however many vehicles sleep
+        if not len(index):
+            return
+        steps = pop.wake_step[index]
+        order = np.argsort(steps, kind="stable")
+        index, steps = index[order], steps[order]
+        starts = np.flatnonzero(np.diff(steps, prepend=steps[:1] - 1))
+        for group in np.split(index, starts[1:]):
+            heapq.heappush(
+                self._wake_queue,
+                (int(pop.wake_step[group[0]]), next(self._wake_counter), pop, group),
+            )
+
+    def _wake_due(self):
+        queue = self._wake_queue
+        while queue and queue[0][0] <= self.step_count:
+            step, _, pop, index = heapq.heappop(queue)
+            # Skip vehicles that were woken (or rescheduled) in the meantime
+            index = index[~pop.awake[index] & (pop.wake_step[index] == step)]
+            if len(index):
+                self.wake(pop, index)
+
+    def rebuild_wake_queue(self):
+        """Reschedule every timed sleeper (after loading a snapshot)."""
+        self._wake_queue = []
+        for pop in self.populations:
+            if pop.awake is None:
+                continue
+            timed = np.flatnonzero(~pop.awake & (pop.wake_step != NEVER))
+            if len(timed):
+                self._schedule(pop, timed)
+
+    def sync(self):
+        """Bring the x, y and heading of every sleeping vehicle up to the
+        current step. Sleepers are only moved when something looks at them."""
+        for pop in self.populations:
+            if pop.awake is None:
+                continue
+            lagging = np.flatnonzero(~pop.awake & (pop.anchor_step < self.step_count))
+            if len(lagging):
+                self._coast(pop, lagging)
+
+    def _coasted(self, pop, index):
+        """x, y and heading the sleepers at index have coasted to by now."""
+        steps = self.step_count - pop.anchor_step[index]
+        x, y, heading = integrators.coast(
+            pop.x[index], pop.y[index], pop.heading[index],
+            pop.coast[index, 0], pop.coast[index, 1],
+            self.dt, steps, self.integrator,
+        )
+        x, y = self._wrap(pop.model, x, y)
+        return x, y, heading
+
+    def _coast(self, pop, index):
+        x, y, heading = self._coasted(pop, index)
+        pop.x[index], pop.y[index] = x, y
+        pop.heading[index] = self._store_heading(heading, pop.heading.dtype)
+        pop.anchor_step[index] = self.step_count